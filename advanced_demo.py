@@ -58,7 +58,9 @@ def main():
     print(f"Tasks Completed: {status['metrics']['tasks_completed']}")
     print(f"Actions Executed: {status['metrics']['actions_executed']}")
     print(f"Errors Recovered: {status['metrics']['errors_recovered']}")
-    print(f"Memory Size: {status['memory_size']} entries")
+    memory = status['memory_size']
+    print(f"Memory Size: {memory['resident_records']} resident ({memory['resident_bytes']} B), "
+          f"{memory['spilled_records']} spilled ({memory['spilled_bytes']} B)")
     print("="*70)
 
 if __name__ == "__main__":
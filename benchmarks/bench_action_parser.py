@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ActionParser vs. the legacy split-based _parse_action.
+Replays a corpus of recorded LLM responses (benchmarks/data/action_responses.jsonl)
+and reports throughput and correctness against the expected tool calls.
+"""
+
+import os
+import sys
+import json
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from action_parser import ActionParser, ParsedAction
+
+CORPUS = os.path.join(os.path.dirname(__file__), "data", "action_responses.jsonl")
+ROUNDS = 2_000
+TOOL_PARAMS = {
+    "execute_shell": ("command",),
+    "pc_control_click": ("x", "y"),
+    "pc_control_type": ("text",),
+    "read_observation": ("id", "offset", "length"),
+    "final_answer": ("text",)
+}
+
+
+def legacy_parse_action(response: str) -> dict:
+    """The split-based parser the agents used before ActionParser."""
+    if "Action:" in response:
+        action_line = response.split("Action:")[1].strip().split("\n")[0]
+        if "(" in action_line and ")" in action_line:
+            name = action_line.split("(")[0].strip()
+            params_str = action_line.split("(")[1].split(")")[0]
+            params = {}
+            if params_str:
+                try:
+                    params = json.loads(params_str.replace("'", "\""))
+                except:
+                    params = {"raw": params_str}
+            return {"name": name, "params": params}
+    return {"name": "final_answer", "content": response}
+
+
+def expected_calls(entry: dict) -> list:
+    calls = []
+    for name, args, kwargs in entry["expected"]:
+        calls.append((name, ParsedAction(name, args, kwargs).params(TOOL_PARAMS.get(name))))
+    return calls
+
+
+def legacy_calls(response: str) -> list:
+    action = legacy_parse_action(response)
+    if "params" not in action:
+        return []
+    params = action["params"]
+    if not isinstance(params, dict):
+        params = {"value": params}  # json.loads of a bare string/number
+    return [(action["name"], params)]
+
+
+def parser_calls(parser: ActionParser, response: str) -> list:
+    return [(a.name, a.params(TOOL_PARAMS.get(a.name))) for a in parser.parse(response)]
+
+
+def throughput(fn, responses) -> float:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for response in responses:
+            fn(response)
+    return ROUNDS * len(responses) / (time.perf_counter() - start)
+
+
+def main():
+    with open(CORPUS, encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    responses = [entry["response"] for entry in corpus]
+    parser = ActionParser()
+
+    results = {"legacy": 0, "parser": 0}
+    for entry in corpus:
+        expected = expected_calls(entry)
+        got_legacy = legacy_calls(entry["response"])
+        got_parser = parser_calls(parser, entry["response"])
+        results["legacy"] += got_legacy == expected
+        results["parser"] += got_parser == expected
+        if got_parser != expected:
+            print(f"  MISMATCH {entry['response'][:60]!r}\n    expected {expected}\n    got      {got_parser}")
+
+    legacy_rate = throughput(legacy_parse_action, responses)
+    parser_rate = throughput(parser.parse, responses)
+    multi = sum(1 for entry in corpus if len(entry["expected"]) > 1)
+
+    print(f"Corpus: {len(corpus)} responses ({multi} with multiple actions)")
+    print(f"{'parser':<14}{'correct':>12}{'responses/s':>16}")
+    print(f"{'legacy split':<14}{results['legacy']:>7}/{len(corpus):<4}{legacy_rate:>16,.0f}")
+    print(f"{'ActionParser':<14}{results['parser']:>7}/{len(corpus):<4}{parser_rate:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
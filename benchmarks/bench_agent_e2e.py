@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Benchmark: deterministic end-to-end runs of the agent loop.
+Each scenario in benchmarks/scenarios drives the real agent (prompt
+building, parsing, dispatch, observations, memory, plan cache) with the
+scripted LLM and fake shell from scripted_llm.py, in a fresh process.
+Reports iterations/s of agent overhead, p50/p95 per loop phase, peak RSS
+and peak traced allocations, and compares them with a stored baseline.
+Every scenario runs --repeats times; reported values are medians, and a
+metric only counts as regressed when its median is worse by more than the
+tolerance and its range across repeats no longer overlaps the baseline's.
+
+    python benchmarks/bench_agent_e2e.py                    # run and compare
+    python benchmarks/bench_agent_e2e.py --save-baseline    # record a new baseline
+    python benchmarks/bench_agent_e2e.py --realtime         # sleep the simulated LLM latency
+
+Simulated LLM time is not slept by default, so iterations/s is the agent's
+own throughput; --realtime runs are not compared with the baseline. Exits
+with status 1 when a metric regressed by more than the tolerance.
+"""
+
+import io
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+import statistics
+import resource
+import subprocess
+import tracemalloc
+from contextlib import redirect_stdout
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCENARIOS = os.path.join(HERE, "scenarios")
+BASELINE = os.path.join(HERE, "data", "agent_e2e_baseline.json")
+
+# Metric -> whether higher is better; everything else is informational
+COMPARED = {"iterations_per_second": True, "think_p50_ms": False, "act_p50_ms": False,
+            "observe_p50_ms": False, "peak_rss_mb": False, "peak_alloc_mb": False}
+# Sub-millisecond phases jitter by more than the tolerance; smaller latency changes are noise
+MIN_LATENCY_DELTA_MS = 0.25
+
+
+def build_agent(scenario: dict, realtime: bool):
+    from agent_advanced import NeuroSovereignAdvancedAgent
+    from plan_cache import PlanCache
+    from scripted_llm import ScriptedLLM, FakeShell
+
+    agent = NeuroSovereignAdvancedAgent(max_iterations=scenario.get("max_iterations", 10),
+                                        stream_actions=scenario.get("stream_actions", False),
+                                        plan_cache=PlanCache(max_plans=0))
+    agent.llm = ScriptedLLM(scenario, realtime=realtime)
+    agent.pc_control.shell = FakeShell(scenario.get("outputs"), size=agent.pc_control.shell.size)
+    # Subsystems load on first use; create them here so runs measure the loop, not startup
+    # (bench_startup.py covers that); retrieval imports numpy only once it embeds something
+    agent.retrieval
+    import numpy  # noqa: F401
+    return agent
+
+
+def run_workload(agent, scenario: dict):
+    from agent_advanced import ConcurrentTaskRunner
+
+    tasks = [scenario["task"].replace("{i}", str(i + 1)) for i in range(scenario.get("sessions", 1))]
+    if len(tasks) == 1:
+        return [agent.execute(tasks[0])]
+    runner = ConcurrentTaskRunner(agent, max_concurrency=scenario.get("concurrency", 16))
+    return [result["result"] for result in runner.run(tasks)]
+
+
+def measure(path: str, realtime: bool) -> dict:
+    """Runs one scenario in this process: a timed pass, then a pass under tracemalloc."""
+    from instrumentation import METRICS
+
+    with open(path) as f:
+        scenario = json.load(f)
+    with redirect_stdout(io.StringIO()):
+        agent = build_agent(scenario, realtime)
+        METRICS.reset()
+        start = time.perf_counter()
+        results = run_workload(agent, scenario)
+        elapsed = time.perf_counter() - start
+        phases = METRICS.snapshot()["histograms"].get("ns_phase_seconds", {})
+        llm = agent.llm.get_stats()
+
+        agent = build_agent(scenario, realtime)
+        tracemalloc.start()
+        run_workload(agent, scenario)
+        _, peak_alloc = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    iterations = llm["calls"]
+    report = {
+        "scenario": scenario["name"],
+        "sessions": len(results),
+        "iterations": iterations,
+        "seconds": elapsed,
+        "simulated_llm_seconds": llm["simulated_seconds"],
+        "iterations_per_second": iterations / elapsed,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,  # KiB on Linux
+        "peak_alloc_mb": peak_alloc / 2 ** 20,
+        "answers": sorted(set(results))[:3]
+    }
+    for phase in ("think", "parse", "act", "observe"):
+        summary = phases.get(f"phase={phase}")
+        if summary:
+            report[f"{phase}_p50_ms"] = summary["p50"] * 1e3
+            report[f"{phase}_p95_ms"] = summary["p95"] * 1e3
+    return report
+
+
+def run_isolated(path: str, realtime: bool) -> dict:
+    """Measures a scenario in a child process, so peak RSS and caches start clean."""
+    command = [sys.executable, os.path.abspath(__file__), "--child", path] + (["--realtime"] if realtime else [])
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def aggregate(reports: list) -> dict:
+    """Median of every numeric metric over repeated runs, plus the [min, max] range of the compared ones."""
+    report = dict(reports[0])
+    for metric, value in reports[0].items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            values = [r[metric] for r in reports if metric in r]
+            report[metric] = statistics.median(values)
+            if metric in COMPARED:
+                report[f"{metric}_range"] = [min(values), max(values)]
+    report["repeats"] = len(reports)
+    return report
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for metric, higher_is_better in COMPARED.items():
+        old, new = baseline.get(metric), report.get(metric)
+        if not old or new is None:
+            continue
+        if metric.endswith("_ms") and abs(new - old) < MIN_LATENCY_DELTA_MS:
+            continue
+        change = (new - old) / old
+        if (-change if higher_is_better else change) <= tolerance:
+            continue
+        old_range, new_range = baseline.get(f"{metric}_range"), report.get(f"{metric}_range")
+        if old_range and new_range and (new_range[1] >= old_range[0] if higher_is_better
+                                        else new_range[0] <= old_range[1]):
+            continue  # Some repeat still matches the baseline's spread: noise, not a regression
+        regressions.append(f"{metric} {old:.3g} -> {new:.3g} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("scenarios", nargs="*", help="Scenario files (default: benchmarks/scenarios/*.json)")
+    parser.add_argument("--realtime", action="store_true", help="Sleep the simulated LLM latency")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Write results to {BASELINE}")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per scenario (medians are reported)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.realtime)))
+        return
+
+    if args.realtime and args.save_baseline:
+        parser.error("baselines record agent overhead; run without --realtime")
+    paths = args.scenarios or sorted(glob.glob(os.path.join(SCENARIOS, "*.json")))
+    baseline = {}
+    # Realtime runs include the simulated LLM time and are not comparable with the baseline
+    if os.path.exists(args.baseline) and not (args.save_baseline or args.realtime):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print(f"{'scenario':<22}{'iters':>7}{'iters/s':>10}{'think p50':>11}{'act p50':>9}"
+          f"{'observe p50':>13}{'RSS MB':>8}{'alloc MB':>10}")
+    reports, regressions = {}, []
+    for path in paths:
+        report = aggregate([run_isolated(path, args.realtime) for _ in range(max(1, args.repeats))])
+        reports[report["scenario"]] = report
+        print(f"{report['scenario']:<22}{report['iterations']:>7}{report['iterations_per_second']:>10,.1f}"
+              f"{report.get('think_p50_ms', 0):>9.2f}ms{report.get('act_p50_ms', 0):>7.2f}ms"
+              f"{report.get('observe_p50_ms', 0):>11.2f}ms{report['peak_rss_mb']:>8.1f}"
+              f"{report['peak_alloc_mb']:>10.1f}")
+        if report["scenario"] in baseline:
+            regressions += [f"{report['scenario']}: {r}"
+                            for r in compare(report, baseline[report["scenario"]], args.tolerance)]
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(reports, f, indent=2, sort_keys=True)
+        print(f"[*] Baseline written to {args.baseline}")
+    elif baseline:
+        for regression in regressions:
+            print(f"[!] Regression: {regression}")
+        print(f"[*] {len(regressions)} regression(s) against {args.baseline} (tolerance {args.tolerance:.0%})")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
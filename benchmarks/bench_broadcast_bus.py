@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Benchmark: BroadcastBus fan-out with 1 to 1000 callback subscribers.
+Reports publisher-side throughput (what the agent loop pays), end-to-end
+deliveries/s until every subscriber has caught up, and events lost by
+subscribers that were lapped by the ring. The baseline calls every
+subscriber synchronously from publish, as a naive observer list would.
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from broadcast_bus import BroadcastBus, CallbackSubscriber
+
+EVENTS = 20_000
+SUBSCRIBER_COUNTS = (1, 10, 100, 1000)
+
+
+def event(i: int) -> dict:
+    return {"action": "execute_shell", "params": {"command": f"ls /tmp/{i}"}, "exit_code": 0}
+
+
+def naive_fanout(subscribers: int) -> float:
+    callbacks = [lambda events: None] * subscribers
+    start = time.perf_counter()
+    for i in range(EVENTS):
+        batch = [event(i)]
+        for callback in callbacks:
+            callback(batch)
+    return EVENTS / (time.perf_counter() - start)
+
+
+def bus_fanout(subscribers: int):
+    bus = BroadcastBus(capacity=16384)
+    for _ in range(subscribers):
+        bus.subscribe(CallbackSubscriber(lambda events: None))
+    start = time.perf_counter()
+    for i in range(EVENTS):
+        bus.publish(event(i))
+    published = time.perf_counter() - start
+    bus.flush(timeout=120)
+    total = time.perf_counter() - start
+    stats = bus.get_stats()
+    bus.close()
+    return EVENTS / published, stats["delivered"] / total, stats["dropped"] / (EVENTS * subscribers)
+
+
+def main():
+    print(f"{EVENTS:,} events per run")
+    print(f"{'subscribers':>11}{'naive publish/s':>17}{'bus publish/s':>15}{'bus delivered/s':>17}{'lost':>8}")
+    for subscribers in SUBSCRIBER_COUNTS:
+        naive = naive_fanout(subscribers)
+        publish_rate, delivery_rate, lost = bus_fanout(subscribers)
+        print(f"{subscribers:>11}{naive:>17,.0f}{publish_rate:>15,.0f}{delivery_rate:>17,.0f}{lost:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark: incremental code index used by SelfEvolutionModule.
+Builds a synthetic project, then times a cold full index (process pool),
+a no-op refresh, and a refresh after editing one function in a few files.
+Also compares the prompt size of sending the edited files whole with
+sending only the changed symbols.
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from code_index import CodeIndex
+from context_builder import estimate_tokens
+
+FILES = 400
+FUNCTIONS = 30
+EDITED = 5
+
+FUNCTION = '''
+def handler_{f}_{i}(request, retries=3):
+    """Handles request kind {i} of module {f}."""
+    result = []
+    for attempt in range(retries):
+        if request.get("kind") == {i}:
+            result.append(process(request, attempt))
+        elif attempt > 1 and not result:
+            break
+    return result
+'''
+
+
+def build_tree(root: str):
+    for f in range(FILES):
+        package = os.path.join(root, f"pkg{f % 20}")
+        os.makedirs(package, exist_ok=True)
+        with open(os.path.join(package, f"module{f}.py"), "w") as out:
+            out.write("import os\nfrom helpers import process\n")
+            out.write("".join(FUNCTION.format(f=f, i=i) for i in range(FUNCTIONS)))
+
+
+def edit(root: str, f: int):
+    path = os.path.join(root, f"pkg{f % 20}", f"module{f}.py")
+    with open(path) as src:
+        source = src.read()
+    with open(path, "w") as out:
+        out.write(source.replace(f"kind {FUNCTIONS - 1} of", f"kind {FUNCTIONS - 1} (edited) of"))
+    return os.path.relpath(path, root)
+
+
+def timed(action):
+    start = time.perf_counter()
+    result = action()
+    return result, (time.perf_counter() - start) * 1e3
+
+
+def main():
+    root = tempfile.mkdtemp(prefix="ns_code_index_")
+    try:
+        build_tree(root)
+        index_path = os.path.join(root, ".neurosovereign", "code_index.json")
+        print(f"Synthetic project: {FILES} files x {FUNCTIONS} functions")
+
+        _, inline_ms = timed(lambda: CodeIndex(root, index_path + ".inline", pool_threshold=FILES + 1).refresh())
+        index = CodeIndex(root, index_path)
+        changes, cold_ms = timed(index.refresh)
+        print(f"  cold index, inline:       {inline_ms:>9.1f} ms")
+        print(f"  cold index, {os.cpu_count()} CPU(s):     {cold_ms:>9.1f} ms  ({len(changes['added'])} files,"
+              f" {index.stats['parallel_batches']} pool batch(es))")
+        index.mark_analyzed(index.pending())
+
+        _, noop_ms = timed(CodeIndex(root, index_path).refresh)
+        print(f"  no-op refresh (reloaded): {noop_ms:>9.1f} ms")
+
+        edited = [edit(root, f) for f in range(0, FILES, FILES // EDITED)]
+        changes, edit_ms = timed(index.refresh)
+        print(f"  refresh after {EDITED} edits:   {edit_ms:>9.1f} ms  ({len(changes['changed'])} files re-parsed)")
+
+        whole = "".join(open(os.path.join(root, rel)).read() for rel in edited)
+        pending = index.pending()
+        prompt, included = index.build_prompt(pending)
+        print(f"\nPrompt for the {EDITED} edited files:")
+        print(f"  whole files:     {estimate_tokens(whole):>7} tokens")
+        print(f"  changed symbols: {estimate_tokens(prompt):>7} tokens  ({len(included)} of {len(pending)} symbols)")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark: input macro engine on the recording backend (no display needed).
+Fills a form (clicks, tabbing, a paragraph of text, a save hotkey) and
+reports the input wall time each pacing would spend, next to the old
+per-call behaviour (0.5 s animated moves, 50 ms per character and
+pyautogui's 0.1 s PAUSE after every call), plus raw executor throughput.
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from input_macro import InputEngine, Macro, Pacing, RecordingBackend
+
+PARAGRAPH = ("NeuroSovereign fills this form without waiting on fixed animation delays. " * 6).strip()
+ROUNDS = 2_000
+
+
+def form_macro() -> Macro:
+    macro = Macro()
+    for i in range(5):
+        macro.move(400, 200 + i * 40).click(400, 200 + i * 40).type(f"field {i}")
+        macro.press("tab").press("tab")
+    macro.click(400, 500).type(PARAGRAPH[:len(PARAGRAPH) // 2]).type(PARAGRAPH[len(PARAGRAPH) // 2:])
+    return macro.hotkey("ctrl", "s").click(900, 700)
+
+
+def legacy_seconds(macro: Macro) -> float:
+    """Wall time of the same steps as individual move_and_click/type_text/press calls."""
+    pause, seconds = 0.1, 0.0
+    for op, args in macro.steps:
+        if op == "move":
+            seconds += 0.5 + pause
+        elif op == "write":
+            seconds += 0.05 * len(args[0]) + pause
+        else:
+            seconds += pause
+    return seconds
+
+
+def main():
+    macro = form_macro()
+    characters = sum(len(args[0]) for op, args in macro.steps if op == "write")
+    print(f"Form macro: {len(macro)} steps, {characters} characters")
+    print(f"{'pacing':<22}{'steps run':>10}{'input wall time':>17}")
+    print(f"{'legacy per-call':<22}{len(macro.steps):>10}{legacy_seconds(macro):>15.2f} s")
+    for name in ("HUMAN", "FAST", "INSTANT"):
+        backend = RecordingBackend()
+        result = InputEngine(backend, getattr(Pacing, name)).run(macro)
+        print(f"{'Pacing.' + name:<22}{result['executed']:>10}{backend.elapsed:>15.2f} s")
+
+    backend = RecordingBackend()
+    engine = InputEngine(backend, Pacing.INSTANT)
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        engine.run(macro)
+    elapsed = time.perf_counter() - start
+    stats = engine.get_stats()
+    print(f"Executor: {ROUNDS / elapsed:,.0f} macros/s, {stats['steps_in'] / elapsed:,.0f} steps/s "
+          f"({stats['merged_steps'] // ROUNDS} of {len(macro)} steps merged per macro)")
+
+
+if __name__ == "__main__":
+    main()
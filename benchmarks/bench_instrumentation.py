@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cost of the always-on instrumentation. Reports the time per
+sample of a phase timer, a histogram observation and a counter, the cost
+of a trace span with tracing off and on, and how long a Prometheus export
+of a realistic registry takes. The baseline is an empty with-block.
+"""
+
+import os
+import sys
+import time
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from instrumentation import Metrics, Tracer, SIZE_BUCKETS
+
+SAMPLES = 200_000
+
+
+class _Null:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def per_op_ns(fn, samples: int = SAMPLES) -> float:
+    start = time.perf_counter()
+    for _ in range(samples):
+        fn()
+    return (time.perf_counter() - start) / samples * 1e9
+
+
+def main():
+    metrics = Metrics()
+    null = _Null()
+
+    def empty():
+        with null:
+            pass
+
+    def timer():
+        with metrics.time("ns_phase_seconds", phase="think"):
+            pass
+
+    def size():
+        metrics.observe("ns_llm_prompt_tokens", 1800, SIZE_BUCKETS, endpoint="local")
+
+    def counter():
+        metrics.inc("ns_llm_requests_total", endpoint="local", outcome="ok")
+
+    off = Tracer()
+    with tempfile.TemporaryDirectory() as tmp:
+        on = Tracer(os.path.join(tmp, "trace.jsonl"))
+
+        def span_off():
+            with off.span("think"):
+                pass
+
+        def span_on():
+            with on.span("think", iteration=1):
+                pass
+
+        print(f"{'operation':<28}{'ns/op':>10}")
+        for name, fn in (("empty with-block", empty), ("phase timer", timer), ("size histogram", size),
+                         ("counter", counter), ("span, tracing off", span_off),
+                         ("span, tracing on", span_on)):
+            print(f"{name:<28}{per_op_ns(fn):>10,.0f}")
+        on.close()
+
+    for phase in ("replay", "think", "parse", "act", "observe"):
+        for i in range(1000):
+            metrics.observe("ns_phase_seconds", 0.0005 * (i % 200 + 1), phase=phase)
+    for tool in range(20):
+        metrics.observe("ns_tool_seconds", 0.01, tool=f"tool_{tool}")
+    start = time.perf_counter()
+    text = metrics.render_prometheus()
+    elapsed = time.perf_counter() - start
+    print(f"Prometheus export: {len(text.splitlines())} lines in {elapsed * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
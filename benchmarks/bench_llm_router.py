@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark: LLMRouter over three stub servers vs. a single endpoint.
+Two servers are fast and one is slower; every server stalls on 3% of
+requests (GC pause, preemption, a long prompt ahead in its queue). Reports
+end-to-end latency percentiles per configuration and the router's
+per-endpoint stats, then checks that more concurrent agenerate_response
+calls than the router has workers all complete.
+"""
+
+import os
+import sys
+import time
+import random
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from llm_engine import LocalLLMEngine
+from llm_router import LLMRouter
+from stub_llm_server import StubLLMServer
+
+CLIENTS = 8
+REQUESTS_PER_CLIENT = 40
+
+
+def stalling_responder(stall_rate: float, stall: float, seed: int):
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def respond(payload) -> str:
+        with lock:
+            stalled = rng.random() < stall_rate
+        if stalled:
+            time.sleep(stall)
+        return "Thought: ok\nAction: final_answer('ok')"
+    return respond
+
+
+def drive(backend) -> list:
+    latencies = []
+    lock = threading.Lock()
+
+    def client(i):
+        for j in range(REQUESTS_PER_CLIENT):
+            start = time.perf_counter()
+            backend.generate_response(f"client {i} request {j}")
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(CLIENTS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sorted(latencies)
+
+
+def report(label: str, latencies: list):
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1e3
+    print(f"{label:<22} p50 {pct(0.50):6.1f} ms  p95 {pct(0.95):6.1f} ms  "
+          f"p99 {pct(0.99):6.1f} ms  max {latencies[-1] * 1e3:6.1f} ms")
+
+
+def check_async_overload(urls: list, timeout: float = 10.0):
+    """Fails if concurrent agenerate_response calls beyond the worker count starve each other."""
+    import asyncio
+
+    router = LLMRouter(urls[:2], model_name="stub", pool_size=1)
+    calls = 4 * router._executor._max_workers
+
+    async def run():
+        return await asyncio.wait_for(
+            asyncio.gather(*(router.agenerate_response(f"overload {i}") for i in range(calls))), timeout)
+
+    start = time.perf_counter()
+    try:
+        results = asyncio.run(run())
+    except asyncio.TimeoutError:
+        # Printed before exiting: interpreter shutdown may still block on the starved workers
+        print(f"[!] {calls} concurrent agenerate_response calls did not finish in {timeout:.0f} s", flush=True)
+        raise SystemExit(1)
+    finally:
+        router.close()
+    assert all("final_answer" in result for result in results), results
+    print(f"{calls} concurrent async calls on {router._executor._max_workers} router workers: "
+          f"{(time.perf_counter() - start) * 1e3:.0f} ms")
+
+
+def main():
+    servers = [
+        StubLLMServer(latency=0.02, responder=stalling_responder(0.03, 0.3, seed=1)),
+        StubLLMServer(latency=0.02, responder=stalling_responder(0.03, 0.3, seed=2)),
+        StubLLMServer(latency=0.05, responder=stalling_responder(0.03, 0.3, seed=3)),
+    ]
+    for server in servers:
+        server.start()
+    urls = [server.base_url for server in servers]
+    try:
+        single = LocalLLMEngine(base_url=urls[0], model_name="stub", pool_size=CLIENTS)
+        report("Single endpoint", drive(single))
+        single.close()
+
+        for label, ratio in (("Router, no hedging", 0.0), ("Router, hedged", 0.1)):
+            router = LLMRouter(urls, model_name="stub", pool_size=CLIENTS, max_hedge_ratio=ratio)
+            drive(router)  # Warm-up: fills the latency windows used for EWMA and hedging
+            report(label, drive(router))
+            stats = router.get_stats()
+            print(f"  {stats['requests']} requests, {stats['hedges']} hedges")
+            for url, endpoint in stats["endpoints"].items():
+                print(f"  {url}: ewma {endpoint['ewma_ms']:.1f} ms, p95 {endpoint['p95_ms']:.1f} ms, "
+                      f"{endpoint['requests']} requests, {endpoint['hedge_wins']}/{endpoint['hedges_sent']} "
+                      f"hedges won, {endpoint['failures']} failures")
+            router.close()
+        check_async_overload(urls)
+    finally:
+        for server in servers:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
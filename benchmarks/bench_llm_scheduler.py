@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark: micro-batching scheduler vs. independent requests.
+Many threads issue completions at slightly staggered times; the stub server
+records arrival times so we can see how tightly the requests are grouped.
+"""
+
+import os
+import sys
+import time
+import random
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from llm_engine import LocalLLMEngine
+from llm_scheduler import BatchingScheduler
+from stub_llm_server import StubLLMServer
+
+CLIENTS = 32
+
+
+def arrival_spread_ms(arrivals) -> float:
+    """Time between the first and last request reaching the server."""
+    return (max(arrivals) - min(arrivals)) * 1e3 if arrivals else 0.0
+
+
+def drive(backend, server: StubLLMServer) -> float:
+    """Runs one warm-up round (threads, pooled connections), then a measured one."""
+    _round(backend)
+    server.arrivals.clear()
+    return _round(backend)
+
+
+def _round(backend) -> float:
+    barrier = threading.Barrier(CLIENTS)
+
+    def client(i):
+        barrier.wait()
+        time.sleep(random.uniform(0, 0.004))  # Agents rarely finish their step at the same instant
+        backend.generate_response(f"task {i}")
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(CLIENTS)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def main():
+    random.seed(0)
+    with StubLLMServer(latency=0.02) as server:
+        engine = LocalLLMEngine(base_url=server.base_url, model_name="stub", pool_size=CLIENTS)
+
+        elapsed = drive(engine, server)
+        print(f"Direct:    {elapsed * 1e3:.1f} ms, arrivals spread over {arrival_spread_ms(server.arrivals):.1f} ms")
+
+        for dispatch_batches in (False, True):
+            scheduler = BatchingScheduler(engine, max_batch_size=CLIENTS, max_wait_ms=5,
+                                          dispatch_batches=dispatch_batches)
+            elapsed = drive(scheduler, server)
+            label = "Dispatched" if dispatch_batches else "Batched:  "
+            print(f"{label} {elapsed * 1e3:.1f} ms, arrivals spread over {arrival_spread_ms(server.arrivals):.1f} ms, "
+                  f"{len(server.arrivals)} HTTP requests")
+            print(f"           {scheduler.get_stats()}")
+            scheduler.close()
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
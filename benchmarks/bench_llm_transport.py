@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark: pooled keep-alive transport and streaming time-to-first-token.
+Runs LocalLLMEngine against the local stub server (no GPU required).
+"""
+
+import os
+import sys
+import time
+
+import requests
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from llm_engine import LocalLLMEngine
+from stub_llm_server import StubLLMServer
+
+REQUESTS = 200
+LONG_COMPLETION = "Thought: " + "token " * 200 + "\nAction: final_answer('done')"
+
+
+def bench_unpooled(server: StubLLMServer) -> float:
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        requests.post(
+            f"{server.base_url}/chat/completions",
+            json={"model": "stub", "messages": []},
+            headers={"Connection": "close"},
+            timeout=10
+        ).json()
+    return time.perf_counter() - start
+
+
+def bench_pooled(engine: LocalLLMEngine) -> float:
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        engine.generate_response("ping")
+    return time.perf_counter() - start
+
+
+def bench_ttft(engine: LocalLLMEngine):
+    start = time.perf_counter()
+    first = None
+    for _ in engine.generate_response("ping", stream=True):
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def main():
+    with StubLLMServer() as server:
+        before = len(server.connections)
+        unpooled = bench_unpooled(server)
+        unpooled_conns = len(server.connections) - before
+
+        engine = LocalLLMEngine(base_url=server.base_url, model_name="stub")
+        before = len(server.connections)
+        pooled = bench_pooled(engine)
+        pooled_conns = len(server.connections) - before
+
+        print(f"Per-request connection: {unpooled / REQUESTS * 1e3:.3f} ms/req ({unpooled_conns} connections)")
+        print(f"Pooled keep-alive:      {pooled / REQUESTS * 1e3:.3f} ms/req ({pooled_conns} connections)")
+        engine.close()
+
+    with StubLLMServer(responder=lambda p: LONG_COMPLETION, token_delay=0.002) as server:
+        engine = LocalLLMEngine(base_url=server.base_url, model_name="stub")
+        ttft, total = bench_ttft(engine)
+        print(f"Streaming: time-to-first-token {ttft * 1e3:.1f} ms, full completion {total * 1e3:.1f} ms")
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold start of the agent classes, in fresh interpreters.
+Reports the median wall time of a bare interpreter, importing the agent
+module, constructing the agent, and a worker process that runs one
+shell-only task end to end (scripted LLM, real shell). Uses
+`python -X importtime` to list the slowest imports and which heavy
+dependencies each step loaded; the last row is the cost of the
+dependencies the agent imported eagerly before subsystems became lazy.
+"""
+
+import os
+import sys
+import subprocess
+import statistics
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+RUNS = 7
+HEAVY = ("numpy", "cv2", "requests", "websockets", "pyautogui", "asyncio", "http.server")
+
+ONE_TASK = """
+from agent_advanced import NeuroSovereignAdvancedAgent
+from scripted_llm import ScriptedLLM
+agent = NeuroSovereignAdvancedAgent(max_iterations=3)
+agent.llm = ScriptedLLM({"turns": [
+    {"response": "Thought: Check.\\nAction: execute_shell('echo ready')"},
+    {"response": "Thought: Done.\\nAction: final_answer('ready')"}]})
+assert agent.execute("Report whether the worker is ready") == "ready"
+"""
+
+STEPS = (
+    ("interpreter", "pass"),
+    ("import agent_advanced", "import agent_advanced"),
+    ("construct agent", "import agent_advanced; agent_advanced.NeuroSovereignAdvancedAgent()"),
+    ("one shell-only task", ONE_TASK),
+)
+
+
+def run(code: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([SRC, BENCHMARKS]), PYTHONDONTWRITEBYTECODE="")
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    return subprocess.run(command, env=env, capture_output=True, text=True)
+
+
+def wall_ms(code: str) -> float:
+    import time
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = run(code)
+        samples.append((time.perf_counter() - start) * 1e3)
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return statistics.median(samples)
+
+
+def imports(code: str):
+    """(module, self us, cumulative us) for every import, from -X importtime."""
+    rows = []
+    for line in run(code, importtime=True).stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    run("import agent_advanced")  # Write bytecode caches first
+    print(f"Median of {RUNS} fresh interpreters")
+    print(f"{'step':<24}{'wall ms':>9}  heavy modules loaded")
+    for name, code in STEPS:
+        loaded = {module for module, _, _ in imports(code)}
+        heavy = ", ".join(module for module in HEAVY if module in loaded) or "-"
+        print(f"{name:<24}{wall_ms(code):>9.1f}  {heavy}")
+
+    eager = []
+    for module in HEAVY:
+        if run(f"import {module}").returncode == 0:
+            eager.append(module)
+    print(f"{'eager deps (before)':<24}{wall_ms('import ' + ', '.join(eager)):>9.1f}  {', '.join(eager)}")
+
+    print("\nSlowest imports of the one-task worker (self time):")
+    for module, self_us, cumulative_us in sorted(imports(ONE_TASK), key=lambda row: -row[1])[:10]:
+        print(f"  {module:<36}{self_us / 1e3:>7.1f} ms  (cumulative {cumulative_us / 1e3:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
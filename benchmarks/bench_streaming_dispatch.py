@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: streaming action dispatch vs. waiting for the full completion.
+The stub server decodes at a fixed per-token delay; every Think step has a
+tool call followed by trailing prose that a real model keeps generating.
+Streaming dispatch starts the tool once its Action line is complete and
+cancels the rest of the generation.
+"""
+
+import io
+import os
+import sys
+import time
+import contextlib
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from stub_llm_server import StubLLMServer
+
+TASKS = 5
+TOKEN_DELAY = 0.01  # 100 tokens/s
+TOOL_STEP = (
+    "Thought: I need to check whether the service is ready before reporting.\n"
+    "Action: execute_shell('sleep 0.3 && echo ready')\n"
+    "I expect this to print ready once the warm-up finishes. If it does not, I will inspect "
+    "the logs, check the process list and retry the command with a longer timeout before "
+    "reporting the status back to the user in a short summary."
+)
+ANSWER_STEP = (
+    "Thought: The service reported ready.\n"
+    "Action: final_answer('The service is ready.')\n"
+    "That completes the task; no further actions are required."
+)
+
+
+def responder(payload) -> str:
+    history = payload["messages"][-1]["content"].split("Current History:", 1)[-1]
+    return ANSWER_STEP if "Observation:" in history else TOOL_STEP
+
+
+def run(agent, server: StubLLMServer, stream_actions: bool):
+    agent.stream_actions = stream_actions
+    server.cancelled = server.tokens_generated = 0
+    durations = []
+    for i in range(TASKS):
+        agent.tools.invalidate()  # Every task runs its tool for real
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent.execute(f"Check that service {i} is ready")
+        durations.append(time.perf_counter() - start)
+    return sum(durations) / len(durations)
+
+
+def main():
+    with StubLLMServer(responder=responder, token_delay=TOKEN_DELAY) as server:
+        os.environ["LLM_BASE_URL"] = server.base_url
+        with contextlib.redirect_stdout(io.StringIO()):
+            from agent_advanced import NeuroSovereignAdvancedAgent
+            agent = NeuroSovereignAdvancedAgent(model_name="stub", max_iterations=4)
+
+        print(f"{TASKS} tasks, 2 Think steps each, {1 / TOKEN_DELAY:.0f} tokens/s decode")
+        for stream_actions in (False, True):
+            mean = run(agent, server, stream_actions)
+            label = "Streaming dispatch" if stream_actions else "Full completion   "
+            print(f"{label}: {mean * 1e3:7.1f} ms/task, {server.tokens_generated / TASKS:5.1f} tokens/task "
+                  f"decoded, {server.cancelled} generations cancelled")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cached UILocator vs. a full-screen multi-scale template search per click.
+A synthetic 1920x1080 screen with a dialog of buttons; text is being typed
+elsewhere, so every lookup sees a changed frame. Halfway through, the dialog
+moves, which the locator must pick up from the dirty regions alone.
+"""
+
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from screen_capture import CapturePipeline, FrameSource
+from ui_locator import UILocator
+
+LOOKUPS = 200
+BUTTONS = ("OK", "Cancel", "Submit", "Help")
+
+
+class Canvas(FrameSource):
+    """A screen the benchmark draws on directly."""
+
+    def __init__(self, width: int, height: int):
+        self.size = (width, height)
+        self.pixels = np.full((height, width, 3), (235, 235, 235), dtype=np.uint8)
+        self._typed = 0
+
+    def grab(self) -> np.ndarray:
+        return self.pixels
+
+    def type_glyph(self):
+        x, y = 80 + (self._typed % 150) * 10, 900 + (self._typed // 150 % 8) * 20
+        cv2.putText(self.pixels, chr(65 + self._typed % 26), (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (20, 20, 20), 1)
+        self._typed += 1
+
+
+def draw_dialog(pixels: np.ndarray, x: int, y: int, clear: bool = False):
+    color = (235, 235, 235) if clear else (250, 250, 250)
+    pixels[y:y + 220, x:x + 520] = color
+    if clear:
+        return
+    cv2.rectangle(pixels, (x, y), (x + 519, y + 219), (120, 120, 120), 1)
+    for i, label in enumerate(BUTTONS):
+        bx = x + 20 + i * 125
+        cv2.rectangle(pixels, (bx, y + 160), (bx + 110, y + 195), (70, 110, 200), -1)
+        cv2.putText(pixels, label, (bx + 12, y + 184), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+
+
+def button_template(label: str) -> np.ndarray:
+    pixels = np.full((220, 520, 3), 250, dtype=np.uint8)
+    draw_dialog(pixels, 0, 0)
+    i = BUTTONS.index(label)
+    return pixels[160:196, 20 + i * 125:131 + i * 125].copy()
+
+
+def run(cached: bool):
+    canvas = Canvas(1920, 1080)
+    draw_dialog(canvas.pixels, 300, 200)
+    pipeline = CapturePipeline(canvas)
+    locator = UILocator(pipeline)
+    for label in BUTTONS:
+        locator.register(label, button_template(label))
+    found, latencies = 0, []
+    for i in range(LOOKUPS):
+        if i == LOOKUPS // 2:
+            draw_dialog(canvas.pixels, 300, 200, clear=True)
+            draw_dialog(canvas.pixels, 1100, 400)
+        canvas.type_glyph()
+        if not cached:
+            locator.invalidate()
+        start = time.perf_counter()
+        match = locator.locate(BUTTONS[i % len(BUTTONS)])
+        latencies.append(time.perf_counter() - start)
+        expected_x = (300 if i < LOOKUPS // 2 else 1100) + 20 + (i % len(BUTTONS)) * 125
+        found += match is not None and abs(match.x - expected_x) <= 2
+    return sorted(latencies), found, locator.get_stats()
+
+
+def main():
+    print(f"{LOOKUPS} lookups of {len(BUTTONS)} buttons, 1920x1080, typing elsewhere; dialog moves halfway")
+    for label, cached in (("Full search", False), ("Cached locator", True)):
+        latencies, found, stats = run(cached)
+        pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1e3
+        print(f"{label:<16} p50 {pct(0.5):7.2f} ms  p95 {pct(0.95):7.2f} ms  "
+              f"correct {found}/{LOOKUPS}")
+        print(f"  hits {stats['cache_hits']}, verifications {stats['verifications']}, "
+              f"region searches {stats['region_searches']}, full searches {stats['full_searches']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: VectorMemory top-k search latency at 100k entries.
+Queries are shaped like the agent's recall query (task plus the first 200
+characters of the latest turn), plus short keyword queries for comparison.
+Checks that results match brute-force float cosine, and reports latency
+against the sub-millisecond target.
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from vector_memory import VectorMemory
+
+ENTRIES = 100_000
+QUERIES = 2_000
+CHECKED = 200
+VOCAB = [f"w{i}" for i in range(5_000)] + [
+    "disk", "usage", "directory", "created", "error", "permission", "denied",
+    "uptime", "load", "average", "file", "manifest", "network", "process"
+]
+
+
+def random_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(VOCAB) for _ in range(words))
+
+
+def main():
+    rng = random.Random(0)
+    memory = VectorMemory()
+
+    texts = [random_text(rng, 20) for _ in range(ENTRIES)]
+    agent_queries = [f"{random_text(rng, 8)} {texts[rng.randrange(ENTRIES)][:200]}" for _ in range(QUERIES)]
+    short_queries = [random_text(rng, 5) for _ in range(QUERIES)]
+    start = time.perf_counter()
+    for text in texts:
+        memory.add(text)
+    memory.search(agent_queries[0])  # Embeds the buffered entries
+    insert = time.perf_counter() - start
+    print(f"Insert: {ENTRIES / insert:,.0f} entries/s ({insert:.1f} s for {ENTRIES:,}, embedded on first search)")
+    for label, queries in (("agent recall query", agent_queries), ("5-word query", short_queries)):
+        latencies = []
+        for query in queries:
+            t0 = time.perf_counter()
+            memory.search(query, k=3)
+            latencies.append(time.perf_counter() - t0)
+        latencies = np.array(latencies) * 1e3
+        mean, p50, p99 = latencies.mean(), np.percentile(latencies, 50), np.percentile(latencies, 99)
+        verdict = "PASS" if mean < 1.0 else "FAIL"
+        print(f"Search @ {len(memory):,}, {label}: mean {mean:.3f} ms, p50 {p50:.3f} ms, p99 {p99:.3f} ms "
+              f"[{verdict} < 1 ms]")
+
+    # Exactness: same top-3 scores as brute-force float32 cosine over the unquantized embeddings
+    # (compared by score, since entries tied with the third one may come back in either order)
+    dense = np.stack([memory.embedder.embed(texts[i]) for i in range(ENTRIES)])
+    matches = 0
+    for query in agent_queries[:CHECKED]:
+        exact = np.sort(dense @ memory.embedder.embed(query))[::-1][:3]
+        found = [hit["score"] for hit in memory.search(query, k=3)]
+        matches += np.allclose(exact, found, rtol=0, atol=1e-5)
+    print(f"Top-3 identical to brute-force cosine: {matches}/{CHECKED} agent queries")
+    del dense
+    queries = agent_queries
+
+    t0 = time.perf_counter()
+    for entry_id in range(0, 10_000, 2):
+        memory.delete(entry_id)
+    print(f"Delete: {(time.perf_counter() - t0) / 5_000 * 1e6:.1f} us/entry")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "memory")
+        t0 = time.perf_counter()
+        memory.save(path)
+        saved = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        loaded = VectorMemory.load(path)
+        opened = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        loaded.search(queries[0])
+        print(f"Persist: save {saved * 1e3:.0f} ms, mmap load {opened * 1e3:.0f} ms, "
+              f"first query on mmap {(time.perf_counter() - t0) * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
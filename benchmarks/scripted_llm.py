@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Scriptable in-process LLM backend and fake shell for deterministic agent
+benchmarks. A scenario file lists the responses of each conversation turn
+and the output of each command, so a run exercises the whole agent loop
+(prompt building, parsing, dispatch, observations, memory) with no server,
+no subprocesses and no randomness.
+
+Scenario format (JSON):
+
+    {
+      "name": "long_conversation",
+      "task": "Audit the logs of service {i}",   # {i} is the session number
+      "sessions": 1,                             # >1 runs them on ConcurrentTaskRunner
+      "concurrency": 16,
+      "max_iterations": 80,
+      "stream_actions": false,
+      "latency": 0.05,                           # Seconds to first token
+      "tokens_per_second": 60,                   # Decode rate; null for instant
+      "turns": [
+        {"response": "Thought: ...\\nAction: execute_shell('cat log_{turn}.txt')", "repeat": 60},
+        {"response": "Thought: Done.\\nAction: final_answer('ok')"}
+      ],
+      "outputs": [
+        {"match": "^cat ", "bytes": 4096, "exit_code": 0}
+      ]
+    }
+
+Responses may use {i} (session) and {turn} (turn number). Past the last
+turn, the last response repeats.
+"""
+
+import os
+import re
+import sys
+import time
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from shell_pool import ShellResult
+
+_TASK_RE = re.compile(r"Task: (.*)")
+_TOKEN_RE = re.compile(r"\S*\s*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Word-ish tokens with trailing whitespace, as the stub server streams them."""
+    return [token for token in _TOKEN_RE.findall(text) if token]
+
+
+class ScriptedLLM:
+    """
+    Drop-in for LocalLLMEngine that answers from a scenario's turn list.
+    Each task (the "Task:" line of the prompt) advances its own turn counter,
+    so concurrent sessions with distinct tasks stay independent.
+
+    Latency is simulated from the scenario's first-token latency and decode
+    rate. With realtime=False nothing sleeps and the time is only added to
+    simulated_seconds, so a run measures the agent's own overhead.
+    """
+
+    def __init__(self, scenario: Dict[str, Any], realtime: bool = False):
+        self.turns: List[str] = []
+        for turn in scenario["turns"]:
+            self.turns.extend([turn["response"]] * turn.get("repeat", 1))
+        self.latency = scenario.get("latency", 0.0)
+        self.tokens_per_second = scenario.get("tokens_per_second")
+        self.realtime = realtime
+        self.model_name = "scripted"
+        self.cache = None
+        self.calls = 0
+        self.tokens_generated = 0
+        self.simulated_seconds = 0.0
+        self._positions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._positions.clear()
+            self.calls = 0
+            self.tokens_generated = 0
+            self.simulated_seconds = 0.0
+
+    def _next(self, prompt: str) -> str:
+        match = _TASK_RE.search(prompt)
+        task = match.group(1) if match else ""
+        session = re.search(r"\d+", task)
+        with self._lock:
+            turn = self._positions.get(task, 0)
+            self._positions[task] = turn + 1
+            self.calls += 1
+        template = self.turns[min(turn, len(self.turns) - 1)]
+        return template.replace("{i}", session.group(0) if session else "0").replace("{turn}", str(turn))
+
+    def _wait(self, seconds: float):
+        with self._lock:
+            self.simulated_seconds += seconds
+        if self.realtime and seconds > 0:
+            time.sleep(seconds)
+
+    def _token_seconds(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def generate_response(self, prompt: str, system_prompt: str = "You are NeuroSovereign.",
+                          stream: bool = False, stop: Optional[List[str]] = None) -> Union[str, Iterator[str]]:
+        text = self._next(prompt)
+        for sequence in stop or ():
+            text = text.split(sequence, 1)[0]
+        tokens = tokenize(text)
+        with self._lock:
+            self.tokens_generated += len(tokens)
+        if stream:
+            return self._stream(tokens)
+        self._wait(self.latency + len(tokens) * self._token_seconds())
+        return text
+
+    def _stream(self, tokens: List[str]) -> Iterator[str]:
+        self._wait(self.latency)
+        per_token = self._token_seconds()
+        for token in tokens:
+            self._wait(per_token)
+            yield token
+
+    async def agenerate_response(self, prompt: str, system_prompt: str = "You are NeuroSovereign.") -> str:
+        import asyncio  # Deferred so startup benchmarks of sync workers don't load it
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.generate_response, prompt, system_prompt)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"calls": self.calls, "tokens_generated": self.tokens_generated,
+                "simulated_seconds": self.simulated_seconds}
+
+
+class FakeShell:
+    """
+    Stands in for ShellPool: commands are matched against the scenario's
+    output rules and the sink receives a deterministic payload of the given
+    size (default: the command echoed back). Nothing is executed.
+    """
+
+    CHUNK = 64 * 1024
+
+    def __init__(self, outputs: Optional[List[Dict[str, Any]]] = None, size: int = 4):
+        self.rules = [(re.compile(rule["match"]), rule.get("bytes"), rule.get("exit_code", 0))
+                      for rule in outputs or ()]
+        self.size = size
+        self.commands = 0
+        self.bytes_written = 0
+
+    def run(self, command: str, timeout: float = 10.0, stdout_sink=None, stderr_sink=None) -> ShellResult:
+        size, exit_code = None, 0
+        for pattern, rule_size, rule_exit in self.rules:
+            if pattern.search(command):
+                size, exit_code = rule_size, rule_exit
+                break
+        line = f"{command}\n".encode()
+        payload = line if size is None else (line * (size // len(line) + 1))[:size]
+        if stdout_sink is not None:
+            for offset in range(0, len(payload), self.CHUNK):
+                stdout_sink.write(payload[offset:offset + self.CHUNK])
+        self.commands += 1
+        self.bytes_written += len(payload)
+        stdout = "" if stdout_sink is not None else payload.decode()
+        return ShellResult(command, exit_code, stdout, "", 0.0)
+
+    def close(self):
+        pass
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Local stub of an OpenAI-compatible inference server.
+Used to exercise and benchmark the LLM transport without a GPU.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Required for keep-alive
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.stub.record_arrival(self)
+        self._send_json({"status": "ok"})
+
+    def do_POST(self):
+        stub = self.server.stub
+        stub.record_arrival(self)
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if stub.latency:
+            time.sleep(stub.latency)
+
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+
+        text = stub.responder(payload)
+        for stop in payload.get("stop") or ():
+            text = text.split(stop, 1)[0]
+        if payload.get("stream"):
+            self._send_stream(text, stub.token_delay)
+        else:
+            tokens = len(_tokenize(text))
+            if stub.token_delay:
+                time.sleep(tokens * stub.token_delay)  # Decode the whole completion first
+            stub.count_tokens(tokens)
+            self._send_json({
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}}]
+            })
+
+    def _send_json(self, body: Dict):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, text: str, token_delay: float):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in _tokenize(text):
+                chunk = {"choices": [{"index": 0, "delta": {"content": token}}]}
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.server.stub.count_tokens(1)
+                if token_delay:
+                    time.sleep(token_delay)
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client cancelled the generation early
+            with self.server.stub._lock:
+                self.server.stub.cancelled += 1
+            self.close_connection = True
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def _tokenize(text: str) -> List[str]:
+    """Splits text into word-ish tokens, keeping whitespace attached."""
+    tokens, current = [], ""
+    for ch in text:
+        current += ch
+        if ch in " \n":
+            tokens.append(current)
+            current = ""
+    if current:
+        tokens.append(current)
+    return tokens
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # Many agents connect at once; the default backlog of 5 drops SYNs
+
+    def handle_error(self, request, client_address):
+        pass  # Clients dropping idle keep-alive connections is expected
+
+
+class StubLLMServer:
+    """
+    Threaded stub server speaking /chat/completions (plain and SSE).
+    Records request arrival times, distinct client connections, generated
+    tokens and streams cancelled by the client.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 responder: Optional[Callable[[Dict], str]] = None,
+                 latency: float = 0.0, token_delay: float = 0.0):
+        self.responder = responder or (lambda payload: "Thought: Done.\nAction: final_answer('ok')")
+        self.latency = latency
+        self.token_delay = token_delay
+        self.arrivals: List[float] = []
+        self.connections = set()
+        self.cancelled = 0
+        self.tokens_generated = 0
+        self._lock = threading.Lock()
+        self._httpd = _QuietHTTPServer((host, port), _StubHandler)
+        self._httpd.stub = self
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def record_arrival(self, handler: BaseHTTPRequestHandler):
+        with self._lock:
+            self.arrivals.append(time.perf_counter())
+            self.connections.add(handler.client_address)
+
+    def count_tokens(self, tokens: int):
+        with self._lock:
+            self.tokens_generated += tokens
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    server = StubLLMServer(port=8000, token_delay=0.01).start()
+    print(f"[*] Stub LLM server listening on {server.base_url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
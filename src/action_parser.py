@@ -0,0 +1,434 @@
+import re
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# An `Action:` marker, or a JSON object/array opening a line
+_ANCHOR_RE = re.compile(r"\bActions?[ \t]*:|^[ \t]*[{\[]", re.MULTILINE)
+_IDENT_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_.]*")
+_NUMBER_RE = re.compile(r"-?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?")
+_WS_RE = re.compile(r"\s*")
+_INLINE_WS_RE = re.compile(r"[ \t]*")
+_BULLET_RE = re.compile(r"(?:[-*][ \t]+|\d+[.)][ \t]+)?`?")
+# A bullet whose spacing has not arrived yet
+_PARTIAL_BULLET_RE = re.compile(r"[-*]|\d+[.)]?")
+_SEPARATOR_RE = re.compile(r"[ \t,;]*(?:\r?\n[ \t]*)?")
+# Fast path for the common `tool("plain string")` / `tool()` shape
+_SIMPLE_CALL_RE = re.compile(r"""([A-Za-z_][A-Za-z0-9_.]*)\((?:[ \t]*"([^"\\\n]*)"|[ \t]*'([^'\\\n]*)')?[ \t]*\)""")
+_STRING_STOP = {'"': re.compile(r'["\\]'), "'": re.compile(r"['\\]")}
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "0": "\0", "b": "\b", "f": "\f"}
+_CONSTANTS = {"True": True, "False": False, "None": None, "true": True, "false": False, "null": None}
+
+class ActionSyntaxError(ValueError):
+    """Raised internally when a tool call or literal cannot be parsed."""
+
+class ParsedAction:
+    """One tool invocation extracted from a model response."""
+
+    __slots__ = ("name", "args", "kwargs", "span", "error")
+
+    def __init__(self, name: str, args: Sequence[Any] = (), kwargs: Optional[Dict[str, Any]] = None,
+                 span: Tuple[int, int] = (0, 0), error: Optional[str] = None):
+        self.name = name
+        self.args = list(args)
+        self.kwargs = kwargs or {}
+        self.span = span
+        self.error = error
+
+    def params(self, signature: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Merges positional args into keyword params using the tool's parameter names."""
+        params = dict(self.kwargs)
+        for i, value in enumerate(self.args):
+            name = signature[i] if signature and i < len(signature) else f"arg{i}"
+            params.setdefault(name, value)
+        return params
+
+    def __repr__(self) -> str:
+        if self.error:
+            return f"ParsedAction({self.name!r}, error={self.error!r})"
+        return f"ParsedAction({self.name!r}, args={self.args!r}, kwargs={self.kwargs!r})"
+
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, ParsedAction) and self.name == other.name
+                and self.args == other.args and self.kwargs == other.kwargs and self.error == other.error)
+
+class ActionParser:
+    """
+    Single-pass extractor of tool calls from LLM responses.
+
+    Recognizes `Action: tool(args)` lines (several calls may follow one marker,
+    separated by `;`, `,` or new bullet lines) and native JSON tool-call objects
+    such as {"name": ..., "arguments": {...}} or OpenAI-style "tool_calls",
+    when they start a line or directly follow `Action:`.
+    Arguments are parsed as typed literals: strings (with escapes), numbers,
+    booleans, null/None, lists and dicts, positional or `key=value`. Unquoted
+    arguments (`execute_shell(ls -la)`) are passed through verbatim as a single
+    string; a call with unbalanced parentheses is returned with `error` set
+    instead of being guessed at.
+    """
+
+    def parse(self, text: str, pos: int = 0, in_block: bool = False) -> List[ParsedAction]:
+        """
+        Returns the actions found from pos on. With in_block, pos is the end of
+        a call in an `Action:` block and the block's further calls are included.
+        """
+        actions: List[ParsedAction] = []
+        if in_block:
+            pos = self._parse_calls(text, pos, actions, continuing=True)
+        while True:
+            match = _ANCHOR_RE.search(text, pos)
+            if match is None:
+                return actions
+            if match.group().endswith(":"):
+                start = _WS_RE.match(text, match.end()).end()
+                end = self._parse_json(text, start, actions) if text.startswith(("{", "["), start) else None
+                pos = end if end is not None else self._parse_calls(text, match.end(), actions)
+            else:
+                start = match.end() - 1
+                end = self._parse_json(text, start, actions)
+                pos = end if end is not None else start + 1
+
+    @staticmethod
+    def _parse_json(text: str, pos: int, actions: List[ParsedAction]) -> Optional[int]:
+        """Adds the tool calls of the JSON value at pos; returns its end, or None if it is not JSON."""
+        try:
+            value, end = _Scanner(text, pos).value_with_end()
+        except ActionSyntaxError:
+            return None
+        actions.extend(_tool_calls_from_json(value, (pos, end)))
+        return end
+
+    def _parse_calls(self, text: str, pos: int, actions: List[ParsedAction], continuing: bool = False) -> int:
+        scanner = _Scanner(text, pos)
+        if continuing:
+            scanner.skip_char("`")
+            scanner.skip(_SEPARATOR_RE)
+        else:
+            scanner.skip(_WS_RE)
+        while True:
+            scanner.skip(_BULLET_RE)
+            simple = _SIMPLE_CALL_RE.match(text, scanner.pos)
+            if simple is not None:
+                name, double, single = simple.groups()
+                args = [] if double is None and single is None else [single if double is None else double]
+                actions.append(ParsedAction(name, args, {}, simple.span()))
+                scanner.pos = simple.end()
+                scanner.skip_char("`")
+                scanner.skip(_SEPARATOR_RE)
+                continue
+            name_match = _IDENT_RE.match(text, scanner.pos)
+            if name_match is None:
+                return scanner.pos
+            after_name = _INLINE_WS_RE.match(text, name_match.end()).end()
+            if after_name >= len(text) or text[after_name] != "(":
+                return scanner.pos
+            start = scanner.pos
+            scanner.pos = after_name
+            try:
+                args, kwargs = scanner.call_arguments()
+                if len(args) == 1 and not kwargs and isinstance(args[0], dict):
+                    args, kwargs = [], args[0]  # tool({"key": value}) style
+            except ActionSyntaxError:
+                scanner.pos = after_name
+                try:
+                    args, kwargs = [scanner.raw_arguments()], {}
+                except ActionSyntaxError as e:
+                    end = scanner.skip_to_line_end()
+                    actions.append(ParsedAction(name_match.group(), span=(start, end), error=str(e)))
+                    return end
+            actions.append(ParsedAction(name_match.group(), args, kwargs, (start, scanner.pos)))
+            scanner.skip_char("`")
+            scanner.skip(_SEPARATOR_RE)
+
+class _Scanner:
+    """Recursive-descent reader for Python/JSON-style literals and call arguments."""
+
+    __slots__ = ("text", "pos")
+
+    def __init__(self, text: str, pos: int = 0):
+        self.text = text
+        self.pos = pos
+
+    def error(self, message: str) -> ActionSyntaxError:
+        return ActionSyntaxError(f"{message} at offset {self.pos}")
+
+    def skip(self, pattern: "re.Pattern"):
+        self.pos = pattern.match(self.text, self.pos).end()
+
+    def skip_char(self, char: str):
+        if self.text.startswith(char, self.pos):
+            self.pos += 1
+
+    def skip_to_line_end(self) -> int:
+        end = self.text.find("\n", self.pos)
+        self.pos = len(self.text) if end < 0 else end
+        return self.pos
+
+    def expect(self, char: str):
+        self.skip(_WS_RE)
+        if not self.text.startswith(char, self.pos):
+            raise self.error(f"expected {char!r}")
+        self.pos += 1
+
+    def value_with_end(self) -> Tuple[Any, int]:
+        return self.value(), self.pos
+
+    def value(self) -> Any:
+        self.skip(_WS_RE)
+        if self.pos >= len(self.text):
+            raise self.error("unexpected end of input")
+        char = self.text[self.pos]
+        if char in "\"'":
+            return self.string()
+        if char == "{":
+            return self.mapping()
+        if char == "[":
+            return self.sequence("]")
+        if char == "(":
+            return self.sequence(")")
+        number = _NUMBER_RE.match(self.text, self.pos)
+        if number:
+            self.pos = number.end()
+            literal = number.group()
+            return float(literal) if any(c in literal for c in ".eE") else int(literal)
+        ident = _IDENT_RE.match(self.text, self.pos)
+        if ident and ident.group() in _CONSTANTS:
+            self.pos = ident.end()
+            return _CONSTANTS[ident.group()]
+        raise self.error(f"unexpected {char!r}")
+
+    def string(self) -> str:
+        text = self.text
+        quote = text[self.pos]
+        if text.startswith(quote * 3, self.pos):
+            end = text.find(quote * 3, self.pos + 3)
+            if end < 0:
+                raise self.error("unterminated string")
+            value = text[self.pos + 3:end]
+            self.pos = end + 3
+            return value
+        stop = _STRING_STOP[quote]
+        pieces = []
+        pos = self.pos + 1
+        while True:
+            match = stop.search(text, pos)
+            if match is None:
+                raise self.error("unterminated string")
+            pieces.append(text[pos:match.start()])
+            if match.group() == quote:
+                self.pos = match.end()
+                return "".join(pieces)
+            escaped = text[match.end():match.end() + 1]
+            if escaped == "u" and re.match(r"[0-9a-fA-F]{4}", text[match.end() + 1:match.end() + 5]):
+                pieces.append(chr(int(text[match.end() + 1:match.end() + 5], 16)))
+                pos = match.end() + 5
+            else:
+                pieces.append(_ESCAPES.get(escaped, escaped))
+                pos = match.end() + 1
+
+    def mapping(self) -> Dict[Any, Any]:
+        self.pos += 1
+        result = {}
+        self.skip(_WS_RE)
+        if self.text.startswith("}", self.pos):
+            self.pos += 1
+            return result
+        while True:
+            self.skip(_WS_RE)
+            ident = _IDENT_RE.match(self.text, self.pos)
+            if ident and ident.group() not in _CONSTANTS:
+                key = ident.group()  # Bare keys: {command: "ls"}
+                self.pos = ident.end()
+            else:
+                key = self.value()
+            self.expect(":")
+            result[key] = self.value()
+            self.skip(_WS_RE)
+            if self.text.startswith(",", self.pos):
+                self.pos += 1
+                self.skip(_WS_RE)
+                if self.text.startswith("}", self.pos):
+                    self.pos += 1
+                    return result
+                continue
+            self.expect("}")
+            return result
+
+    def sequence(self, closer: str) -> List[Any]:
+        self.pos += 1
+        result = []
+        while True:
+            self.skip(_WS_RE)
+            if self.text.startswith(closer, self.pos):
+                self.pos += 1
+                return result
+            result.append(self.value())
+            self.skip(_WS_RE)
+            if self.text.startswith(",", self.pos):
+                self.pos += 1
+            elif not self.text.startswith(closer, self.pos):
+                raise self.error(f"expected ',' or {closer!r}")
+
+    def call_arguments(self) -> Tuple[List[Any], Dict[str, Any]]:
+        """Parses `(a, b, key=value)` starting at the opening parenthesis."""
+        self.pos += 1
+        args, kwargs = [], {}
+        while True:
+            self.skip(_WS_RE)
+            if self.text.startswith(")", self.pos):
+                self.pos += 1
+                return args, kwargs
+            ident = _IDENT_RE.match(self.text, self.pos)
+            after = _WS_RE.match(self.text, ident.end()).end() if ident else -1
+            if ident and self.text.startswith("=", after) and not self.text.startswith("==", after):
+                self.pos = after + 1
+                kwargs[ident.group()] = self.value()
+            else:
+                args.append(self.value())
+            self.skip(_WS_RE)
+            if self.text.startswith(",", self.pos):
+                self.pos += 1
+            elif not self.text.startswith(")", self.pos):
+                raise self.error("expected ',' or ')'")
+
+    def raw_arguments(self) -> str:
+        """
+        Returns the verbatim text up to the matching parenthesis, for unquoted
+        arguments such as `execute_shell(ls -la)`. Quotes and nesting are honoured.
+        """
+        text = self.text
+        depth = 0
+        quote = None
+        start = self.pos + 1
+        for i in range(self.pos, len(text)):
+            char = text[i]
+            if quote:
+                if char == quote and text[i - 1] != "\\":
+                    quote = None
+            elif char in "\"'":
+                quote = char
+            elif char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+                if depth == 0:
+                    self.pos = i + 1
+                    return text[start:i].strip()
+            elif char == "\n" and depth == 1:
+                break
+        raise self.error("unbalanced parentheses")
+
+def _tool_calls_from_json(value: Any, span: Tuple[int, int]) -> List[ParsedAction]:
+    """Extracts tool calls from a decoded JSON value (object, list or tool_calls wrapper)."""
+    if isinstance(value, list):
+        return [action for item in value for action in _tool_calls_from_json(item, span)]
+    if not isinstance(value, dict):
+        return []
+    if isinstance(value.get("tool_calls"), list):
+        return _tool_calls_from_json(value["tool_calls"], span)
+    if isinstance(value.get("function"), dict):
+        return _tool_calls_from_json(value["function"], span)
+    name = value.get("name") or value.get("tool") or value.get("action")
+    if not isinstance(name, str):
+        return []
+    arguments = value.get("arguments", value.get("args", value.get("parameters", value.get("input", {}))))
+    if isinstance(arguments, str):
+        try:
+            arguments = json.loads(arguments)
+        except ValueError:
+            return [ParsedAction(name, span=span, error="arguments are not valid JSON")]
+    if isinstance(arguments, list):
+        return [ParsedAction(name, arguments, {}, span)]
+    if isinstance(arguments, dict):
+        return [ParsedAction(name, [], arguments, span)]
+    return [ParsedAction(name, [arguments], {}, span)]
+
+def parse_actions(text: str) -> List[ParsedAction]:
+    """Convenience wrapper around a shared ActionParser."""
+    return _DEFAULT_PARSER.parse(text)
+
+_DEFAULT_PARSER = ActionParser()
+
+class StreamingActionParser:
+    """
+    Incremental front end to ActionParser for token streams.
+
+    feed() returns actions as soon as their closing parenthesis (or brace) has
+    arrived, so a tool can start while the model is still decoding. `done`
+    turns true once the text after the last action can no longer continue the
+    action block (e.g. a prose line or a hallucinated "Observation:"), which is
+    the caller's cue to cancel the rest of the generation.
+    """
+
+    def __init__(self, parser: Optional[ActionParser] = None):
+        self.parser = parser or _DEFAULT_PARSER
+        self._chunks: List[str] = []
+        self._text = ""
+        self._emitted = 0
+        self._last_end = 0
+        # Where the next parse starts, and whether it continues an `Action:` block there
+        self._resume = 0
+        self._in_block = False
+        self.done = False
+
+    @property
+    def text(self) -> str:
+        if self._chunks:
+            self._text += "".join(self._chunks)
+            self._chunks.clear()
+        return self._text
+
+    def feed(self, delta: str) -> List[ParsedAction]:
+        self._chunks.append(delta)
+        if self.done:
+            return []
+        fresh = []
+        if any(c in delta for c in ")}]\n"):  # Nothing can complete without a closer
+            text = self.text
+            for action in self.parser.parse(text, self._resume, self._in_block):
+                if action.error:
+                    break  # Possibly just incomplete; settled in close()
+                fresh.append(action)
+                self._last_end = self._resume = action.span[1]
+                self._in_block = text[action.span[0]] not in "{["
+                if action.name == "final_answer":
+                    self.done = True
+                    break
+            self._emitted += len(fresh)
+            if not self._in_block:
+                # Nothing before the next anchor can start an action; an incomplete last
+                # line may still grow into one
+                match = _ANCHOR_RE.search(text, self._resume)
+                self._resume = match.start() if match else max(self._resume, text.rfind("\n") + 1)
+        if self._emitted and not self.done:
+            self.done = _continues_block(self.text, self._last_end) is False
+        return fresh
+
+    def close(self) -> List[ParsedAction]:
+        """End of stream: returns the remaining actions, including malformed ones."""
+        if self.done and self._emitted:
+            return []
+        rest = self.parser.parse(self.text, self._resume, self._in_block)
+        self._emitted += len(rest)
+        self.done = True
+        return rest
+
+def _continues_block(text: str, pos: int) -> Optional[bool]:
+    """
+    Whether the text after an action continues the action block: True if
+    another call starts, False if something else does, None if undecided yet.
+    """
+    pos = _SEPARATOR_RE.match(text, text.startswith("`", pos) and pos + 1 or pos).end()
+    if _PARTIAL_BULLET_RE.fullmatch(text, pos):
+        return None
+    pos = _BULLET_RE.match(text, pos).end()
+    if pos >= len(text):
+        return None
+    ident = _IDENT_RE.match(text, pos)
+    if ident is None:
+        return False
+    after = _INLINE_WS_RE.match(text, ident.end()).end()
+    if after >= len(text):
+        return None
+    if ident.group() in ("Action", "Actions"):
+        return text[after] == ":"
+    return text[after] == "("
@@ -1,46 +1,105 @@
-import os
-import json
-import time
-from typing import List, Dict, Any
+from typing import List, Dict
 try:
     from .pc_control import PCControlModule
-    from .llm_engine import LocalLLMEngine
+    from .llm_router import create_llm_backend
+    from .context_builder import ContextBuilder
+    from .memory_store import MemoryStore
+    from .vector_memory import VectorMemory
+    from .observation import Observation, ObservationStore
+    from .action_parser import ActionParser
+    from .shell_pool import is_idempotent_command, is_read_only_command, referenced_paths
+    from .tool_registry import ToolRegistry, ToolParam, PURE, READ_ONLY, WRITE, GUI
+    from .lazy_loader import LazyComponent, is_loaded
 except ImportError:
     from pc_control import PCControlModule
-    from llm_engine import LocalLLMEngine
+    from llm_router import create_llm_backend
+    from context_builder import ContextBuilder
+    from memory_store import MemoryStore
+    from vector_memory import VectorMemory
+    from observation import Observation, ObservationStore
+    from action_parser import ActionParser
+    from shell_pool import is_idempotent_command, is_read_only_command, referenced_paths
+    from tool_registry import ToolRegistry, ToolParam, PURE, READ_ONLY, WRITE, GUI
+    from lazy_loader import LazyComponent, is_loaded
 
 class NeuroSovereignAgent:
     """
     The core agent class for NeuroSovereign Systems.
     Designed for high-level reasoning, autonomous planning, and tool execution.
     """
+    # Created on first use (see lazy_loader)
+    pc_control = LazyComponent(lambda self: PCControlModule())
+    llm = LazyComponent(lambda self: create_llm_backend(self.model_name))
+    retrieval = LazyComponent(lambda self: VectorMemory())
+
     def __init__(self, model_name: str = "DeepSeek-V3"):
         self.name = "NeuroSovereign"
-        self.pc_control = PCControlModule()
-        self.llm = LocalLLMEngine(model_name=model_name)
-        self.memory = []
+        self.model_name = model_name
+        self.memory = MemoryStore()
+        self._task_retrieval_ids: List[int] = []
+        self.observations = ObservationStore()
+        self.tools = self._build_tools()
+        self.context = ContextBuilder(self._get_system_prompt())
+        self.action_parser = ActionParser()
         self.max_iterations = 10
         print(f"[*] {self.name} Agent Core Online. Model: {model_name}")
 
     def _get_system_prompt(self) -> str:
-        return """You are NeuroSovereign, a sovereign and autonomous AI agent. 
+        return f"""You are NeuroSovereign, a sovereign and autonomous AI agent. 
 Your goal is to assist the user by executing complex tasks across the system.
 You have access to tools for PC control, shell execution, and web browsing.
 Always think step-by-step. Plan your actions, execute them, and reflect on the results.
 You are independent and do not rely on external centralized services.
+
+Available Tools:
+{self.tools.render_prompt()}
+
+Format your response as:
+Thought: <your reasoning>
+Action: <tool_name>(<params>)
 """
 
+    def _build_tools(self) -> ToolRegistry:
+        """Declares every tool once; prompt, argument mapping and dispatch are derived from it."""
+        tools = ToolRegistry()
+        tools.register(
+            "execute_shell", self._run_shell,
+            [ToolParam("command", str), ToolParam("timeout", float, None)],
+            description="Run a terminal command.",
+            side_effects=lambda p: READ_ONLY if is_read_only_command(p["command"]) else WRITE,
+            timeout=10.0, cacheable=lambda p: is_idempotent_command(p["command"]),
+            watch=lambda p: referenced_paths(p["command"])
+        )
+        tools.register(
+            "pc_control_click", lambda x, y: self.pc_control.move_and_click(x, y) or f"Clicked at ({x}, {y})",
+            [ToolParam("x", int), ToolParam("y", int)], description="Click on screen.", side_effects=GUI
+        )
+        tools.register(
+            "pc_control_type", lambda text: self.pc_control.type_text(text) or f"Typed {len(text)} characters",
+            [ToolParam("text", str)], description="Type text.", side_effects=GUI
+        )
+        tools.register(
+            "read_observation", lambda id, offset, length: self.observations.read(id, offset, length),
+            [ToolParam("id", str), ToolParam("offset", int, 0), ToolParam("length", int, 2048)],
+            description="Page through a truncated tool output.", side_effects=PURE
+        )
+        tools.register("final_answer", None, [ToolParam("text", str)],
+                       description="Provide the final result to the user.", side_effects=PURE)
+        return tools
+
     def run(self, task: str):
         """Main execution loop (Think-Act-Observe)."""
         print(f"\n[Task]: {task}")
-        self.memory.append({"role": "user", "content": task})
+        self.memory.append("user", task)
+        self.context.reset(task)
+        self._task_retrieval_ids.clear()
         
         for i in range(self.max_iterations):
             print(f"\n[Iteration {i+1}] Thinking...")
             
             # 1. Think & Plan
             prompt = self._build_prompt()
-            response = self.llm.generate_response(prompt, self._get_system_prompt())
+            response = self.llm.generate_response(prompt, self.context.stable_prefix)
             
             print(f"[Thought]: {response}")
             
@@ -52,56 +111,68 @@ You are independent and do not rely on external centralized services.
                 
             # 3. Execute Action
             print(f"[Action]: Executing {action['name']} with {action['params']}")
-            observation = self._execute_tool(action['name'], action['params'])
+            if "error" in action:
+                observation = f"Could not parse action {action['name']}: {action['error']}"
+            else:
+                observation = self._execute_tool(action['name'], action['params'])
             
             print(f"[Observation]: {observation}")
-            self.memory.append({"role": "assistant", "content": response})
-            self.memory.append({"role": "system", "content": f"Observation: {observation}"})
+            self._remember("assistant", response)
+            self._remember("system", f"Observation: {observation}")
 
-    def _build_prompt(self) -> str:
-        history = ""
-        for m in self.memory[-5:]: # Last 5 interactions
-            history += f"{m['role']}: {m['content']}\n"
-        
-        return f"""Current History:
-{history}
+    def _remember(self, role: str, content: str):
+        self.memory.append(role, content)
+        self.context.add_turn(role, content)
+        if role != "user":
+            self._task_retrieval_ids.append(self.retrieval.add(content[:500]))
 
-Available Tools:
-- execute_shell(command: str): Run a terminal command.
-- pc_control_click(x: int, y: int): Click on screen.
-- pc_control_type(text: str): Type text.
-- final_answer(text: str): Provide the final result to the user.
+    def _run_shell(self, command: str, timeout: float = 10.0) -> Observation:
+        """Runs a shell command, capturing its output as a bounded observation."""
+        capture = self.observations.capture(source=command)
+        result = self.pc_control.execute_os_command_streamed(command, capture, timeout=timeout)
+        if result.timed_out:
+            capture.write(b"\nError: Command execution timed out.")
+        return capture.close(result.exit_code)
 
-Format your response as:
-Thought: <your reasoning>
-Action: <tool_name>(<params>)
-"""
+    def _recall(self, k: int = 3) -> List[str]:
+        """Top-k past observations/thoughts relevant to the task, excluding turns still in context."""
+        if not is_loaded(self, "retrieval"):
+            return []  # Nothing has been remembered yet
+        resident = self.context.resident_turns
+        exclude = set(self._task_retrieval_ids[-resident:]) if resident else set()
+        if len(self.retrieval) <= len(exclude):
+            return []  # Everything remembered is still in the prompt: don't embed anything yet
+        query = f"{self.context.task} {self.memory[-1].content[:200]}"
+        hits = self.retrieval.search(query, k=k, exclude=exclude)
+        return [hit["text"] for hit in hits]
+
+    def _build_prompt(self) -> str:
+        return self.context.render(self._recall())
 
     def _parse_action(self, response: str) -> Dict:
-        if "Action:" in response:
-            action_line = response.split("Action:")[1].strip()
-            if "(" in action_line and ")" in action_line:
-                name = action_line.split("(")[0]
-                params_str = action_line.split("(")[1].split(")")[0]
-                # Simple param parsing
-                params = {}
-                if params_str:
-                    if ":" in params_str: # dict-like
-                        try: params = json.loads(params_str.replace("'", "\""))
-                        except: params = {"raw": params_str}
-                    else:
-                        params = {"cmd": params_str.strip("'\"")}
-                return {"name": name, "params": params}
-        return {"name": "final_answer", "params": {}}
+        actions = self.action_parser.parse(response)
+        if not actions:
+            return {"name": "final_answer", "params": {}}
+        action = actions[0]
+        parsed = {"name": action.name, "params": action.params(self.tools.signature(action.name))}
+        if action.error:
+            parsed["error"] = action.error
+        return parsed
+
+    def _execute_tool(self, name: str, params: Dict) -> Observation:
+        try:
+            output = self.tools.call(name, params)
+            if isinstance(output, Observation):
+                return output
+        except Exception as e:
+            output = f"Error executing {name}: {e}"
+        return self.observations.from_text(str(output), source=name)
 
-    def _execute_tool(self, name: str, params: Dict) -> str:
-        if name == "execute_shell":
-            cmd = params.get("cmd")
-            return os.popen(cmd).read()
-        elif name.startswith("pc_control"):
-            return self.pc_control.execute(name, params)
-        return f"Unknown tool: {name}"
+    def close(self):
+        """Deletes spilled tool outputs (also done on garbage collection and at exit)."""
+        self.observations.close()
 
 if __name__ == "__main__":
     agent = NeuroSovereignAgent()
     agent.run("Create a new directory named 'Sovereign_Data' and list the files.")
+    agent.close()
@@ -1,20 +1,52 @@
 import os
+import copy
 import json
 import time
+import itertools
+import threading
 import subprocess
-from typing import List, Dict, Any, Optional
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from collections import deque
+from typing import List, Dict, Any, Deque, Optional, Tuple
 from datetime import datetime
 
 try:
     from .pc_control import PCControlModule
-    from .llm_engine import LocalLLMEngine
+    from .llm_router import create_llm_backend
     from .live_interaction import LiveInteractionModule
     from .self_evolution import SelfEvolutionModule
+    from .context_builder import ContextBuilder
+    from .memory_store import MemoryStore
+    from .vector_memory import VectorMemory
+    from .observation import Observation, ObservationStore
+    from .action_parser import ActionParser, ParsedAction, StreamingActionParser
+    from .shell_pool import is_idempotent_command, is_read_only_command, referenced_paths
+    from .tool_registry import ToolRegistry, ToolParam, ToolError, PURE, READ_ONLY, WRITE, GUI
+    from .plan_cache import PlanCache
+    from .instrumentation import METRICS, Tracer
+    from .lazy_loader import LazyComponent, is_loaded, lazy_import
 except ImportError:
     from pc_control import PCControlModule
-    from llm_engine import LocalLLMEngine
+    from llm_router import create_llm_backend
     from live_interaction import LiveInteractionModule
     from self_evolution import SelfEvolutionModule
+    from context_builder import ContextBuilder
+    from memory_store import MemoryStore
+    from vector_memory import VectorMemory
+    from observation import Observation, ObservationStore
+    from action_parser import ActionParser, ParsedAction, StreamingActionParser
+    from shell_pool import is_idempotent_command, is_read_only_command, referenced_paths
+    from tool_registry import ToolRegistry, ToolParam, ToolError, PURE, READ_ONLY, WRITE, GUI
+    from plan_cache import PlanCache
+    from instrumentation import METRICS, Tracer
+    from lazy_loader import LazyComponent, is_loaded, lazy_import
+
+# Event loop machinery is only needed by the async entry points
+asyncio = lazy_import("asyncio")
+
+# Distinguishes the gauges of agents exported from one process
+_AGENT_IDS = itertools.count(1)
 
 class NeuroSovereignAdvancedAgent:
     """
@@ -22,20 +54,45 @@ class NeuroSovereignAdvancedAgent:
     Implements autonomous reasoning, execution, and self-improvement.
     """
     
-    def __init__(self, model_name: str = "DeepSeek-V3", max_iterations: int = 10):
+    # Models tend to continue with an imagined tool result; the real one is appended by the agent
+    STOP_SEQUENCES = ["\nObservation:"]
+    
+    # Subsystems are created on first use, so a shell-only task never loads the GUI,
+    # streaming or HTTP stacks; sessions resolve them on the agent that spawned them
+    llm = LazyComponent(lambda self: self._component("llm", lambda: create_llm_backend(self.model_name)))
+    pc_control = LazyComponent(lambda self: self._component("pc_control", PCControlModule))
+    live_interaction = LazyComponent(lambda self: self._component("live_interaction", LiveInteractionModule))
+    evolution = LazyComponent(lambda self: self._component("evolution", SelfEvolutionModule))
+    retrieval = LazyComponent(lambda self: self._component("retrieval", VectorMemory))
+    # Independent read-only actions of one response run concurrently, one per shell worker
+    _tool_executor = LazyComponent(lambda self: self._component("_tool_executor", lambda: ThreadPoolExecutor(
+        max_workers=self.pc_control.shell.size, thread_name_prefix="ns-tool")))
+    
+    def __init__(self, model_name: str = "DeepSeek-V3", max_iterations: int = 10,
+                 stream_actions: bool = False, plan_cache: Optional[PlanCache] = None):
         self.name = "NeuroSovereign"
         self.version = "2.0-Advanced"
         self.model_name = model_name
         self.max_iterations = max_iterations
+        # Streamed Think steps dispatch each action as soon as it is complete
+        self.stream_actions = stream_actions
         
-        # Initialize subsystems
-        self.llm = LocalLLMEngine(model_name=model_name)
-        self.pc_control = PCControlModule()
-        self.live_interaction = LiveInteractionModule()
-        self.evolution = SelfEvolutionModule()
+        # Subsystems (llm, pc_control, live_interaction, evolution, retrieval) load lazily
+        self._owner = self
         
         # State management
-        self.memory = []
+        self.memory = MemoryStore()
+        self._task_retrieval_ids: List[int] = []
+        self.observations = ObservationStore()
+        self.tools = self._build_tools()
+        self.context = ContextBuilder(self._get_system_prompt())
+        self.action_parser = ActionParser()
+        # Solved tasks replay their recorded actions; the LLM is only asked when the outcome deviates
+        self.plan_cache = plan_cache or PlanCache(os.getenv("PLAN_CACHE_PATH"))
+        self._trajectory: List[Tuple[str, List[Dict[str, Any]], List[str]]] = []
+        self._trajectory_replayable = True
+        self._live_events: Deque[Any] = deque(maxlen=50)
+        self._metrics_lock = threading.Lock()
         self.execution_log = []
         self.metrics = {
             "tasks_completed": 0,
@@ -45,73 +102,365 @@ class NeuroSovereignAdvancedAgent:
         }
         
         self.start_time = time.time()
+        # Phase/tool/LLM latency histograms go to the shared registry; spans to NS_TRACE_PATH
+        self.tracer = Tracer(os.getenv("NS_TRACE_PATH"))
+        self.agent_id = f"{self.name.lower()}-{next(_AGENT_IDS)}"
+        METRICS.add_collector(self._collect_metrics)  # Held weakly; removed by close()
+        port = os.getenv("NS_METRICS_PORT")
+        self.metrics_server = METRICS.serve(int(port)) if port else None
         print(f"[*] {self.name} {self.version} Agent Online")
         print(f"[*] Model: {self.model_name}")
         print(f"[*] Max Iterations: {self.max_iterations}")
 
     def _get_system_prompt(self) -> str:
-        """Returns the system prompt for the agent."""
+        """
+        Returns the system prompt for the agent.
+        This is the byte-stable prefix of every request: keep anything that
+        varies per task or iteration out of it so prefix caches stay warm.
+        """
         return f"""You are {self.name}, an advanced sovereign AI agent.
 Your goal is to complete user tasks autonomously and efficiently.
 
-You have access to the following capabilities:
-1. execute_shell(command: str) - Run terminal commands
-2. pc_control_click(x: int, y: int) - Click on screen coordinates
-3. pc_control_type(text: str) - Type text
-4. take_screenshot() - Capture the current screen
-5. final_answer(text: str) - Provide the final result
-
 Always think step-by-step. Plan your actions, execute them, and observe the results.
 You are independent and do not rely on external centralized services.
 Be efficient and minimize the number of iterations needed.
+
+Available Tools:
+{self.tools.render_prompt()}
+
+Format your response as:
+Thought: <your reasoning>
+Action: <tool_name>(<params>)
+
+Actions that do not depend on each other's results may be issued together,
+one per line after "Action:"; they run concurrently and you observe all results at once.
 """
 
+    def _build_tools(self) -> ToolRegistry:
+        """Declares every tool once; prompt, argument mapping and dispatch are derived from it."""
+        tools = ToolRegistry()
+        tools.register(
+            "execute_shell", self._run_shell,
+            [ToolParam("command", str), ToolParam("timeout", float, None)],
+            description="Run a terminal command",
+            side_effects=lambda p: READ_ONLY if is_read_only_command(p["command"]) else WRITE,
+            timeout=10.0, cacheable=lambda p: is_idempotent_command(p["command"]),
+            watch=lambda p: referenced_paths(p["command"])
+        )
+        tools.register(
+            "pc_control_click", lambda x, y: self.pc_control.move_and_click(x, y) or f"Clicked at ({x}, {y})",
+            [ToolParam("x", int), ToolParam("y", int)], description="Click on screen", side_effects=GUI
+        )
+        tools.register(
+            "pc_control_click_element", lambda name: self.pc_control.click_element(name),
+            [ToolParam("name", str)], description="Click a known UI element by name", side_effects=GUI
+        )
+        tools.register(
+            "pc_control_type", lambda text: self.pc_control.type_text(text) or f"Typed {len(text)} characters",
+            [ToolParam("text", str)], description="Type text", side_effects=GUI
+        )
+        tools.register("take_screenshot", lambda: self.pc_control.take_screenshot(),
+                       description="Capture screen", side_effects=GUI)
+        tools.register(
+            "read_observation", lambda id, offset, length: self.observations.read(id, offset, length),
+            [ToolParam("id", str), ToolParam("offset", int, 0), ToolParam("length", int, 2048)],
+            description="Page through a truncated tool output", side_effects=PURE
+        )
+        tools.register("final_answer", None, [ToolParam("text", str)],
+                       description="Provide final result", side_effects=PURE)
+        return tools
+
     def execute(self, task: str, enable_live: bool = False) -> str:
         """
         Main execution method: runs the Think-Act-Observe loop.
         """
-        print(f"\n{'='*60}")
-        print(f"[TASK] {task}")
-        print(f"{'='*60}")
-        
-        self.memory = [{"role": "user", "content": task}]
-        
-        if enable_live:
-            self.live_interaction.start_live_session()
+        self._start_task(task, enable_live)
+        try:
+            with self.tracer.span("task", task=task[:200]) as span, METRICS.time("ns_task_seconds"):
+                span["result"] = result = self._run_loop(task)
+                return result
+        finally:
+            if enable_live:
+                self.live_interaction.stop_live_session(self._on_live_events)
+
+    def _run_loop(self, task: str) -> str:
+        with self._phase("replay"):
+            answer = self._replay_plan(task)
+        if answer is not None:
+            return answer
         
         for iteration in range(self.max_iterations):
             print(f"\n[Iteration {iteration + 1}/{self.max_iterations}]")
+            self._drain_live_events()
             
-            # 1. THINK: Generate reasoning and plan
-            thought = self._think()
-            if not thought:
-                break
+            if self.stream_actions:
+                # 1+2. THINK and ACT overlap: tools start while the model is still decoding
+                with self._phase("think", streaming=True):
+                    thought, actions, pending = self._think_streaming()
+                if not thought:
+                    break
+                if actions[0]["name"] == "final_answer":
+                    return self._final_answer(actions[0], thought)
+                with self._phase("act", actions=len(pending)):
+                    observations = [future.result() for future in pending]
+            else:
+                # 1. THINK: Generate reasoning and plan
+                with self._phase("think"):
+                    thought = self._think()
+                if not thought:
+                    break
+                
+                # 2. ACT: Parse and execute every action of the response
+                with self._phase("parse"):
+                    actions = self._parse_actions(thought)
+                if actions[0]["name"] == "final_answer":
+                    return self._final_answer(actions[0], thought)
+                
+                with self._phase("act", actions=len(actions)):
+                    observations = self._execute_actions(actions)
             
-            # 2. ACT: Parse and execute action
-            action = self._parse_action(thought)
-            if action["name"] == "final_answer":
-                result = action.get("content", thought)
-                print(f"\n[FINAL ANSWER] {result}")
-                self.memory.append({"role": "assistant", "content": result})
-                self.metrics["tasks_completed"] += 1
+            # 3. OBSERVE: One observation step for all actions
+            with self._phase("observe"):
+                self._observe(thought, actions, observations)
+        
+        return "Task completed (max iterations reached)"
+
+    async def aexecute(self, task: str, enable_live: bool = False) -> str:
+        """
+        Asynchronous Think-Act-Observe loop.
+        The LLM call and blocking tools run in executors, so many sessions can
+        share one event loop; each iteration starts as soon as the previous
+        observation is available instead of after a fixed pause.
+        """
+        self._start_task(task, enable_live)
+        try:
+            with self.tracer.span("task", task=task[:200]) as span, METRICS.time("ns_task_seconds"):
+                span["result"] = result = await self._arun_loop(task)
                 return result
-            
-            # Execute the action
-            observation = self._execute_action(action)
-            print(f"[Observation] {observation[:100]}...")
-            
-            # 3. OBSERVE: Update memory with observation
-            self.memory.append({"role": "assistant", "content": thought})
-            self.memory.append({"role": "system", "content": f"Observation: {observation}"})
-            
-            self.metrics["actions_executed"] += 1
-            time.sleep(0.5)  # Brief pause between iterations
+        finally:
+            if enable_live:
+                self.live_interaction.stop_live_session(self._on_live_events)
+
+    async def _arun_loop(self, task: str) -> str:
+        loop = asyncio.get_running_loop()
+        with self._phase("replay"):
+            answer = await loop.run_in_executor(None, self._replay_plan, task)
+        if answer is not None:
+            return answer
         
-        if enable_live:
-            self.live_interaction.stop_live_session()
+        for iteration in range(self.max_iterations):
+            print(f"\n[Iteration {iteration + 1}/{self.max_iterations}]")
+            self._drain_live_events()
+            
+            if self.stream_actions:
+                with self._phase("think", streaming=True):
+                    thought, actions, pending = await loop.run_in_executor(None, self._think_streaming)
+                if not thought:
+                    break
+                if actions[0]["name"] == "final_answer":
+                    return self._final_answer(actions[0], thought)
+                with self._phase("act", actions=len(pending)):
+                    observations = await asyncio.gather(*(asyncio.wrap_future(future) for future in pending))
+            else:
+                with self._phase("think"):
+                    thought = await self._athink()
+                if not thought:
+                    break
+                
+                with self._phase("parse"):
+                    actions = self._parse_actions(thought)
+                if actions[0]["name"] == "final_answer":
+                    return self._final_answer(actions[0], thought)
+                
+                with self._phase("act", actions=len(actions)):
+                    observations = await loop.run_in_executor(None, self._execute_actions, actions)
+            with self._phase("observe"):
+                self._observe(thought, actions, observations)
         
         return "Task completed (max iterations reached)"
 
+    def _component(self, name: str, create):
+        """Factory of the lazy subsystems: the owning agent creates them, sessions borrow its own."""
+        return create() if self._owner is self else getattr(self._owner, name)
+
+    def _broadcast(self, event: Dict[str, Any]):
+        # Nothing can be subscribed before the live module exists: don't create it just to publish
+        if is_loaded(self._owner, "live_interaction"):
+            self.live_interaction.broadcast_action(event)
+
+    @contextmanager
+    def _phase(self, phase: str, **attrs: Any):
+        """Times one loop phase into ns_phase_seconds and, when tracing, a span of the task."""
+        with METRICS.time("ns_phase_seconds", phase=phase), self.tracer.span(phase, **attrs) as span:
+            yield span
+
+    def _collect_metrics(self):
+        """Export-time gauges: uptime, agent counters and cache hit rates, labelled with agent_id."""
+        agent = self.agent_id
+        yield "ns_uptime_seconds", {"agent": agent}, time.time() - self.start_time
+        for key, value in self.metrics.items():
+            if key != "uptime_seconds":
+                yield f"ns_agent_{key}", {"agent": agent}, value
+        yield "ns_cache_hit_rate", {"agent": agent, "cache": "tools"}, self.tools.get_stats()["cache_hit_rate"]
+        yield "ns_cache_hit_rate", {"agent": agent, "cache": "plans"}, self.plan_cache.get_stats()["hit_rate"]
+        cache = getattr(self.llm, "cache", None) if is_loaded(self._owner, "llm") else None
+        if cache is not None:
+            yield "ns_cache_hit_rate", {"agent": agent, "cache": "llm"}, cache.get_stats()["hit_rate"]
+
+    def spawn_session(self) -> "NeuroSovereignAdvancedAgent":
+        """
+        Returns a task session that shares this agent's subsystems (LLM, PC control,
+        live interaction, evolution, retrieval memory) and plan cache, but owns its
+        memory, log, metrics, observations and tools, so concurrent sessions never
+        see each other's cached tool results or observation ids. close() it when done.
+        """
+        session = copy.copy(self)
+        session.observations = ObservationStore()
+        session.tools = session._build_tools()  # Handlers bound to the session, with their own result cache
+        session.metrics_server = None  # Owned by this agent
+        session._metrics_lock = threading.Lock()
+        session.memory = MemoryStore(self.memory.capacity)
+        session.context = ContextBuilder(self.context.stable_prefix, self.context.token_budget,
+                                         recall_tokens=self.context.recall_tokens)
+        session._task_retrieval_ids = []
+        session._trajectory = []
+        session._live_events = deque(maxlen=50)
+        session.execution_log = []
+        session.metrics = {key: 0 for key in self.metrics}
+        return session
+
+    def _start_task(self, task: str, enable_live: bool):
+        print(f"\n{'='*60}")
+        print(f"[TASK] {task}")
+        print(f"{'='*60}")
+        
+        self.memory.clear()
+        self.memory.append("user", task)
+        self.context.reset(task)
+        self._task_retrieval_ids.clear()
+        self._trajectory = []
+        self._trajectory_replayable = True
+        
+        if enable_live:
+            self.live_interaction.start_live_session(handler=self._on_live_events)
+
+    def _on_live_events(self, batch: List[Any]):
+        """Live stream handler (worker thread): keeps recent events for the next Think step."""
+        with self._metrics_lock:
+            self._live_events.extend(batch)
+
+    def _drain_live_events(self):
+        with self._metrics_lock:
+            events = list(self._live_events)
+            self._live_events.clear()
+        if events:
+            self._remember("system", f"Live events ({len(events)} new): {json.dumps(events[-5:], default=str)[:500]}")
+
+    def _final_answer(self, action: Dict[str, Any], thought: str) -> str:
+        result = action.get("content", thought)
+        print(f"\n[FINAL ANSWER] {result}")
+        self._remember("assistant", result)
+        self.metrics["tasks_completed"] += 1
+        self._broadcast({"action": "final_answer", "task": self.context.task, "result": result[:500]})
+        if self._trajectory and self._trajectory_replayable:
+            self.plan_cache.record(self.context.task, self._trajectory, result)
+        return result
+
+    def _replay_plan(self, task: str) -> Optional[str]:
+        """
+        Replays the cached solution of a task with the same normalized form.
+        Each step runs without an LLM call as long as its observations match the
+        recorded ones. The recorded answer is reused only if every observation
+        matched exactly; otherwise (volatile numbers differ, or a step deviated)
+        the replayed steps stay in the history and the LLM takes over from there.
+        """
+        plan = self.plan_cache.lookup(task)
+        if plan is None:
+            return None
+        print(f"[Plan Cache] Replaying {len(plan.steps)} recorded step(s)")
+        exact = True
+        for index in range(len(plan.steps)):
+            actions = plan.actions(index)
+            observations = self._execute_actions(actions)
+            self._observe(plan.thought(index), actions, observations)
+            match = plan.compare(index, [self._fingerprint(observation) for observation in observations])
+            if match is None:
+                print(f"[Plan Cache] Step {index + 1} deviated from the recorded outcome; asking the LLM")
+                self.plan_cache.report_replay(index + 1, completed=False)
+                return None
+            exact = exact and match == "exact"
+        if not exact:
+            print("[Plan Cache] Outcome differs in volatile values; asking the LLM for the answer")
+            self.plan_cache.report_replay(len(plan.steps), completed=False)
+            return None
+        self.plan_cache.report_replay(len(plan.steps), completed=True)
+        return self._final_answer({"content": plan.final_answer()}, "")
+
+    @staticmethod
+    def _fingerprint(observation: Observation) -> str:
+        """Output a recorded step is compared on: exit code plus the head and tail windows."""
+        return f"{observation.exit_code}\n{(observation.head + observation.tail).decode('utf-8', 'replace')}"
+
+    def _is_replayable(self, action: Dict[str, Any]) -> bool:
+        """Only valid shell-like calls replay; GUI input depends on the screen, paging on observation ids."""
+        spec = self.tools.get(action["name"])
+        if "error" in action or spec is None or spec.handler is None:
+            return False
+        try:
+            return spec.side_effect_of(spec.bind(action.get("params", {}))) in (READ_ONLY, WRITE)
+        except ToolError:
+            return False
+
+    def _observe(self, thought: str, actions: List[Dict[str, Any]], observations: List[Observation]):
+        if len(observations) == 1:
+            text = str(observations[0])
+        else:
+            text = "\n".join(
+                f"[{i}] {action['name']}({self._format_params(action)}):\n{observation}"
+                for i, (action, observation) in enumerate(zip(actions, observations), 1)
+            )
+        print(f"[Observation] {text[:100]}...")
+        self._remember("assistant", thought)
+        self._remember("system", f"Observation: {text}")
+        self.metrics["actions_executed"] += len(observations)
+        for action, observation in zip(actions, observations):
+            self._broadcast({
+                "action": action["name"], "params": action.get("params", {}),
+                "exit_code": getattr(observation, "exit_code", None), "observation": str(observation)[:200]
+            })
+        self._trajectory.append((thought, actions, [self._fingerprint(o) for o in observations]))
+        self._trajectory_replayable = self._trajectory_replayable and all(map(self._is_replayable, actions))
+
+    @staticmethod
+    def _format_params(action: Dict[str, Any]) -> str:
+        return ", ".join(f"{key}={value!r}" for key, value in action.get("params", {}).items())
+
+    def _remember(self, role: str, content: str):
+        self.memory.append(role, content)
+        self.context.add_turn(role, content)
+        if role != "user":
+            self._task_retrieval_ids.append(self.retrieval.add(content[:500]))
+
+    def _run_shell(self, command: str, timeout: float = 10.0) -> Observation:
+        """Runs a shell command, capturing its output as a bounded observation."""
+        capture = self.observations.capture(source=command)
+        result = self.pc_control.execute_os_command_streamed(command, capture, timeout=timeout)
+        if result.timed_out:
+            capture.write(b"\nError: Command execution timed out.")
+        return capture.close(result.exit_code)
+
+    def _recall(self, k: int = 3) -> List[str]:
+        """Top-k past observations/thoughts relevant to the task, excluding turns still in context."""
+        if not is_loaded(self._owner, "retrieval"):
+            return []  # Nothing has been remembered in this process yet
+        resident = self.context.resident_turns
+        exclude = set(self._task_retrieval_ids[-resident:]) if resident else set()
+        if len(self.retrieval) <= len(exclude):
+            return []  # Everything remembered is still in the prompt: don't embed anything yet
+        query = f"{self.context.task} {self.memory[-1].content[:200]}"
+        hits = self.retrieval.search(query, k=k, exclude=exclude)
+        return [hit["text"] for hit in hits]
+
     def _think(self) -> Optional[str]:
         """
         Generates reasoning and plans the next action.
@@ -119,7 +468,7 @@ Be efficient and minimize the number of iterations needed.
         prompt = self._build_prompt()
         
         try:
-            response = self.llm.generate_response(prompt, self._get_system_prompt())
+            response = self.llm.generate_response(prompt, self.context.stable_prefix)
             print(f"[Thought] {response[:150]}...")
             return response
         except Exception as e:
@@ -127,100 +476,226 @@ Be efficient and minimize the number of iterations needed.
             self.metrics["errors_recovered"] += 1
             return None
 
-    def _build_prompt(self) -> str:
-        """Constructs the prompt from memory and context."""
-        history = ""
-        for m in self.memory[-5:]:  # Last 5 interactions
-            history += f"{m['role'].upper()}: {m['content'][:100]}\n"
+    async def _athink(self) -> Optional[str]:
+        """Non-blocking variant of _think for the asyncio loop."""
+        prompt = self._build_prompt()
         
-        return f"""Current History:
-{history}
+        try:
+            response = await self.llm.agenerate_response(prompt, self.context.stable_prefix)
+            print(f"[Thought] {response[:150]}...")
+            return response
+        except Exception as e:
+            print(f"[Error] LLM generation failed: {e}")
+            self.metrics["errors_recovered"] += 1
+            return None
 
-Available Tools:
-- execute_shell(command: str): Run a terminal command
-- pc_control_click(x: int, y: int): Click on screen
-- pc_control_type(text: str): Type text
-- take_screenshot(): Capture screen
-- final_answer(text: str): Provide final result
+    def _think_streaming(self) -> Tuple[Optional[str], List[Dict[str, Any]], List[Future]]:
+        """
+        Streaming Think step. Each action is dispatched the moment its closing
+        parenthesis arrives, so tool execution overlaps decoding, and the rest
+        of the generation is cancelled once the action block is over.
+        Returns the thought, its actions and one future per dispatched action.
+        """
+        prompt = self._build_prompt()
+        parser = StreamingActionParser(self.action_parser)
+        actions: List[Dict[str, Any]] = []
+        pending: List[Future] = []
+        final: List[Dict[str, Any]] = []
+        barrier: List[Future] = []    # Last serial action: everything after it waits
+        concurrent: List[Future] = []  # Parallel-safe actions since then
 
-Format your response as:
-Thought: <your reasoning>
-Action: <tool_name>(<params>)
-"""
+        def dispatch(parsed: ParsedAction):
+            nonlocal barrier, concurrent
+            action = self._to_action(parsed, parser.text)
+            if final or action["name"] == "final_answer":
+                final.append(action)  # Anything after an answer waits for the observations
+                return
+            if "error" in action or self.tools.is_parallel_safe(action["name"], action["params"]):
+                future = self._tool_executor.submit(self._execute_after, barrier, action)
+                concurrent.append(future)
+            else:
+                future = self._tool_executor.submit(self._execute_after, barrier + concurrent, action)
+                barrier, concurrent = [future], []
+            actions.append(action)
+            pending.append(future)
 
-    def _parse_action(self, response: str) -> Dict[str, Any]:
-        """Parses the action from the LLM response."""
-        if "Action:" in response:
-            action_line = response.split("Action:")[1].strip().split("\n")[0]
-            
-            if "(" in action_line and ")" in action_line:
-                name = action_line.split("(")[0].strip()
-                params_str = action_line.split("(")[1].split(")")[0]
-                
-                params = {}
-                if params_str:
-                    try:
-                        params = json.loads(params_str.replace("'", "\""))
-                    except:
-                        params = {"raw": params_str}
-                
-                return {"name": name, "params": params}
-        
-        # If contains "final_answer" or "complete", return final answer
-        if "final_answer" in response.lower() or "complete" in response.lower():
-            return {"name": "final_answer", "content": response}
+        try:
+            stream = self.llm.generate_response(prompt, self.context.stable_prefix,
+                                                stream=True, stop=self.STOP_SEQUENCES)
+            try:
+                for delta in stream:
+                    for parsed in parser.feed(delta):
+                        dispatch(parsed)
+                    if parser.done:
+                        break  # Closing the stream aborts the remaining generation
+            finally:
+                getattr(stream, "close", lambda: None)()
+            for parsed in parser.close():
+                dispatch(parsed)
+        except Exception as e:
+            print(f"[Error] LLM generation failed: {e}")
+            self.metrics["errors_recovered"] += 1
+            wait(pending)
+            return None, [], []
         
-        return {"name": "final_answer", "content": response}
+        thought = parser.text
+        print(f"[Thought] {thought[:150]}...")
+        if pending:
+            print(f"[Action] {len(pending)} action(s) dispatched while decoding")
+            return thought, actions, pending
+        return thought, final or [{"name": "final_answer", "content": thought}], []
+
+    def _execute_after(self, dependencies: List[Future], action: Dict[str, Any]) -> Observation:
+        wait(dependencies)
+        return self._execute_action(action)
+
+    def _build_prompt(self) -> str:
+        """Returns the token-budgeted history; tools and format live in the stable prefix."""
+        return self.context.render(self._recall())
+
+    def _parse_actions(self, response: str) -> List[Dict[str, Any]]:
+        """Parses every action in the LLM response; no action means the response is the answer."""
+        actions = [self._to_action(parsed, response) for parsed in self.action_parser.parse(response)]
+        return actions or [{"name": "final_answer", "content": response}]
 
-    def _execute_action(self, action: Dict[str, Any]) -> str:
-        """Executes the parsed action."""
+    def _to_action(self, parsed: ParsedAction, response: str) -> Dict[str, Any]:
+        params = parsed.params(self.tools.signature(parsed.name))
+        action = {"name": parsed.name, "params": params}
+        if parsed.error:
+            action["error"] = parsed.error
+        elif parsed.name == "final_answer":
+            action["content"] = str(params.get("text", response))
+        return action
+
+    def _parse_action(self, response: str) -> Dict[str, Any]:
+        """Parses the first action from the LLM response."""
+        return self._parse_actions(response)[0]
+
+    def _execute_actions(self, actions: List[Dict[str, Any]]) -> List[Observation]:
+        """
+        Executes the actions of one response in order, except that each run of
+        consecutive parallel-safe actions executes concurrently. Serial actions
+        (GUI input, shell commands with side effects) act as barriers. Anything
+        after a final_answer is dropped: the answer is given once the
+        observations are in.
+        """
+        names = [action["name"] for action in actions]
+        if "final_answer" in names:
+            actions = actions[:names.index("final_answer")]
+        observations: List[Observation] = []
+        i = 0
+        while i < len(actions):
+            j = i
+            while j < len(actions) and ("error" in actions[j] or self.tools.is_parallel_safe(
+                    actions[j]["name"], actions[j].get("params", {}))):
+                j += 1
+            if j - i > 1:
+                print(f"[Action] Running {j - i} independent actions in parallel")
+                observations.extend(self._tool_executor.map(self._execute_action, actions[i:j]))
+            else:
+                j = max(j, i + 1)
+                observations.append(self._execute_action(actions[i]))
+            i = j
+        return observations
+
+    def _execute_action(self, action: Dict[str, Any]) -> Observation:
+        """Executes the parsed action; output comes back as a bounded observation."""
         name = action.get("name", "")
         params = action.get("params", {})
         
         try:
-            if name == "execute_shell":
-                cmd = params.get("cmd") or params.get("command", "")
-                return self.pc_control.run_shell(cmd)
-            
-            elif name == "pc_control_click":
-                x = params.get("x", 0)
-                y = params.get("y", 0)
-                return self.pc_control.click(x, y)
-            
-            elif name == "pc_control_type":
-                text = params.get("text", "")
-                return self.pc_control.type_text(text)
-            
-            elif name == "take_screenshot":
-                return self.pc_control.take_screenshot()
-            
+            if "error" in action:
+                output = f"Could not parse action {name}: {action['error']}"
             else:
-                return f"Unknown action: {name}"
+                output = self.tools.call(name, params)
+                if isinstance(output, Observation):
+                    return output
         
         except Exception as e:
-            self.metrics["errors_recovered"] += 1
-            return f"Error executing {name}: {str(e)}"
+            with self._metrics_lock:
+                self.metrics["errors_recovered"] += 1
+            output = f"Error executing {name}: {str(e)}"
+        
+        return self.observations.from_text(str(output), source=name)
 
     def get_status(self) -> Dict[str, Any]:
         """Returns current agent status."""
         uptime = time.time() - self.start_time
+        self.metrics["uptime_seconds"] = uptime
         return {
             "name": self.name,
             "version": self.version,
             "model": self.model_name,
             "uptime_seconds": uptime,
             "metrics": self.metrics,
-            "memory_size": len(self.memory),
+            "memory_size": self.memory.get_stats(),
+            "tools": self.tools.get_stats(),
+            "plan_cache": self.plan_cache.get_stats(),
+            "latency": METRICS.snapshot()["histograms"],
             "timestamp": datetime.now().isoformat()
         }
 
     def self_improve(self) -> str:
         """Analyzes and improves its own code."""
         print("\n[Self-Improvement] Analyzing codebase...")
-        analysis = self.evolution.analyze_codebase()
+        analysis = self.evolution.analyze_codebase(self.llm)
         print(analysis)
         return analysis
 
+    def close(self):
+        """
+        Stops exporting this agent's gauges and its metrics server, closes its
+        trace file, and deletes spilled tool outputs (also done on garbage
+        collection and at exit). Sessions leave the shared tracer open.
+        """
+        METRICS.remove_collector(self._collect_metrics)
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+        if self._owner is self:
+            self.tracer.close()
+        self.observations.close()
+
+class ConcurrentTaskRunner:
+    """
+    Runs many tasks concurrently on one event loop.
+    Each task gets an isolated session of the shared agent; a semaphore bounds
+    how many sessions are in flight against the LLM server at once.
+    """
+    
+    def __init__(self, agent: NeuroSovereignAdvancedAgent, max_concurrency: int = 16):
+        self.agent = agent
+        self.max_concurrency = max_concurrency
+
+    async def arun(self, tasks: List[str]) -> List[Dict[str, Any]]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def run_one(task: str) -> Dict[str, Any]:
+            async with semaphore:
+                session = self.agent.spawn_session()
+                try:
+                    result = await session.aexecute(task)
+                except Exception as e:
+                    session.metrics["errors_recovered"] += 1
+                    result = f"Task failed: {e}"
+                finally:
+                    session.close()
+                for key, value in session.metrics.items():
+                    if key != "uptime_seconds":
+                        self.agent.metrics[key] += value
+                return {
+                    "task": task,
+                    "result": result,
+                    "metrics": session.metrics,
+                    "memory_size": len(session.memory)
+                }
+        
+        return await asyncio.gather(*(run_one(task) for task in tasks))
+
+    def run(self, tasks: List[str]) -> List[Dict[str, Any]]:
+        """Blocking entry point: runs all tasks and returns results in input order."""
+        return asyncio.run(self.arun(tasks))
+
 if __name__ == "__main__":
     agent = NeuroSovereignAdvancedAgent(model_name="DeepSeek-V3")
     
@@ -228,3 +703,4 @@ if __name__ == "__main__":
     result = agent.execute("Create a directory named 'NeuroSovereign_Output' and list its contents")
     print(f"\nResult: {result}")
     print(f"\nAgent Status: {json.dumps(agent.get_status(), indent=2)}")
+    agent.close()
@@ -0,0 +1,325 @@
+import json
+import time
+import itertools
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+try:
+    from .lazy_loader import lazy_import
+except ImportError:
+    from lazy_loader import lazy_import
+
+asyncio = lazy_import("asyncio")  # Only for the WebSocket broadcaster
+
+# What a subscriber that fell more than max_backlog events behind receives
+# (without a max_backlog, only events overwritten in the ring are lost)
+DROP = "drop"          # Only the newest max_backlog events
+COALESCE = "coalesce"  # The latest event per coalesce key, in order of last occurrence
+
+class Subscriber(ABC):
+    """
+    A reader of the bus with its own cursor (next sequence number to read).
+    Subclasses implement deliver(); readers never block the publisher.
+    """
+
+    def __init__(self, policy: str = DROP, max_backlog: Optional[int] = None, max_batch: int = 256,
+                 coalesce_key: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        self.policy = policy
+        self.max_backlog = max_backlog
+        self.max_batch = max_batch
+        self.coalesce_key = coalesce_key or (lambda event: event.get("action"))
+        self.cursor = 0
+        self.busy = False
+        self.closed = False
+        self.stats = {"delivered": 0, "dropped": 0, "coalesced": 0, "errors": 0}
+
+    @abstractmethod
+    def deliver(self, events: List[Dict[str, Any]]):
+        ...
+
+    def close(self):
+        self.closed = True
+
+class PullSubscriber(Subscriber):
+    """A cursor its owner reads with BroadcastBus.read(); never subscribed, so nothing is pushed to it."""
+
+    def deliver(self, events: List[Dict[str, Any]]):
+        raise TypeError("PullSubscriber is read with BroadcastBus.read(), not subscribed")
+
+class CallbackSubscriber(Subscriber):
+    """Calls fn(events) with each batch, on a bus worker thread."""
+
+    def __init__(self, fn: Callable[[List[Dict[str, Any]]], None], **options: Any):
+        super().__init__(**options)
+        self.fn = fn
+
+    def deliver(self, events: List[Dict[str, Any]]):
+        self.fn(events)
+
+class FileSubscriber(Subscriber):
+    """Appends events to a JSON Lines file."""
+
+    def __init__(self, path: str, **options: Any):
+        super().__init__(**options)
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def deliver(self, events: List[Dict[str, Any]]):
+        self._file.write("".join(json.dumps(event, default=str) + "\n" for event in events))
+        self._file.flush()
+
+    def close(self):
+        super().close()
+        self._file.close()
+
+class BroadcastBus:
+    """
+    In-process publish/subscribe for live agent events.
+
+    publish() stamps the event with a sequence number, writes it into a ring
+    buffer slot and wakes the (fixed number of) dispatchers: its cost does not
+    depend on the number of subscribers and it never waits for one. Every
+    subscriber reads at its own cursor; one that falls behind by more than its
+    backlog gets its events dropped or coalesced, and one lapped by the ring
+    loses what was overwritten (counted as dropped).
+
+    Callback and file subscribers are drained on a worker pool, at most one
+    batch per subscriber at a time.
+    """
+
+    def __init__(self, capacity: int = 4096, workers: int = 8):
+        if capacity & (capacity - 1):
+            raise ValueError("capacity must be a power of two")
+        self.capacity = capacity
+        self._mask = capacity - 1
+        self._ring: List[Optional[Tuple[int, Dict[str, Any]]]] = [None] * capacity
+        self._counter = itertools.count()
+        self._head = 0  # One past the highest published sequence number
+        self._wakers: List[Callable[[], None]] = []
+        self._subscribers: List[Subscriber] = []
+        self._workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._dispatcher: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.published = 0
+
+    @property
+    def head(self) -> int:
+        return self._head
+
+    def publish(self, event: Dict[str, Any]) -> int:
+        """Adds an event and returns its sequence number. O(1) in the number of subscribers."""
+        seq = next(self._counter)  # Atomic under the GIL: concurrent publishers get distinct slots
+        event = dict(event, seq=seq, timestamp=event.get("timestamp") or time.time())
+        self._ring[seq & self._mask] = (seq, event)
+        if seq >= self._head:
+            self._head = seq + 1
+        self.published += 1
+        for wake in self._wakers:
+            wake()
+        return seq
+
+    def read(self, subscriber: Subscriber) -> List[Dict[str, Any]]:
+        """Next batch for a subscriber, applying its backlog policy; advances its cursor."""
+        head = self._head
+        cursor = subscriber.cursor
+        if head - cursor > self.capacity:
+            subscriber.stats["dropped"] += head - self.capacity - cursor
+            cursor = head - self.capacity
+        backlog = head - cursor
+        limit = subscriber.max_batch
+        if subscriber.max_backlog is not None and backlog > subscriber.max_backlog:
+            if subscriber.policy == COALESCE:
+                limit = backlog
+            else:
+                subscriber.stats["dropped"] += backlog - subscriber.max_backlog
+                cursor = head - subscriber.max_backlog
+        events = []
+        while cursor < head and len(events) < limit:
+            slot = self._ring[cursor & self._mask]
+            if slot is None or slot[0] < cursor:
+                break  # Claimed by a publisher that has not written it yet
+            if slot[0] > cursor:
+                # Lapped while reading: skip to the oldest surviving event
+                subscriber.stats["dropped"] += slot[0] - self.capacity + 1 - cursor
+                cursor = slot[0] - self.capacity + 1
+                continue
+            events.append(slot[1])
+            cursor += 1
+        subscriber.cursor = cursor
+        if limit > subscriber.max_batch and len(events) > 1:
+            latest = {}
+            for event in events:
+                key = subscriber.coalesce_key(event)
+                latest.pop(key, None)
+                latest[key] = event
+            subscriber.stats["coalesced"] += len(events) - len(latest)
+            events = list(latest.values())
+        return events
+
+    def add_waker(self, wake: Callable[[], None]):
+        """Registers a callable run after every publish (e.g. to wake an event loop)."""
+        self._wakers.append(wake)
+
+    def subscribe(self, subscriber: Subscriber, from_start: bool = False) -> Subscriber:
+        """Adds a callback/file subscriber; it starts at the next event unless from_start."""
+        subscriber.cursor = max(0, self._head - self.capacity) if from_start else self._head
+        with self._lock:
+            self._subscribers.append(subscriber)
+            if self._dispatcher is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="ns-bus")
+                self._dispatcher = threading.Thread(target=self._dispatch, name="ns-bus-dispatch", daemon=True)
+                self._dispatcher.start()
+                self._wakers.append(self._wake_dispatcher)
+        return subscriber
+
+    def _wake_dispatcher(self):
+        if not self._wake.is_set():  # Setting takes the event's lock; most publishes find it set
+            self._wake.set()
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+        subscriber.close()
+
+    def _dispatch(self):
+        while not self._closed:
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                subscribers = list(self._subscribers)
+            head = self._head
+            for subscriber in subscribers:
+                if not subscriber.busy and subscriber.cursor < head:
+                    subscriber.busy = True
+                    self._executor.submit(self._drain, subscriber)
+
+    def _drain(self, subscriber: Subscriber):
+        try:
+            while not subscriber.closed:
+                events = self.read(subscriber)
+                if not events:
+                    break
+                try:
+                    subscriber.deliver(events)
+                    subscriber.stats["delivered"] += len(events)
+                except Exception as e:
+                    subscriber.stats["errors"] += 1
+                    print(f"[!] Broadcast subscriber failed: {e}")
+        finally:
+            subscriber.busy = False
+            self._wake.set()  # Events published while the busy flag was set
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Waits until every subscriber has caught up; returns False on timeout."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                subscribers = list(self._subscribers)
+            if all(s.cursor >= self._head and not s.busy for s in subscribers):
+                return True
+            time.sleep(0.001)
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        head = self._head
+        return {
+            "published": self.published,
+            "capacity": self.capacity,
+            "subscribers": len(subscribers),
+            "delivered": sum(s.stats["delivered"] for s in subscribers),
+            "dropped": sum(s.stats["dropped"] for s in subscribers),
+            "coalesced": sum(s.stats["coalesced"] for s in subscribers),
+            "max_lag": max((head - s.cursor for s in subscribers), default=0)
+        }
+
+    def close(self):
+        self._closed = True
+        self._wake.set()
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, []
+        for subscriber in subscribers:
+            subscriber.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+class WebSocketBroadcaster:
+    """
+    Serves the bus to WebSocket clients (dashboards) on a local port. Each
+    client is a subscriber with its own cursor, fed by its own task on a
+    background event loop; a slow client only delays itself.
+    """
+
+    def __init__(self, bus: BroadcastBus, host: str = "127.0.0.1", port: int = 8765,
+                 policy: str = COALESCE, max_backlog: int = 256):
+        self.bus = bus
+        self.host = host
+        self.port = port
+        self.policy = policy
+        self.max_backlog = max_backlog
+        self.clients: Dict[Any, Subscriber] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._tick: Optional[asyncio.Event] = None
+        self._wake_pending = False
+
+    def start(self):
+        import websockets
+        ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        async def serve():
+            self._tick = asyncio.Event()
+            self._stop = asyncio.Event()
+            async with websockets.serve(self._client, self.host, self.port) as server:
+                self.port = server.sockets[0].getsockname()[1]  # Resolves port 0
+                ready.set()
+                await self._stop.wait()
+
+        self._thread = threading.Thread(target=self._loop.run_until_complete, args=(serve(),),
+                                        name="ns-broadcast", daemon=True)
+        self._thread.start()
+        ready.wait(timeout=5)
+        self.bus.add_waker(self._wake)
+        print(f"[*] Broadcasting live events on ws://{self.host}:{self.port}")
+        return self
+
+    def _wake(self):
+        # One loop callback per burst of publishes, not per event
+        if not self._wake_pending:
+            self._wake_pending = True
+            self._loop.call_soon_threadsafe(self._notify)
+
+    def _notify(self):
+        self._wake_pending = False
+        tick, self._tick = self._tick, asyncio.Event()
+        tick.set()
+
+    async def _client(self, websocket):
+        subscriber = PullSubscriber(policy=self.policy, max_backlog=self.max_backlog)
+        subscriber.cursor = self.bus.head
+        self.clients[websocket] = subscriber
+        try:
+            while True:
+                tick = self._tick
+                events = self.bus.read(subscriber)
+                if not events:
+                    await tick.wait()
+                    continue
+                await websocket.send(json.dumps(events, default=str))
+                subscriber.stats["delivered"] += len(events)
+        except Exception:
+            pass  # Client went away
+        finally:
+            del self.clients[websocket]
+
+    def stop(self):
+        if self._loop is not None and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._stop.set)
+            self._thread.join(timeout=5)
@@ -0,0 +1,330 @@
+import os
+import ast
+import json
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+try:
+    from .context_builder import estimate_tokens
+except ImportError:
+    from context_builder import estimate_tokens
+
+INDEX_VERSION = 2
+SKIP_DIRS = {"__pycache__", "venv", ".venv", "env", "node_modules", "build", "dist", "site-packages"}
+
+# Nodes that add a decision point (McCabe); BoolOp adds one per extra operand
+_BRANCHES = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.ExceptHandler, ast.IfExp,
+             ast.Assert, ast.comprehension, ast.match_case)
+_SCOPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+def _sha1(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+def _call_name(func: ast.AST) -> Optional[str]:
+    """Dotted name of a call target (`self.tools.call`), or None for computed callees."""
+    parts = []
+    while isinstance(func, ast.Attribute):
+        parts.append(func.attr)
+        func = func.value
+    if isinstance(func, ast.Name):
+        parts.append(func.id)
+    elif not parts:
+        return None
+    return ".".join(reversed(parts))
+
+def _scan(node: ast.AST, imports: set) -> Tuple[int, set, List[ast.AST]]:
+    """
+    One walk over a scope's own body: its McCabe complexity, the calls it
+    makes, and the nested functions and classes (scanned as their own
+    symbols). Imports anywhere in the body are added to `imports`.
+    """
+    complexity, calls, nested = 1, set(), []
+    stack = list(ast.iter_child_nodes(node))
+    while stack:
+        child = stack.pop()
+        if isinstance(child, _SCOPES):
+            nested.append(child)
+            continue
+        if isinstance(child, _BRANCHES):
+            complexity += 1
+        elif isinstance(child, ast.BoolOp):
+            complexity += len(child.values) - 1
+        elif isinstance(child, ast.Call):
+            name = _call_name(child.func)
+            if name:
+                calls.add(name)
+        elif isinstance(child, ast.Import):
+            imports.update(alias.name for alias in child.names)
+        elif isinstance(child, ast.ImportFrom):
+            imports.add("." * child.level + (child.module or ""))
+        stack.extend(ast.iter_child_nodes(child))
+    return complexity, calls, nested
+
+def _symbol(node: ast.AST, qualname: str, kind: str, lines: List[str],
+            complexity: int, calls: set) -> Dict[str, Any]:
+    start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", ())])
+    source = "".join(lines[start - 1:node.end_lineno])
+    symbol = {
+        "name": qualname, "kind": kind, "line": start, "end_line": node.end_lineno,
+        "complexity": complexity, "calls": sorted(calls),
+        # Hash of the symbol's own text: moving it around the file does not mark it changed
+        "hash": _sha1(source.encode("utf-8"))[:16]
+    }
+    if kind != "class":
+        symbol["args"] = [a.arg for a in node.args.posonlyargs + node.args.args + node.args.kwonlyargs]
+    doc = ast.get_docstring(node)
+    if doc:
+        symbol["doc"] = doc.strip().split("\n", 1)[0][:120]
+    return symbol
+
+def parse_source(source: bytes) -> Dict[str, Any]:
+    """
+    Functions, classes and methods of one module with complexity and call
+    edges. Module-level so that it can run on a process pool.
+    """
+    entry: Dict[str, Any] = {"hash": _sha1(source), "symbols": [], "imports": []}
+    text = source.decode("utf-8", errors="replace")
+    lines = text.splitlines(keepends=True)
+    entry["lines"] = len(lines)
+    try:
+        tree = ast.parse(text)
+    except SyntaxError as e:
+        entry["error"] = f"SyntaxError: {e.msg} (line {e.lineno})"
+        return entry
+
+    imports = set()
+    _, _, nested = _scan(tree, imports)
+    stack = [(child, "", False) for child in nested]
+    while stack:
+        node, prefix, in_class = stack.pop()
+        complexity, calls, nested = _scan(node, imports)
+        qualname = f"{prefix}{node.name}"
+        is_class = isinstance(node, ast.ClassDef)
+        kind = "class" if is_class else ("method" if in_class else "function")
+        entry["symbols"].append(_symbol(node, qualname, kind, lines, complexity, calls))
+        stack.extend((child, f"{qualname}.", is_class) for child in nested)
+    entry["symbols"].sort(key=lambda s: s["line"])
+    entry["imports"] = sorted(imports)
+    return entry
+
+class CodeIndex:
+    """
+    Persistent index of a Python tree: per file its content hash, symbols
+    (functions, classes, methods) with line spans, McCabe complexity, call
+    edges and a hash of each symbol's source.
+
+    refresh() only re-parses files whose content hash changed; a file whose
+    mtime and size are unchanged is not even read. Large batches of changed
+    files are parsed on a process pool. Each symbol also remembers the hash it
+    had when it was last analyzed, so pending() returns exactly the symbols
+    added or modified since then.
+    """
+
+    def __init__(self, root: str, path: Optional[str] = None, workers: Optional[int] = None,
+                 pool_threshold: int = 16):
+        self.root = os.path.abspath(root)
+        self.path = path
+        self.workers = workers
+        # Below this many changed files a pool costs more to start than it saves
+        self.pool_threshold = pool_threshold
+        self.files: Dict[str, Dict[str, Any]] = {}
+        # key -> hashes analyzed under it; several, since a name can occur twice (property setter, redefinition)
+        self.analyzed: Dict[str, List[str]] = {}
+        self._callers: Optional[Dict[str, List[Tuple[str, str]]]] = None
+        self._lock = threading.Lock()
+        self.stats = {"refreshes": 0, "files_scanned": 0, "files_read": 0, "files_parsed": 0,
+                      "parallel_batches": 0}
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[!] Ignoring unreadable code index {self.path}: {e}")
+            return
+        if data.get("version") == INDEX_VERSION and data.get("root") == self.root:
+            self.files = data.get("files", {})
+            self.analyzed = data.get("analyzed", {})
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps({"version": INDEX_VERSION, "root": self.root, "files": self.files,
+                               "analyzed": self.analyzed})
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+
+    def _walk(self) -> Iterator[str]:
+        for directory, dirs, files in os.walk(self.root):
+            dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d not in SKIP_DIRS
+                             and not d.endswith(".egg-info"))
+            for name in sorted(files):
+                if name.endswith(".py"):
+                    yield os.path.relpath(os.path.join(directory, name), self.root)
+
+    def refresh(self) -> Dict[str, List[str]]:
+        """Brings the index up to date with the tree; returns the added, changed and removed files."""
+        seen, to_parse = set(), []
+        unchanged_content = []
+        for rel in self._walk():
+            seen.add(rel)
+            full = os.path.join(self.root, rel)
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            entry = self.files.get(rel)
+            if entry and entry.get("mtime_ns") == st.st_mtime_ns and entry.get("size") == st.st_size:
+                continue
+            # Touched: read and hash, and only re-parse if the content really changed
+            try:
+                with open(full, "rb") as f:
+                    source = f.read()
+            except OSError:
+                continue
+            self.stats["files_read"] += 1
+            if entry and entry.get("hash") == _sha1(source):
+                unchanged_content.append((rel, st))
+            else:
+                to_parse.append((rel, st, source))
+
+        parsed = self._parse([source for _, _, source in to_parse])
+        removed = sorted(set(self.files) - seen)
+        report = {"added": [], "changed": [], "removed": removed}
+        with self._lock:
+            for rel, st in unchanged_content:
+                self.files[rel].update(mtime_ns=st.st_mtime_ns, size=st.st_size)
+            for (rel, st, _), entry in zip(to_parse, parsed):
+                report["changed" if rel in self.files else "added"].append(rel)
+                entry.update(mtime_ns=st.st_mtime_ns, size=st.st_size)
+                self.files[rel] = entry
+            for rel in removed:
+                del self.files[rel]
+            if removed:
+                self.analyzed = {key: h for key, h in self.analyzed.items() if key.split("::", 1)[0] in self.files}
+            if to_parse or removed:
+                self._callers = None
+            self.stats["refreshes"] += 1
+            self.stats["files_scanned"] = len(seen)
+            self.stats["files_parsed"] += len(to_parse)
+        if to_parse or removed or unchanged_content:
+            self.save()
+        return report
+
+    def _parse(self, sources: Sequence[bytes]) -> List[Dict[str, Any]]:
+        workers = self.workers or os.cpu_count() or 1
+        if len(sources) < self.pool_threshold or workers < 2:
+            return [parse_source(source) for source in sources]
+        self.stats["parallel_batches"] += 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(parse_source, sources, chunksize=max(1, len(sources) // (workers * 4))))
+
+    @staticmethod
+    def key(rel: str, name: str) -> str:
+        return f"{rel}::{name}"
+
+    def symbols(self, rel: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """(file, symbol) pairs, for one file or the whole tree."""
+        files = [rel] if rel is not None else sorted(self.files)
+        for name in files:
+            for symbol in self.files.get(name, {}).get("symbols", ()):
+                yield name, symbol
+
+    def pending(self, rel: Optional[str] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """Symbols added or modified since they were last analyzed, most complex first."""
+        changed = [(name, symbol) for name, symbol in self.symbols(rel)
+                   if symbol["hash"] not in self.analyzed.get(self.key(name, symbol["name"]), ())]
+        return sorted(changed, key=lambda item: (-item[1]["complexity"], item[0], item[1]["line"]))
+
+    def mark_analyzed(self, items: Sequence[Tuple[str, Dict[str, Any]]]):
+        with self._lock:
+            for rel, symbol in items:
+                key = self.key(rel, symbol["name"])
+                # Keep the hashes of other current occurrences of the name; drop stale ones
+                current = {s["hash"] for s in self.files.get(rel, {}).get("symbols", ()) if s["name"] == symbol["name"]}
+                hashes = current.intersection(self.analyzed.get(key, ()))
+                hashes.add(symbol["hash"])
+                self.analyzed[key] = sorted(hashes)
+        self.save()
+
+    def callers(self, name: str) -> List[Tuple[str, str]]:
+        """
+        (file, symbol) pairs with a call ending in the last part of `name`.
+        Calls are resolved by name only, so `Agent.execute` also matches any
+        other object's execute(): an over-approximation, fine for context.
+        """
+        if self._callers is None:
+            callers: Dict[str, List[Tuple[str, str]]] = {}
+            for rel, symbol in self.symbols():
+                for short in {call.rsplit(".", 1)[-1] for call in symbol["calls"]}:
+                    callers.setdefault(short, []).append((rel, symbol["name"]))
+            self._callers = callers
+        return self._callers.get(name.rsplit(".", 1)[-1], [])
+
+    def source(self, rel: str, symbol: Dict[str, Any], _lines: Optional[Dict[str, List[str]]] = None) -> str:
+        """The symbol's current source text (`_lines` caches file contents across calls)."""
+        lines = _lines.get(rel) if _lines is not None else None
+        if lines is None:
+            with open(os.path.join(self.root, rel), encoding="utf-8", errors="replace") as f:
+                lines = f.readlines()
+            if _lines is not None:
+                _lines[rel] = lines
+        return "".join(lines[symbol["line"] - 1:symbol["end_line"]])
+
+    def build_prompt(self, items: Sequence[Tuple[str, Dict[str, Any]]], token_budget: int = 6000,
+                     max_symbol_lines: int = 80) -> Tuple[str, List[Tuple[str, Dict[str, Any]]]]:
+        """
+        Renders symbols (most relevant first) into an analysis prompt of at
+        most token_budget tokens: a header with location, complexity and
+        callers, then the source. Classes are summarized by their header and
+        method list, since their methods are listed on their own. Returns the
+        prompt and the symbols it includes.
+        """
+        parts, included, used = [], [], 0
+        lines: Dict[str, List[str]] = {}
+        for rel, symbol in items:
+            if token_budget - used < 64:
+                break
+            header = (f"### {rel}:{symbol['line']}-{symbol['end_line']} {symbol['kind']} {symbol['name']} "
+                      f"(complexity {symbol['complexity']}")
+            callers = self.callers(symbol["name"]) if symbol["kind"] != "class" else []
+            if callers:
+                header += f", called from {', '.join(f'{r}:{n}' for r, n in callers[:5])}"
+            header += ")\n"
+            body = self.source(rel, symbol, lines)
+            if symbol["kind"] == "class":
+                prefix = symbol["name"] + "."
+                methods = [s["name"][len(prefix):] for _, s in self.symbols(rel)
+                           if s["kind"] == "method" and s["name"].startswith(prefix) and "." not in s["name"][len(prefix):]]
+                declaration = next((line for line in body.splitlines() if line.lstrip().startswith("class ")), "")
+                body = f"{declaration}\n    # methods: {', '.join(methods)}\n"
+            elif body.count("\n") > max_symbol_lines:
+                body = "".join(body.splitlines(keepends=True)[:max_symbol_lines]) + "    # ... (truncated)\n"
+            block = f"{header}```python\n{body}```\n"
+            cost = estimate_tokens(block)
+            if used + cost > token_budget:
+                continue
+            parts.append(block)
+            included.append((rel, symbol))
+            used += cost
+        return "".join(parts), included
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            symbols = sum(len(entry.get("symbols", ())) for entry in self.files.values())
+            return {
+                **self.stats,
+                "files": len(self.files),
+                "symbols": symbols,
+                "parse_errors": sum(1 for entry in self.files.values() if "error" in entry),
+                "pending": len(self.pending())
+            }
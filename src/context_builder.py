@@ -0,0 +1,176 @@
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Deque, List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap local approximation of a BPE token count: every word or punctuation
+    mark is one token, plus one more per five characters of long words.
+    """
+    return sum(1 + len(piece) // 5 for piece in _TOKEN_RE.findall(text))
+
+# Recalled snippets mostly repeat from one Think step to the next
+_snippet_tokens = lru_cache(maxsize=256)(estimate_tokens)
+
+def _truncate(text: str, tokens: int) -> str:
+    """The longest prefix of text, cut after a whole word, that estimates to at most `tokens`."""
+    end = 0
+    for match in _TOKEN_RE.finditer(text):
+        tokens -= 1 + len(match.group()) // 5
+        if tokens < 0:
+            break
+        end = match.end()
+    return text[:end]
+
+# Section headers render() adds around the task and turns, reserved up front
+_SCAFFOLD = "Task: \n\nCurrent History:\nEarlier steps (summarized):\n- [100 earlier steps omitted]\nRecent steps:\n"
+_SCAFFOLD_TOKENS = estimate_tokens(_SCAFFOLD)
+_RECALL_HEADER = "Relevant Memory:\n"
+_RECALL_HEADER_TOKENS = estimate_tokens(_RECALL_HEADER)
+
+class ContextBuilder:
+    """
+    Incrementally maintained prompt context for the Think step.
+
+    The stable prefix (system prompt, tool list, response format) never changes
+    for the lifetime of an agent, so server-side prefix/KV caches can reuse it
+    across iterations and sessions. History is kept as pre-rendered turns with
+    their token counts; when the budget is exceeded the oldest turns are folded
+    into one-line summaries instead of being cut off mid-observation.
+    keep_recent turns stay verbatim as long as they fit the budget; a single
+    turn is clipped to half of it, so the newest turn always fits.
+    recall_tokens of the budget are kept free of history for recalled
+    snippets, which get whatever the history leaves and are clipped to it.
+    """
+
+    def __init__(self, stable_prefix: str, token_budget: int = 3072,
+                 keep_recent: int = 4, summary_chars: int = 160,
+                 recall_tokens: Optional[int] = None):
+        self.stable_prefix = stable_prefix
+        self.token_budget = token_budget
+        self.recall_tokens = token_budget // 8 if recall_tokens is None else recall_tokens
+        self.history_budget = token_budget - self.recall_tokens
+        self.keep_recent = keep_recent
+        self.summary_chars = summary_chars
+        self.max_turn_tokens = token_budget // 2
+        self.task = ""
+        self._task_tokens = 0
+        self._turns: Deque[Tuple[str, int]] = deque()
+        self._summaries: Deque[Tuple[str, int]] = deque()
+        self._omitted = 0
+        self._tokens = 0
+        self._rendered: Optional[str] = None
+
+    def reset(self, task: str):
+        """Starts a new task; the task text is pinned at the top of the history."""
+        self.task = task
+        self._task_tokens = estimate_tokens(task)
+        self._turns.clear()
+        self._summaries.clear()
+        self._omitted = 0
+        self._tokens = self._task_tokens + _SCAFFOLD_TOKENS
+        self._rendered = None
+
+    def add_turn(self, role: str, content: str):
+        line = self._render_turn(role, content)
+        tokens = estimate_tokens(line)
+        if tokens > self.max_turn_tokens:
+            line = self._clip(line, self.max_turn_tokens)
+            tokens = estimate_tokens(line)
+        self._turns.append((line, tokens))
+        self._tokens += tokens
+        self._rendered = None
+        self._compact()
+
+    @staticmethod
+    def _render_turn(role: str, content: str) -> str:
+        return f"{role.upper()}: {content.strip()}\n"
+
+    def _clip(self, line: str, tokens: int) -> str:
+        # Keep head and tail of an oversized turn (e.g. a huge shell output)
+        chars = tokens * 3
+        head, tail = line[:chars // 2], line[-chars // 2:]
+        return f"{head}\n[... {len(line) - len(head) - len(tail)} chars elided ...]\n{tail}"
+
+    def _summarize(self, line: str) -> str:
+        role, _, body = line.partition(": ")
+        lines = [l for l in body.splitlines() if l.strip()]
+        actions = [l for l in lines if l.startswith("Action:")]
+        gist = actions[0] if actions else (lines[0] if lines else "")
+        if len(gist) > self.summary_chars:
+            gist = gist[:self.summary_chars] + "..."
+        if len(lines) > 1:
+            gist += f" [{len(lines)} lines]"
+        return f"- {role}: {gist}\n"
+
+    def _compact(self):
+        # Fold turns older than the keep_recent newest into summaries, and drop the oldest
+        # summaries into a counter. If the recent turns alone still exceed the budget (each
+        # may be up to max_turn_tokens), fold those too, down to the newest turn.
+        for keep in (self.keep_recent, 1):
+            while self._tokens > self.history_budget and len(self._turns) > keep:
+                line, tokens = self._turns.popleft()
+                summary = self._summarize(line)
+                summary_tokens = estimate_tokens(summary)
+                self._summaries.append((summary, summary_tokens))
+                self._tokens += summary_tokens - tokens
+            while self._tokens > self.history_budget and self._summaries:
+                _, tokens = self._summaries.popleft()
+                self._tokens -= tokens
+                self._omitted += 1
+
+    @property
+    def resident_turns(self) -> int:
+        """Number of most recent turns still rendered verbatim."""
+        return len(self._turns)
+
+    @property
+    def token_count(self) -> int:
+        """Estimated tokens of the prompt body (excluding the stable prefix)."""
+        return self._tokens
+
+    def render(self, relevant: Optional[List[str]] = None) -> str:
+        """
+        Returns the history prompt; cached until the next turn is added.
+        `relevant` snippets (e.g. retrieved from earlier tasks) are placed
+        after the task, ahead of the history, as far as the budget left by the
+        history allows; the snippet that crosses it is clipped, later ones dropped.
+        """
+        if self._rendered is None:
+            parts: List[str] = [f"Task: {self.task}\n\nCurrent History:\n"]
+            if self._summaries or self._omitted:
+                parts.append("Earlier steps (summarized):\n")
+                if self._omitted:
+                    parts.append(f"- [{self._omitted} earlier steps omitted]\n")
+                parts.extend(summary for summary, _ in self._summaries)
+                parts.append("Recent steps:\n")
+            parts.extend(line for line, _ in self._turns)
+            self._rendered = "".join(parts)
+        if not relevant:
+            return self._rendered
+        room = self.token_budget - self._tokens - _RECALL_HEADER_TOKENS
+        recalled = [f"- {snippet}\n" for snippet in relevant]
+        # No text estimates to more tokens than it has characters: skip counting when it fits anyway
+        if sum(map(len, recalled)) > room:
+            recalled = self._fit_recalled(recalled, room)
+        if not recalled:
+            return self._rendered
+        header = f"Task: {self.task}\n\n"
+        return f"{header}{_RECALL_HEADER}{''.join(recalled)}\n{self._rendered[len(header):]}"
+
+    @staticmethod
+    def _fit_recalled(lines: List[str], room: int) -> List[str]:
+        recalled: List[str] = []
+        for line in lines:
+            tokens = _snippet_tokens(line)
+            if tokens > room:
+                # Too little room left is not worth a fragment
+                if room >= 16:
+                    recalled.append(f"{_truncate(line, room - 3)} ...\n")
+                break
+            recalled.append(line)
+            room -= tokens
+        return recalled
@@ -0,0 +1,263 @@
+import time
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+Step = Tuple[str, tuple]
+
+class InputBackend(ABC):
+    """
+    Mouse/keyboard primitives an InputEngine drives. Backends do not pace
+    themselves: every delay comes from the engine through sleep().
+    """
+
+    @abstractmethod
+    def move(self, x: int, y: int, duration: float = 0.0):
+        ...
+
+    @abstractmethod
+    def click(self, button: str = "left", clicks: int = 1):
+        ...
+
+    @abstractmethod
+    def write(self, text: str, interval: float = 0.0):
+        ...
+
+    @abstractmethod
+    def press(self, key: str, presses: int = 1):
+        ...
+
+    @abstractmethod
+    def hotkey(self, *keys: str):
+        ...
+
+    @abstractmethod
+    def scroll(self, amount: int):
+        ...
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+class PyAutoGUIBackend(InputBackend):
+    """The real mouse and keyboard via pyautogui."""
+
+    def __init__(self):
+        import pyautogui
+        self._gui = pyautogui
+        # Fail-safe: slamming the mouse into a screen corner aborts runaway input
+        pyautogui.FAILSAFE = True
+        # pyautogui sleeps PAUSE (0.1 s) after every call; pacing is the engine's job
+        pyautogui.PAUSE = 0
+
+    def move(self, x: int, y: int, duration: float = 0.0):
+        self._gui.moveTo(x, y, duration=duration)
+
+    def click(self, button: str = "left", clicks: int = 1):
+        self._gui.click(button=button, clicks=clicks)
+
+    def write(self, text: str, interval: float = 0.0):
+        self._gui.write(text, interval=interval)
+
+    def press(self, key: str, presses: int = 1):
+        self._gui.press(key, presses=presses)
+
+    def hotkey(self, *keys: str):
+        self._gui.hotkey(*keys)
+
+    def scroll(self, amount: int):
+        self._gui.scroll(amount)
+
+class RecordingBackend(InputBackend):
+    """
+    Headless backend: records every primitive as (op, args) in `events`.
+    Delays are accumulated in `elapsed` instead of slept, unless real_time is set.
+    """
+
+    def __init__(self, real_time: bool = False):
+        self.real_time = real_time
+        self.events: List[Step] = []
+        self.elapsed = 0.0
+        self.position = (0, 0)
+
+    def move(self, x: int, y: int, duration: float = 0.0):
+        self.events.append(("move", (x, y)))
+        self.position = (x, y)
+        self.sleep(duration)
+
+    def click(self, button: str = "left", clicks: int = 1):
+        self.events.append(("click", (button, clicks)))
+
+    def write(self, text: str, interval: float = 0.0):
+        self.events.append(("write", (text,)))
+        self.sleep(interval * len(text))
+
+    def press(self, key: str, presses: int = 1):
+        self.events.append(("press", (key, presses)))
+
+    def hotkey(self, *keys: str):
+        self.events.append(("hotkey", keys))
+
+    def scroll(self, amount: int):
+        self.events.append(("scroll", (amount,)))
+
+    def sleep(self, seconds: float):
+        if seconds <= 0:
+            return
+        self.elapsed += seconds
+        if self.real_time:
+            time.sleep(seconds)
+
+    def clear(self):
+        self.events.clear()
+        self.elapsed = 0.0
+
+class Pacing:
+    """
+    Delays applied by the engine. INSTANT types in bulk and jumps the pointer;
+    HUMAN resembles the old fixed pauses for apps that drop fast input.
+    """
+
+    __slots__ = ("move_duration", "key_interval", "action_delay")
+
+    def __init__(self, move_duration: float = 0.0, key_interval: float = 0.0, action_delay: float = 0.0):
+        self.move_duration = move_duration
+        self.key_interval = key_interval
+        self.action_delay = action_delay
+
+Pacing.INSTANT = Pacing()
+Pacing.FAST = Pacing(move_duration=0.0, key_interval=0.0, action_delay=0.02)
+Pacing.HUMAN = Pacing(move_duration=0.25, key_interval=0.03, action_delay=0.1)
+
+class Macro:
+    """
+    A sequence of input steps, built fluently:
+        Macro().click(100, 200).type("hello").press("enter").hotkey("ctrl", "s")
+    """
+
+    def __init__(self, steps: Optional[Sequence[Step]] = None):
+        self.steps: List[Step] = list(steps or [])
+
+    def move(self, x: int, y: int) -> "Macro":
+        self.steps.append(("move", (int(x), int(y))))
+        return self
+
+    def click(self, x: Optional[int] = None, y: Optional[int] = None, button: str = "left",
+              clicks: Optional[int] = None) -> "Macro":
+        """
+        Clicks once, or `clicks` times as one multi-click. Only clicks given an
+        explicit count are merged with their neighbours by compile(): two plain
+        clicks on the same spot stay two clicks, not a double-click.
+        """
+        if x is not None and y is not None:
+            self.move(x, y)
+        self.steps.append(("click", (button, 1 if clicks is None else clicks, clicks is not None)))
+        return self
+
+    def type(self, text: str) -> "Macro":
+        if text:
+            self.steps.append(("write", (text,)))
+        return self
+
+    def press(self, key: str, presses: int = 1) -> "Macro":
+        self.steps.append(("press", (key, presses)))
+        return self
+
+    def hotkey(self, *keys: str) -> "Macro":
+        self.steps.append(("hotkey", keys))
+        return self
+
+    def scroll(self, amount: int) -> "Macro":
+        self.steps.append(("scroll", (amount,)))
+        return self
+
+    def wait(self, seconds: float) -> "Macro":
+        self.steps.append(("wait", (seconds,)))
+        return self
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def compile(self, position: Optional[Tuple[int, int]] = None) -> List[Step]:
+        """
+        Optimized step list: consecutive moves collapse into the last one, a
+        move to where the pointer already is is dropped, adjacent text is
+        concatenated, repeated key presses and explicitly counted clicks are
+        merged into counts and consecutive waits are summed.
+        """
+        compiled: List[Step] = []
+        moved_from = position
+        for op, args in self.steps:
+            last_op, last_args = compiled[-1] if compiled else (None, ())
+            if op == "move":
+                if last_op == "move":
+                    compiled.pop()
+                    position = moved_from
+                if args == position:
+                    continue
+                moved_from, position = position, args
+            elif op == "write" and last_op == "write":
+                compiled[-1] = ("write", (last_args[0] + args[0],))
+                continue
+            elif op == "press" and last_op == "press" and last_args[0] == args[0]:
+                compiled[-1] = ("press", (args[0], last_args[1] + args[1]))
+                continue
+            elif op == "click" and last_op == "click" and last_args[0] == args[0] and args[2] and last_args[2]:
+                compiled[-1] = ("click", (args[0], last_args[1] + args[1], True))
+                continue
+            elif op == "wait" and last_op == "wait":
+                compiled[-1] = ("wait", (last_args[0] + args[0],))
+                continue
+            compiled.append((op, args))
+        return compiled
+
+class InputEngine:
+    """
+    Compiles macros and runs them on a backend with the configured pacing.
+    One macro runs at a time: the mouse and keyboard are a single device.
+    """
+
+    def __init__(self, backend: Optional[InputBackend] = None, pacing: Pacing = Pacing.FAST):
+        self.backend = backend or PyAutoGUIBackend()
+        self.pacing = pacing
+        self._lock = threading.Lock()
+        self.stats = {"macros": 0, "steps_in": 0, "steps_run": 0, "characters": 0, "busy_seconds": 0.0}
+
+    def run(self, macro: Macro, pacing: Optional[Pacing] = None) -> Dict[str, Any]:
+        """Executes a macro; returns its step counts and wall time."""
+        pacing = pacing or self.pacing
+        with self._lock:
+            start = time.perf_counter()
+            # The pointer may have been moved by the user in between: only moves within a macro are elided
+            steps = macro.compile()
+            backend = self.backend
+            for i, (op, args) in enumerate(steps):
+                if i and pacing.action_delay and op != "wait":
+                    backend.sleep(pacing.action_delay)
+                if op == "move":
+                    backend.move(args[0], args[1], pacing.move_duration)
+                elif op == "click":
+                    backend.click(args[0], args[1])
+                elif op == "write":
+                    backend.write(args[0], pacing.key_interval)
+                    self.stats["characters"] += len(args[0])
+                elif op == "press":
+                    backend.press(*args)
+                elif op == "hotkey":
+                    backend.hotkey(*args)
+                elif op == "scroll":
+                    backend.scroll(*args)
+                elif op == "wait":
+                    backend.sleep(args[0])
+                else:
+                    raise ValueError(f"Unknown macro step: {op}")
+            elapsed = time.perf_counter() - start
+            self.stats["macros"] += 1
+            self.stats["steps_in"] += len(macro)
+            self.stats["steps_run"] += len(steps)
+            self.stats["busy_seconds"] += elapsed
+        return {"steps": len(macro), "executed": len(steps), "seconds": elapsed}
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["merged_steps"] = stats["steps_in"] - stats["steps_run"]
+        return stats
@@ -0,0 +1,303 @@
+import os
+import json
+import time
+import uuid
+import bisect
+import weakref
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Log-spaced bucket bounds: 100 us .. ~2 min for durations (x1.25), 1 .. 1M for sizes (x2)
+TIME_BUCKETS = tuple(1e-4 * 1.25 ** i for i in range(64))
+SIZE_BUCKETS = tuple(float(2 ** i) for i in range(21))
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    """Fixed-bucket histogram: O(log buckets) to record, percentiles interpolated within a bucket."""
+
+    __slots__ = ("bounds", "counts", "count", "sum", "max")
+
+    def __init__(self, bounds: Tuple[float, ...] = TIME_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.bounds[i - 1] if i else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {"count": self.count, "sum": self.sum, "mean": self.sum / self.count if self.count else 0.0,
+                "p50": self.percentile(50), "p95": self.percentile(95), "p99": self.percentile(99),
+                "max": self.max}
+
+class _Timer:
+    __slots__ = ("metrics", "name", "labels", "start")
+
+    def __init__(self, metrics: "Metrics", name: str, labels: Dict[str, Any]):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+class Metrics:
+    """
+    Counters, gauges and histograms keyed by name and labels, cheap enough to
+    leave on: one dict lookup and a bisect under an uncontended lock per sample.
+    Collectors add gauges computed at export time (cache hit rates, uptime).
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._collectors: List[Callable[[], Optional[Callable]]] = []  # References to the collectors
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels: Dict[str, Any]) -> LabelKey:
+        if not labels:
+            return ()
+        if len(labels) == 1:  # The common case (phase=, tool=, endpoint=) needs no sort
+            (k, v), = labels.items()
+            return ((k, str(v)),)
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, amount: float = 1, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = TIME_BUCKETS, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def time(self, name: str, **labels: Any) -> _Timer:
+        """Context manager recording the block's duration in seconds."""
+        return _Timer(self, name, labels)
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, Dict[str, Any], float]]]):
+        """
+        collector() yields (gauge name, labels, value) at export time. Bound methods
+        are held weakly: registering one does not keep its object alive.
+        """
+        ref = weakref.WeakMethod(collector) if hasattr(collector, "__func__") else (lambda: collector)
+        with self._lock:
+            self._collectors.append(ref)
+
+    def remove_collector(self, collector):
+        with self._lock:
+            self._collectors = [ref for ref in self._collectors if ref() not in (None, collector)]
+
+    def _collected(self) -> Dict[str, Dict[LabelKey, float]]:
+        with self._lock:
+            gauges = {name: dict(series) for name, series in self._gauges.items()}
+            collectors = [ref() for ref in self._collectors]
+            if None in collectors:  # Owner garbage collected without remove_collector()
+                self._collectors = [ref for ref, c in zip(self._collectors, collectors) if c is not None]
+        for collector in collectors:
+            if collector is None:
+                continue
+            try:
+                for name, labels, value in collector():
+                    if value is not None:
+                        gauges.setdefault(name, {})[self._key(labels)] = value
+            except Exception as e:
+                print(f"[!] Metrics collector failed: {e}")
+        return gauges
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters, gauges and histogram summaries (p50/p95/p99) as nested dicts."""
+        label = lambda key: ",".join(f"{k}={v}" for k, v in key) or "all"
+        gauges = self._collected()
+        with self._lock:
+            return {
+                "counters": {name: {label(k): v for k, v in series.items()}
+                             for name, series in self._counters.items()},
+                "gauges": {name: {label(k): v for k, v in series.items()} for name, series in gauges.items()},
+                "histograms": {name: {label(k): h.summary() for k, h in series.items()}
+                               for name, series in self._histograms.items()}
+            }
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        gauges = self._collected()
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                lines.extend(f"{name}{_labels(key)} {_number(value)}" for key, value in series.items())
+            for name, series in sorted(gauges.items()):
+                lines.append(f"# TYPE {name} gauge")
+                lines.extend(f"{name}{_labels(key)} {_number(value)}" for key, value in series.items())
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in series.items():
+                    cumulative = 0
+                    # Every bound, empty or not: rate() and histogram_quantile() need the same le set
+                    # in every scrape
+                    for bound, n in zip(histogram.bounds, histogram.counts):
+                        cumulative += n
+                        lines.append(f"{name}_bucket{_labels(key, le=f'{bound:.6g}')} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels(key, le='+Inf')} {histogram.count}")
+                    lines.append(f"{name}_sum{_labels(key)} {_number(histogram.sum)}")
+                    lines.append(f"{name}_count{_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1") -> "MetricsServer":
+        return MetricsServer(self, port, host).start()
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _labels(key: LabelKey, **extra: str) -> str:
+    pairs = list(key) + list(extra.items())
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class MetricsServer:
+    """Serves GET /metrics in Prometheus text format from a daemon thread."""
+
+    def __init__(self, metrics: Metrics, port: int = 9464, host: str = "127.0.0.1"):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # ~20 ms; only when exporting
+        self.metrics = metrics
+        metrics_ref = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = metrics_ref.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "MetricsServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="ns-metrics", daemon=True)
+        self._thread.start()
+        print(f"[*] Metrics exported on http://{self.host}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+class Tracer:
+    """
+    Writes trace spans as JSON Lines (one object per finished span) when a
+    path is set; otherwise spans cost almost nothing. Spans nest per thread
+    and per asyncio task (the parent lives in a context variable).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+        self._current: contextvars.ContextVar = contextvars.ContextVar(f"ns_span_{id(self)}", default=None)
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(path, "a", encoding="utf-8")
+
+    @property
+    def enabled(self) -> bool:
+        return self._file is not None
+
+    @contextmanager
+    def span(self, name: str, **attrs: Any) -> Iterator[Dict[str, Any]]:
+        """Records a span; the yielded dict may receive more attributes inside the block."""
+        if self._file is None:
+            yield attrs
+            return
+        parent = self._current.get()
+        span_id = uuid.uuid4().hex[:16]
+        trace_id = parent[0] if parent else uuid.uuid4().hex
+        token = self._current.set((trace_id, span_id))
+        start, wall = time.perf_counter(), time.time()
+        error = None
+        try:
+            yield attrs
+        except BaseException as e:
+            error = repr(e)
+            raise
+        finally:
+            self._current.reset(token)
+            record = {"trace_id": trace_id, "span_id": span_id, "parent_id": parent[1] if parent else None,
+                      "name": name, "start": wall, "duration_ms": (time.perf_counter() - start) * 1e3}
+            if attrs:
+                record["attrs"] = attrs
+            if error:
+                record["error"] = error
+            line = json.dumps(record, default=str) + "\n"
+            with self._lock:
+                self._file.write(line)
+                if parent is None:
+                    self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            with self._lock:
+                self._file.close()
+                self._file = None
+
+# Process-wide registry: engines, tools and agents record here, one export shows everything
+METRICS = Metrics()
@@ -0,0 +1,79 @@
+import sys
+import types
+import threading
+from typing import Any, Callable, Optional
+
+class LazyModule(types.ModuleType):
+    """
+    Stands in for a module until one of its attributes is used, then imports
+    it. Heavy or optional dependencies (numpy, requests, pyautogui,
+    websockets) cost nothing for code paths that never touch them, and a
+    missing one only fails where it is actually needed.
+    """
+
+    def __init__(self, name: str, package: Optional[str] = None):
+        super().__init__(name)
+        self.__dict__["_package"] = package
+        self.__dict__["_module"] = None
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__["_module"]
+        if module is None:
+            package = self.__dict__["_package"]
+            full_name = f"{package}.{self.__name__}" if package else self.__name__
+            # __import__ rather than importlib.import_module: only the former is logged by -X importtime
+            __import__(full_name)
+            module = self.__dict__["_module"] = sys.modules[full_name]
+        return module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value: Any):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    @property
+    def loaded(self) -> bool:
+        return self.__dict__["_module"] is not None
+
+def lazy_import(name: str, package: Optional[str] = None) -> types.ModuleType:
+    """
+    Returns the module if it is already imported, otherwise a LazyModule.
+    Pass __package__ to import a sibling module the way a relative import would.
+    """
+    full_name = f"{package}.{name}" if package else name
+    module = sys.modules.get(full_name)
+    return module if module is not None else LazyModule(name, package)
+
+class LazyComponent:
+    """
+    Descriptor for a subsystem built on first access by factory(instance).
+    The result is stored in the instance's __dict__, so later reads are plain
+    attribute lookups, and assigning the attribute (e.g. a test double)
+    replaces it without ever running the factory.
+    """
+
+    def __init__(self, factory: Callable[[Any], Any]):
+        self.factory = factory
+        self.name = getattr(factory, "__name__", "component")
+        # Re-entrant: a factory may read other lazy components of the same object
+        self._lock = threading.RLock()
+
+    def __set_name__(self, owner: type, name: str):
+        self.name = name
+
+    def __get__(self, instance: Any, owner: Optional[type] = None) -> Any:
+        if instance is None:
+            return self
+        with self._lock:
+            value = instance.__dict__.get(self.name, self)
+            if value is self:
+                value = instance.__dict__[self.name] = self.factory(instance)
+        return value
+
+def is_loaded(instance: Any, name: str) -> bool:
+    """Whether a LazyComponent attribute has been created (or assigned) on this instance."""
+    return name in instance.__dict__
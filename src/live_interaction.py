@@ -1,56 +1,323 @@
-import asyncio
+import os
+import time
 import json
-import websockets
-from typing import Callable, Any
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Any, Dict, List, Optional
+try:
+    from .broadcast_bus import BroadcastBus, WebSocketBroadcaster
+    from .lazy_loader import lazy_import
+except ImportError:
+    from broadcast_bus import BroadcastBus, WebSocketBroadcaster
+    from lazy_loader import lazy_import
+
+# Only needed once the live loop starts or a stream is subscribed
+asyncio = lazy_import("asyncio")
+websockets = lazy_import("websockets")
+
+# Queue policies when a stream's handler falls behind
+DROP_OLDEST = "drop_oldest"    # Keep the most recent messages
+DROP_NEWEST = "drop_newest"    # Keep the backlog, refuse new messages
+COALESCE = "coalesce"          # A newer message with the same key replaces the queued one
+
+class _Stream:
+    """One subscribed WebSocket: its bounded queue, delivery state and counters."""
+
+    def __init__(self, url: str, handler: Callable[[Any], None], batched: bool, policy: str,
+                 queue_size: int, batch_size: int, coalesce_key: Optional[Callable[[Any], Any]]):
+        if policy == COALESCE and coalesce_key is None:
+            raise ValueError("The coalesce policy needs a coalesce_key")
+        self.url = url
+        self.handler = handler
+        self.batched = batched
+        self.policy = policy
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.coalesce_key = coalesce_key
+        # Keyed by sequence number, or by coalesce key; insertion order is delivery order
+        self.pending: "OrderedDict[Any, tuple]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.delivering = False
+        self.closed = False
+        self.task: Optional[asyncio.Future] = None
+        self.seq = 0
+        self.stats = {"connected": False, "received": 0, "delivered": 0, "dropped": 0, "coalesced": 0,
+                      "batches": 0, "handler_errors": 0, "reconnects": 0, "lag_seconds": 0.0,
+                      "max_lag_seconds": 0.0}
+
+    def enqueue(self, item: Any) -> bool:
+        """Queues a message under the stream's policy; returns whether a delivery must be scheduled."""
+        now = time.monotonic()
+        with self.lock:
+            self.stats["received"] += 1
+            key = None
+            if self.policy == COALESCE:
+                key = self.coalesce_key(item)
+                if key in self.pending:
+                    # Keep the queue position and age of the superseded message
+                    self.pending[key] = (self.pending[key][0], item)
+                    self.stats["coalesced"] += 1
+                    return False
+            if len(self.pending) >= self.queue_size:
+                self.stats["dropped"] += 1
+                if self.policy == DROP_NEWEST:
+                    return False
+                self.pending.popitem(last=False)
+            if key is None:
+                self.seq += 1
+                key = self.seq
+            self.pending[key] = (now, item)
+            if self.delivering:
+                return False
+            self.delivering = True
+            return True
+
+    def next_batch(self) -> Optional[List[tuple]]:
+        with self.lock:
+            if not self.pending:
+                self.delivering = False
+                return None
+            return [self.pending.popitem(last=False)[1] for _ in range(min(self.batch_size, len(self.pending)))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            stats = dict(self.stats)
+            stats["queued"] = len(self.pending)
+            if self.pending:
+                stats["lag_seconds"] = time.monotonic() - next(iter(self.pending.values()))[0]
+        return stats
 
 class LiveInteractionModule:
     """
     Module for real-time interaction and data streaming.
     Enables the agent to connect to live data sources and handle real-time events.
+
+    Streams are multiplexed on one asyncio loop running in a background thread.
+    The receive loop only parses and enqueues; handlers run in batches on a
+    worker pool (one batch per stream at a time, so per-stream order holds),
+    so a slow handler fills its own bounded queue instead of stalling the
+    socket. Dropped connections are retried with jittered exponential backoff.
     """
-    
-    def __init__(self):
-        self.active_streams = {}
+
+    def __init__(self, workers: int = 4, queue_size: int = 1024, batch_size: int = 64,
+                 policy: str = DROP_OLDEST, reconnect_base: float = 0.5, reconnect_max: float = 30.0):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.policy = policy
+        self.reconnect_base = reconnect_base
+        self.reconnect_max = reconnect_max
+        self.active_streams: Dict[str, _Stream] = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ns-live")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # Live sessions by URL; each URL's stream fans out to its sessions' handlers
+        self._session_handlers: Dict[str, List[Callable[[Any], None]]] = {}
+        self._session_lock = threading.Lock()
+        # Outgoing side: agent actions fan out to dashboards, files and callbacks
+        self.bus = BroadcastBus()
+        self._broadcaster: Optional[WebSocketBroadcaster] = None
         print("Live Interaction Module Initialized.")
 
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Starts the background event loop thread (idempotent)."""
+        with self._lock:
+            if self.running:
+                return
+            ready = threading.Event()
+            self._loop = asyncio.new_event_loop()
+
+            def run():
+                asyncio.set_event_loop(self._loop)
+                self._loop.call_soon(ready.set)
+                self._loop.run_forever()
+                self._loop.close()
+
+            self._thread = threading.Thread(target=run, name="ns-live-loop", daemon=True)
+            self._thread.start()
+            ready.wait()
+
+    def subscribe(self, url: str, handler: Callable[[Any], None], batched: bool = True,
+                  policy: Optional[str] = None, queue_size: Optional[int] = None,
+                  batch_size: Optional[int] = None, coalesce_key: Optional[Callable[[Any], Any]] = None):
+        """
+        Connects to a WebSocket stream on the background loop. The handler gets
+        lists of parsed messages (JSON where possible), or single messages when
+        batched is False.
+        """
+        self.start()
+        stream = _Stream(url, handler, batched, policy or self.policy, queue_size or self.queue_size,
+                         batch_size or self.batch_size, coalesce_key)
+        self.unsubscribe(url)
+        self.active_streams[url] = stream
+        stream.task = asyncio.run_coroutine_threadsafe(self._run_stream(stream), self._loop)
+        return stream
+
+    def unsubscribe(self, url: str):
+        stream = self.active_streams.pop(url, None)
+        if stream is not None:
+            stream.closed = True
+            if stream.task is not None:
+                stream.task.cancel()
+
     async def connect_to_stream(self, url: str, callback: Callable[[Any], None]):
-        """Connects to a WebSocket stream and processes incoming data."""
-        print(f"Connecting to live stream: {url}")
+        """Connects to a WebSocket stream in the running loop; callback gets one message at a time."""
+        stream = _Stream(url, callback, False, self.policy, self.queue_size, self.batch_size, None)
+        self.active_streams[url] = stream
         try:
-            async with websockets.connect(url) as websocket:
-                self.active_streams[url] = websocket
-                while True:
-                    data = await websocket.recv()
-                    # Process data (e.g., JSON parsing)
-                    try:
-                        parsed_data = json.loads(data)
-                        callback(parsed_data)
-                    except json.JSONDecodeError:
-                        callback(data)
-        except Exception as e:
-            print(f"Error in live stream {url}: {e}")
+            await self._run_stream(stream)
         finally:
-            if url in self.active_streams:
+            if self.active_streams.get(url) is stream:
                 del self.active_streams[url]
 
-    def start_live_session(self, source_url: str, handler: Callable[[Any], None]):
-        """Starts a live interaction session in a separate event loop."""
-        print(f"Starting live session for {source_url}")
-        # In a real application, this would run in a background thread or process
-        # asyncio.run(self.connect_to_stream(source_url, handler))
-        pass
+    async def _run_stream(self, stream: _Stream):
+        print(f"Connecting to live stream: {stream.url}")
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while not stream.closed:
+            try:
+                async with websockets.connect(stream.url) as websocket:
+                    stream.stats["connected"] = True
+                    attempt = 0
+                    async for data in websocket:
+                        try:
+                            data = json.loads(data)
+                        except (json.JSONDecodeError, TypeError):
+                            pass
+                        if stream.enqueue(data):
+                            loop.run_in_executor(self._executor, self._deliver, stream)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in live stream {stream.url}: {e}")
+            finally:
+                stream.stats["connected"] = False
+            if stream.closed:
+                break
+            # Full jitter keeps many clients from reconnecting to a restarted server in lockstep
+            delay = random.uniform(0, min(self.reconnect_max, self.reconnect_base * 2 ** attempt))
+            attempt += 1
+            stream.stats["reconnects"] += 1
+            await asyncio.sleep(delay)
+
+    def _deliver(self, stream: _Stream):
+        """Worker: drains the stream's queue in batches until it is empty."""
+        while True:
+            batch = stream.next_batch()
+            if batch is None:
+                return
+            lag = time.monotonic() - batch[0][0]
+            items = [item for _, item in batch]
+            try:
+                if stream.batched:
+                    stream.handler(items)
+                else:
+                    for item in items:
+                        stream.handler(item)
+            except Exception as e:
+                stream.stats["handler_errors"] += 1
+                print(f"Error in live stream handler {stream.url}: {e}")
+            with stream.lock:
+                stream.stats["delivered"] += len(items)
+                stream.stats["batches"] += 1
+                stream.stats["lag_seconds"] = lag
+                stream.stats["max_lag_seconds"] = max(stream.stats["max_lag_seconds"], lag)
+
+    def start_live_session(self, source_url: Optional[str] = None,
+                           handler: Optional[Callable[[Any], None]] = None):
+        """
+        Starts the live runtime and subscribes the handler to source_url, or to
+        every URL in LIVE_STREAM_URLS (comma-separated) when none is given.
+        Sessions on the same URL share one connection; each handler gets every batch.
+        """
+        urls = [source_url] if source_url else [
+            url.strip() for url in os.getenv("LIVE_STREAM_URLS", "").split(",") if url.strip()]
+        print(f"Starting live session for {', '.join(urls) or 'no streams'}")
+        self.start()
+        handler = handler or (lambda items: None)
+        with self._session_lock:
+            for url in urls:
+                handlers = self._session_handlers.setdefault(url, [])
+                handlers.append(handler)
+                if len(handlers) == 1:
+                    self.subscribe(url, lambda items, url=url: self._fan_out(url, items))
+
+    def _fan_out(self, url: str, items: List[Any]):
+        """Stream handler for live sessions: passes the batch to every session on the URL."""
+        error = None
+        for handler in list(self._session_handlers.get(url, ())):
+            try:
+                handler(items)
+            except Exception as e:
+                error = e
+        if error is not None:
+            raise error
 
-    def broadcast_action(self, action_data: dict):
-        """Broadcasts an agent action to a live channel (e.g., for 'Live' mode)."""
-        print(f"Broadcasting action: {action_data.get('action', 'unknown')}")
-        # Logic to send data to a streaming platform or dashboard
-        pass
+    def stop_live_session(self, handler: Optional[Callable[[Any], None]] = None):
+        """
+        Removes the session's handler from its streams, closing the streams it was
+        the last handler of, and stops the background loop once no stream is left.
+        Without a handler, closes every stream.
+        """
+        with self._session_lock:
+            for url, handlers in list(self._session_handlers.items()):
+                if handler is not None:
+                    if handler in handlers:
+                        handlers.remove(handler)
+                    if handlers:
+                        continue
+                del self._session_handlers[url]
+                self.unsubscribe(url)
+            if handler is None:
+                for url in list(self.active_streams):
+                    self.unsubscribe(url)
+            if not self.active_streams:
+                self.stop()
+
+    def stop(self):
+        """Stops the background loop, cancelling whatever still runs on it."""
+        with self._lock:
+            if self.running:
+                asyncio.run_coroutine_threadsafe(self._cancel_tasks(), self._loop).result(timeout=5)
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+            self._thread = None
+
+    @staticmethod
+    async def _cancel_tasks():
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stream counters: received, delivered, dropped, coalesced, reconnects, current and max lag."""
+        return {url: stream.snapshot() for url, stream in list(self.active_streams.items())}
+
+    def broadcast_action(self, action_data: dict) -> int:
+        """
+        Broadcasts an agent action to live subscribers (dashboards, files, callbacks).
+        Never blocks: the event goes into the bus ring buffer; returns its sequence number.
+        """
+        return self.bus.publish(action_data)
+
+    def serve_dashboard(self, host: str = "127.0.0.1", port: int = 8765) -> WebSocketBroadcaster:
+        """Serves broadcast actions to WebSocket clients on host:port."""
+        if self._broadcaster is None:
+            self._broadcaster = WebSocketBroadcaster(self.bus, host, port).start()
+        return self._broadcaster
 
 # Example usage (for testing purposes)
 if __name__ == "__main__":
     live_module = LiveInteractionModule()
-    
-    def my_handler(data):
-        print(f"Received live data: {data}")
+
+    def my_handler(batch):
+        print(f"Received {len(batch)} live messages: {batch[:3]}")
 
     # live_module.start_live_session("wss://example.com/live-data", my_handler)
@@ -1,66 +1,373 @@
 import os
-import requests
+import time
+import threading
 import json
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple, Union
+try:
+    from .response_cache import ResponseCache
+    from .context_builder import estimate_tokens
+    from .instrumentation import METRICS, SIZE_BUCKETS
+    from .lazy_loader import lazy_import
+except ImportError:
+    from response_cache import ResponseCache
+    from context_builder import estimate_tokens
+    from instrumentation import METRICS, SIZE_BUCKETS
+    from lazy_loader import lazy_import
+
+# Imported when the first HTTP session is created / the first async call is made
+requests = lazy_import("requests")
+asyncio = lazy_import("asyncio")
+
+# Requests that fail are answered with error text or a mock reply instead of raising
+ERROR_PREFIX = "Error connecting to LLM server:"
+MOCK_RESPONSES = {
+    "directory": "Thought: The user wants to create a directory. I should use the shell.\nAction: execute_shell('mkdir -p Sovereign_Data && ls -F')",
+    "search": "Thought: I need to search the web. I will use the browser tool.\nAction: execute_shell('curl -s https://api.duckduckgo.com/?q=AI+trends&format=json')",
+    "default": "Thought: I am processing the request.\nAction: final_answer('I am ready to assist you with your sovereign AI tasks.')"
+}
+
+def is_fallback_response(text: str) -> bool:
+    """Whether generate_response returned error text or a mock reply rather than a real completion."""
+    return text.startswith(ERROR_PREFIX) or text in MOCK_RESPONSES.values()
+
+class ServerHealthMonitor:
+    """
+    Cached liveness state and circuit breaker for the inference server.
+
+    The hot path only reads in-memory state: `allow_request()` never touches the
+    network. A daemon thread refreshes the state every `ttl` seconds while the
+    breaker is closed and, once it opens, re-probes with exponential backoff.
+    """
+
+    CLOSED = "closed"        # Server healthy, requests flow normally
+    OPEN = "open"            # Server known to be down, use the fallback path
+    HALF_OPEN = "half_open"  # Backoff elapsed, a single trial request is in flight
+
+    def __init__(self, probe: Callable[[], bool], ttl: float = 5.0,
+                 base_backoff: float = 1.0, max_backoff: float = 60.0):
+        self.probe = probe
+        self.ttl = ttl
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.last_checked = 0.0
+        self.retry_at = 0.0
+        self._backoff = base_backoff
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def allow_request(self) -> bool:
+        """Returns True if a request may be sent to the server right now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == self.OPEN and now >= self.retry_at:
+                self._enter_half_open(now)
+                return True
+            return False
+
+    def _enter_half_open(self, now: float):
+        # A trial that never reports back is superseded by a probe after one TTL
+        self.state = self.HALF_OPEN
+        self.retry_at = now + self.ttl
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.last_checked = time.monotonic()
+            self._backoff = self.base_backoff
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            self.consecutive_failures += 1
+            self.last_checked = now
+            self.state = self.OPEN
+            self.retry_at = now + self._backoff
+            self._backoff = min(self._backoff * 2, self.max_backoff)
+
+    def check_now(self) -> bool:
+        """Runs one probe synchronously and updates the cached state."""
+        alive = self.probe()
+        if alive:
+            self.record_success()
+        else:
+            self.record_failure()
+        return alive
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="llm-health", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._lock:
+                now = time.monotonic()
+                if self.state == self.CLOSED:
+                    due = self.last_checked + self.ttl
+                else:
+                    due = self.retry_at
+                if now >= due and self.state != self.CLOSED:
+                    self._enter_half_open(now)
+            if now >= due:
+                self.check_now()
+            else:
+                self._stop.wait(min(due - now, self.ttl))
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "seconds_since_check": now - self.last_checked if self.last_checked else None,
+                "retry_in_seconds": max(0.0, self.retry_at - now) if self.state != self.CLOSED else 0.0
+            }
 
 class LocalLLMEngine:
     """
     Engine for interacting with Large Language Models.
     Prioritizes local sovereignty while allowing for high-performance open-source APIs.
+
+    All requests go through one pooled, keep-alive HTTP session so consecutive
+    Think steps reuse warm connections instead of paying TCP setup every time.
+    An optional ResponseCache short-circuits repeated requests before the network.
     """
-    
-    def __init__(self, base_url: str = None, model_name: str = "DeepSeek-V3"):
+
+    def __init__(self, base_url: str = None, model_name: str = "DeepSeek-V3",
+                 pool_size: int = None, timeout: float = 60, health_ttl: float = 5.0,
+                 cache: Optional[ResponseCache] = None):
         # Default to a local Ollama or vLLM instance if no URL provided
         self.base_url = base_url or os.getenv("LLM_BASE_URL", "http://localhost:11434/v1")
         self.model_name = model_name
         self.api_key = os.getenv("LLM_API_KEY", "sovereign-key")
+        self.pool_size = pool_size or int(os.getenv("LLM_POOL_SIZE", "8"))
+        self.timeout = timeout
+        self.temperature = 0.3
+        self.max_tokens = 1024
+        self.cache = cache or self._cache_from_env()
+        self.session = self._create_session()
+        # Blocking HTTP calls from asyncio callers run here, one thread per pooled connection
+        self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="llm-io")
+        self.health = ServerHealthMonitor(self._is_server_alive, ttl=health_ttl)
+        self.health.start()
         print(f"[*] LLM Engine Initialized. Model: {self.model_name}")
 
-    def generate_response(self, prompt: str, system_prompt: str = "You are NeuroSovereign.") -> str:
-        """Generates a response using an OpenAI-compatible API."""
-        
-        # If we are in a demo/mock mode (no server running)
-        if "localhost" in self.base_url and not self._is_server_alive():
-            return self._mock_response(prompt)
+    def _create_session(self) -> "requests.Session":
+        """Creates the shared HTTP session with a bounded keep-alive connection pool."""
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, pool_block=True)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Connection": "keep-alive",
+        })
+        return session
+
+    @staticmethod
+    def _cache_from_env() -> Optional[ResponseCache]:
+        """Enables the response cache when LLM_CACHE_MODE is set (readwrite/record/replay)."""
+        mode = os.getenv("LLM_CACHE_MODE")
+        if not mode:
+            return None
+        return ResponseCache(path=os.getenv("LLM_CACHE_PATH", ".neurosovereign/llm_cache.sqlite"), mode=mode)
 
+    def _build_payload(self, prompt: str, system_prompt: str, stream: bool = False,
+                       stop: Optional[List[str]] = None) -> Dict[str, Any]:
         payload = {
             "model": self.model_name,
             "messages": [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": prompt}
             ],
-            "temperature": 0.3,
-            "max_tokens": 1024
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens
         }
+        if stream:
+            payload["stream"] = True
+        if stop:
+            payload["stop"] = stop
+        return payload
+
+    def generate_response(self, prompt: str, system_prompt: str = "You are NeuroSovereign.",
+                          stream: bool = False, stop: Optional[List[str]] = None) -> Union[str, Iterator[str]]:
+        """
+        Generates a response using an OpenAI-compatible API.
+
+        With stream=True an iterator is returned that yields content tokens as
+        the server emits SSE chunks, so callers can act before the completion ends.
+        Closing that iterator early closes the connection, which makes the server
+        abort the generation. `stop` sequences end the generation server-side.
+        """
+
+        # Cache hits skip the network entirely (and raise ReplayMissError in replay mode)
+        cache_key = None
+        if self.cache is not None:
+            extra = {"stop": stop} if stop else {}  # Keeps keys of stop-less recordings unchanged
+            cache_key = self.cache.make_key(self.model_name, system_prompt, prompt,
+                                            self.temperature, max_tokens=self.max_tokens, **extra)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return iter([cached]) if stream else cached
+
+        # Circuit open: server known to be down, go straight to the fallback path
+        if not self.health.allow_request():
+            mock = self._mock_response(prompt)
+            return iter([mock]) if stream else mock
+
+        payload = self._build_payload(prompt, system_prompt, stream=stream, stop=stop)
+        if stream:
+            return self._stream_response(payload, cache_key)
+
+        try:
+            content = self.post_completion(payload)
+            if cache_key is not None:
+                self.cache.put(cache_key, content)
+            return content
+        except requests.ConnectionError:
+            # Server unreachable (e.g. no local GPU box running): demo/mock mode
+            return self._mock_response(payload["messages"][-1]["content"])
+        except Exception as e:
+            return f"{ERROR_PREFIX} {e}\nFalling back to internal logic."
 
+    def post_completion(self, payload: Dict[str, Any]) -> str:
+        """
+        Sends one non-streaming /chat/completions request and returns the content.
+        Unlike generate_response, errors are raised (after updating the breaker),
+        so callers such as a router can fail over.
+        """
+        start = time.perf_counter()
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/chat/completions",
-                headers={"Authorization": f"Bearer {self.api_key}"},
                 json=payload,
-                timeout=60
+                timeout=self.timeout
             )
             response.raise_for_status()
-            return response.json()['choices'][0]['message']['content']
+            body = response.json()
+            content = body['choices'][0]['message']['content']
+        except Exception:
+            self.health.record_failure()
+            METRICS.inc("ns_llm_requests_total", endpoint=self.base_url, outcome="error")
+            raise
+        self.health.record_success()
+        usage = body.get("usage") or {}
+        self._record_completion(time.perf_counter() - start, payload, content,
+                                usage.get("prompt_tokens"), usage.get("completion_tokens"))
+        return content
+
+    def _record_completion(self, seconds: float, payload: Dict[str, Any], content: str,
+                           prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None):
+        """Per-endpoint latency, sizes and decode rate; server-reported usage wins over estimates."""
+        endpoint = self.base_url
+        if prompt_tokens is None:
+            prompt_tokens = sum(estimate_tokens(m["content"]) for m in payload.get("messages", ()))
+        if completion_tokens is None:
+            completion_tokens = estimate_tokens(content)
+        METRICS.inc("ns_llm_requests_total", endpoint=endpoint, outcome="ok")
+        METRICS.observe("ns_llm_request_seconds", seconds, endpoint=endpoint)
+        METRICS.observe("ns_llm_prompt_tokens", prompt_tokens, SIZE_BUCKETS, endpoint=endpoint)
+        METRICS.observe("ns_llm_completion_tokens", completion_tokens, SIZE_BUCKETS, endpoint=endpoint)
+        if seconds > 0:
+            METRICS.observe("ns_llm_tokens_per_second", completion_tokens / seconds, SIZE_BUCKETS,
+                            endpoint=endpoint)
+
+    def generate_batch(self, batch: List[Tuple[str, str]]) -> List[str]:
+        """
+        Answers several (prompt, system_prompt) pairs at once, in order. Each goes
+        through generate_response (response cache, breaker, fallbacks) as its own
+        /chat/completions request, so the server applies the model's chat
+        template; they are sent concurrently on the pooled connections and
+        arrive as one burst that a continuous-batching server runs together.
+        """
+        futures = [self._executor.submit(self.generate_response, prompt, system_prompt)
+                   for prompt, system_prompt in batch]
+        return [future.result() for future in futures]
+
+    async def agenerate_response(self, prompt: str, system_prompt: str = "You are NeuroSovereign.") -> str:
+        """Non-blocking variant of generate_response for asyncio callers."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.generate_response, prompt, system_prompt)
+
+    def _stream_response(self, payload: Dict[str, Any], cache_key: Optional[str] = None) -> Iterator[str]:
+        """Yields content deltas from a streaming /chat/completions response."""
+        parts = []
+        start = time.perf_counter()
+        try:
+            with self.session.post(
+                f"{self.base_url}/chat/completions",
+                json=payload,
+                timeout=self.timeout,
+                stream=True
+            ) as response:
+                response.raise_for_status()
+                self.health.record_success()
+                for line in response.iter_lines():
+                    if not line.startswith(b"data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == b"[DONE]":
+                        break
+                    choices = json.loads(data).get("choices") or [{}]
+                    delta = choices[0].get("delta", {}).get("content")
+                    if delta:
+                        if not parts:
+                            METRICS.observe("ns_llm_first_token_seconds", time.perf_counter() - start,
+                                            endpoint=self.base_url)
+                        parts.append(delta)
+                        yield delta
+            self._record_completion(time.perf_counter() - start, payload, "".join(parts))
+            # Only complete generations are cached, never cancelled ones
+            if cache_key is not None:
+                self.cache.put(cache_key, "".join(parts))
+        except requests.ConnectionError:
+            self.health.record_failure()
+            yield self._mock_response(payload["messages"][-1]["content"])
         except Exception as e:
-            return f"Error connecting to LLM server: {e}\nFalling back to internal logic."
+            self.health.record_failure()
+            yield f"{ERROR_PREFIX} {e}\nFalling back to internal logic."
 
     def _is_server_alive(self) -> bool:
         try:
-            requests.get(self.base_url.replace("/v1", "/"), timeout=2)
+            self.session.get(self.base_url.replace("/v1", "/"), timeout=2)
             return True
-        except:
+        except Exception:
             return False
 
+    def get_health(self) -> Dict[str, Any]:
+        """Returns the cached server health without probing."""
+        return self.health.get_status()
+
+    def close(self):
+        """Stops health probing and releases all pooled connections."""
+        self.health.stop()
+        self._executor.shutdown(wait=False)
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
     def _mock_response(self, prompt: str) -> str:
         """Simulated reasoning for demonstration when no local GPU is present."""
         if "Create a new directory" in prompt:
-            return "Thought: The user wants to create a directory. I should use the shell.\nAction: execute_shell('mkdir -p Sovereign_Data && ls -F')"
+            return MOCK_RESPONSES["directory"]
         if "search" in prompt:
-            return "Thought: I need to search the web. I will use the browser tool.\nAction: execute_shell('curl -s https://api.duckduckgo.com/?q=AI+trends&format=json')"
-        
-        return "Thought: I am processing the request.\nAction: final_answer('I am ready to assist you with your sovereign AI tasks.')"
+            return MOCK_RESPONSES["search"]
+
+        return MOCK_RESPONSES["default"]
 
 if __name__ == "__main__":
     engine = LocalLLMEngine()
     print(engine.generate_response("Hello!"))
+    for token in engine.generate_response("Hello!", stream=True):
+        print(token, end="", flush=True)
+    print()
@@ -0,0 +1,274 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+try:
+    from .llm_engine import ERROR_PREFIX, LocalLLMEngine, ServerHealthMonitor
+    from .response_cache import ResponseCache
+    from .lazy_loader import lazy_import
+except ImportError:
+    from llm_engine import ERROR_PREFIX, LocalLLMEngine, ServerHealthMonitor
+    from response_cache import ResponseCache
+    from lazy_loader import lazy_import
+
+asyncio = lazy_import("asyncio")  # Only for agenerate_response
+
+class _Endpoint:
+    """Routing state for one inference server."""
+
+    __slots__ = ("engine", "ewma", "in_flight", "latencies", "requests", "failures",
+                 "hedges_sent", "hedge_wins")
+
+    def __init__(self, engine: LocalLLMEngine, window: int):
+        self.engine = engine
+        self.ewma: Optional[float] = None
+        self.in_flight = 0
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.requests = 0
+        self.failures = 0
+        self.hedges_sent = 0
+        self.hedge_wins = 0
+
+    @property
+    def url(self) -> str:
+        return self.engine.base_url
+
+    @staticmethod
+    def percentile(q: float, latencies: List[float]) -> Optional[float]:
+        """Percentile of a copy of `latencies` taken under the router's lock (workers append to it)."""
+        if not latencies:
+            return None
+        ordered = sorted(latencies)
+        return ordered[min(len(ordered) - 1, int(q / 100.0 * len(ordered)))]
+
+class LLMRouter:
+    """
+    Routes completions across several OpenAI-compatible endpoints.
+
+    Each endpoint is a LocalLLMEngine (own connection pool and circuit breaker).
+    Requests go to the healthy endpoint with the lowest EWMA latency weighted
+    by its in-flight count. A request still unanswered after the endpoint's
+    `hedge_percentile` latency gets a hedged duplicate on the next-best
+    endpoint and the first answer wins; hedges are capped at `max_hedge_ratio`
+    of all requests so a slow cluster is not flooded with duplicates.
+    Exposes the same generate_response/agenerate_response interface as the engine.
+    """
+
+    def __init__(self, endpoints: Optional[Sequence[str]] = None, model_name: str = "DeepSeek-V3",
+                 pool_size: int = None, timeout: float = 60, health_ttl: float = 5.0,
+                 cache: Optional[ResponseCache] = None, ewma_alpha: float = 0.2,
+                 hedge_percentile: float = 95.0, hedge_min_samples: int = 20,
+                 max_hedge_ratio: float = 0.1, latency_window: int = 256):
+        if endpoints is None:
+            endpoints = [url.strip() for url in os.getenv("LLM_ENDPOINTS", "").split(",") if url.strip()]
+        if not endpoints:
+            raise ValueError("LLMRouter needs at least one endpoint (or LLM_ENDPOINTS)")
+        self.model_name = model_name
+        self.ewma_alpha = ewma_alpha
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.max_hedge_ratio = max_hedge_ratio
+        self.cache = cache or LocalLLMEngine._cache_from_env()
+        self._endpoints = [
+            _Endpoint(LocalLLMEngine(url, model_name, pool_size, timeout, health_ttl, cache=self.cache),
+                      latency_window)
+            for url in endpoints
+        ]
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._hedges = 0
+        self._failovers = 0
+        # Runs only _call (primary and hedge per request); sized like one connection pool per endpoint
+        workers = sum(endpoint.engine.pool_size for endpoint in self._endpoints)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-route")
+        print(f"[*] LLM Router Initialized. {len(self._endpoints)} endpoints")
+
+    @property
+    def temperature(self) -> float:
+        return self._endpoints[0].engine.temperature
+
+    @property
+    def max_tokens(self) -> int:
+        return self._endpoints[0].engine.max_tokens
+
+    def _pick(self, exclude: Tuple[_Endpoint, ...] = ()) -> Optional[_Endpoint]:
+        """Best endpoint by EWMA latency x (in-flight + 1); unmeasured endpoints are tried first."""
+        with self._lock:
+            candidates = [e for e in self._endpoints if e not in exclude]
+            healthy = [e for e in candidates if e.engine.health.state == ServerHealthMonitor.CLOSED]
+            if healthy:
+                return min(healthy, key=lambda e: (e.ewma or 0.0) * (e.in_flight + 1))
+        for endpoint in candidates:
+            if endpoint.engine.health.allow_request():  # Breaker backoff elapsed: trial request
+                return endpoint
+        return None
+
+    def _call(self, endpoint: _Endpoint, payload: Dict[str, Any]) -> str:
+        with self._lock:
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+        start = time.perf_counter()
+        try:
+            content = endpoint.engine.post_completion(payload)
+        except Exception:
+            with self._lock:
+                endpoint.failures += 1
+            raise
+        finally:
+            with self._lock:
+                endpoint.in_flight -= 1
+        self._record_latency(endpoint, time.perf_counter() - start)
+        return content
+
+    def _record_latency(self, endpoint: _Endpoint, latency: float):
+        with self._lock:
+            endpoint.latencies.append(latency)
+            if endpoint.ewma is None:
+                endpoint.ewma = latency
+            else:
+                endpoint.ewma += self.ewma_alpha * (latency - endpoint.ewma)
+
+    def _hedge_delay(self, endpoint: _Endpoint) -> Optional[float]:
+        """Seconds to wait before hedging, or None if hedging is not allowed now."""
+        with self._lock:
+            if len(self._endpoints) < 2 or len(endpoint.latencies) < self.hedge_min_samples:
+                return None
+            if self._hedges >= self.max_hedge_ratio * self._requests:
+                return None
+            latencies = list(endpoint.latencies)
+        return endpoint.percentile(self.hedge_percentile, latencies)
+
+    def generate_response(self, prompt: str, system_prompt: str = "You are NeuroSovereign.",
+                          stream: bool = False, stop: Optional[List[str]] = None) -> Union[str, Iterator[str]]:
+        cache_key = None
+        if self.cache is not None and not stream:
+            extra = {"stop": stop} if stop else {}
+            cache_key = self.cache.make_key(self.model_name, system_prompt, prompt, self.temperature,
+                                            max_tokens=self.max_tokens, **extra)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        primary = self._pick()
+        if primary is None:
+            mock = self._endpoints[0].engine._mock_response(prompt)
+            return iter([mock]) if stream else mock
+        if stream:
+            # Hedging a stream would duplicate every token; route it and track load only
+            return self._tracked_stream(primary, primary.engine.generate_response(
+                prompt, system_prompt, stream=True, stop=stop))
+
+        with self._lock:
+            self._requests += 1
+        payload = primary.engine._build_payload(prompt, system_prompt, stop=stop)
+        try:
+            content = self._race(primary, payload)
+        except Exception as e:
+            # Every endpoint tried failed: same fallbacks as a single engine
+            if all(endpoint.engine.health.state != ServerHealthMonitor.CLOSED for endpoint in self._endpoints):
+                return primary.engine._mock_response(prompt)
+            return f"{ERROR_PREFIX} {e}\nFalling back to internal logic."
+        if cache_key is not None:
+            self.cache.put(cache_key, content)
+        return content
+
+    def _race(self, primary: _Endpoint, payload: Dict[str, Any]) -> str:
+        """Runs the primary request, hedging or failing over to other endpoints as needed."""
+        futures: Dict[Future, _Endpoint] = {self._executor.submit(self._call, primary, payload): primary}
+        tried = (primary,)
+        hedges = set()
+        delay = self._hedge_delay(primary)
+        error: Optional[BaseException] = None
+        while futures:
+            done, _ = wait(futures, timeout=delay, return_when=FIRST_COMPLETED)
+            if not done:
+                # Slower than the endpoint's tail latency: fire one hedge elsewhere
+                delay = None
+                backup = self._pick(exclude=tried)
+                if backup is not None:
+                    tried += (backup,)
+                    hedges.add(backup)
+                    with self._lock:
+                        self._hedges += 1
+                        backup.hedges_sent += 1
+                    futures[self._executor.submit(self._call, backup, payload)] = backup
+                continue
+            for future in done:
+                endpoint = futures.pop(future)
+                if future.exception() is None:
+                    if endpoint in hedges:
+                        with self._lock:
+                            endpoint.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+            if not futures:
+                # Fail over to an endpoint not tried yet
+                backup = self._pick(exclude=tried)
+                if backup is not None:
+                    tried += (backup,)
+                    with self._lock:
+                        self._failovers += 1
+                    futures[self._executor.submit(self._call, backup, payload)] = backup
+        raise error
+
+    def _tracked_stream(self, endpoint: _Endpoint, stream: Iterator[str]) -> Iterator[str]:
+        with self._lock:
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+        try:
+            yield from stream
+        finally:
+            with self._lock:
+                endpoint.in_flight -= 1
+            getattr(stream, "close", lambda: None)()
+
+    def generate_batch(self, batch: List[Tuple[str, str]]) -> List[str]:
+        """Sends the whole batch to the best endpoint."""
+        endpoint = self._pick() or self._endpoints[0]
+        return endpoint.engine.generate_batch(batch)
+
+    async def agenerate_response(self, prompt: str, system_prompt: str = "You are NeuroSovereign.") -> str:
+        loop = asyncio.get_running_loop()
+        # Not self._executor: generate_response waits on _call futures from that pool, and callers
+        # holding its workers would leave none to run them
+        return await loop.run_in_executor(None, self.generate_response, prompt, system_prompt)
+
+    def get_health(self) -> Dict[str, Any]:
+        return {endpoint.url: endpoint.engine.get_health() for endpoint in self._endpoints}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-endpoint latency (ms), load, failures, hedging and breaker state."""
+        endpoints = {}
+        for endpoint in self._endpoints:
+            with self._lock:
+                latencies = list(endpoint.latencies)
+            p50, p95 = endpoint.percentile(50, latencies), endpoint.percentile(95, latencies)
+            with self._lock:
+                endpoints[endpoint.url] = {
+                    "ewma_ms": endpoint.ewma * 1e3 if endpoint.ewma is not None else None,
+                    "p50_ms": p50 * 1e3 if p50 is not None else None,
+                    "p95_ms": p95 * 1e3 if p95 is not None else None,
+                    "in_flight": endpoint.in_flight,
+                    "requests": endpoint.requests,
+                    "failures": endpoint.failures,
+                    "hedges_sent": endpoint.hedges_sent,
+                    "hedge_wins": endpoint.hedge_wins,
+                    "health": endpoint.engine.health.state
+                }
+        with self._lock:
+            return {"requests": self._requests, "hedges": self._hedges, "failovers": self._failovers,
+                    "endpoints": endpoints}
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        for endpoint in self._endpoints:
+            endpoint.engine.close()
+
+def create_llm_backend(model_name: str = "DeepSeek-V3", **kwargs: Any) -> Union[LocalLLMEngine, LLMRouter]:
+    """A router when LLM_ENDPOINTS lists several servers, otherwise a single engine."""
+    endpoints = [url.strip() for url in os.getenv("LLM_ENDPOINTS", "").split(",") if url.strip()]
+    if len(endpoints) > 1:
+        return LLMRouter(endpoints, model_name=model_name, **kwargs)
+    return LocalLLMEngine(base_url=endpoints[0] if endpoints else None, model_name=model_name, **kwargs)
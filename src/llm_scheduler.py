@@ -0,0 +1,169 @@
+import time
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+try:
+    from .llm_engine import LocalLLMEngine
+    from .lazy_loader import lazy_import
+except ImportError:
+    from llm_engine import LocalLLMEngine
+    from lazy_loader import lazy_import
+
+asyncio = lazy_import("asyncio")  # Only for the async submit path
+
+class _PendingRequest:
+    __slots__ = ("prompt", "system_prompt", "future", "enqueued_at", "released")
+
+    def __init__(self, prompt: str, system_prompt: str, inline: bool = False):
+        self.prompt = prompt
+        self.system_prompt = system_prompt
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+        # Blocking callers send their own request once released, saving a thread handoff
+        self.released = threading.Event() if inline else None
+
+class BatchingScheduler:
+    """
+    Micro-batching front end for LocalLLMEngine.
+
+    Concurrent generate_response calls are collected for at most `max_wait_ms`
+    (or until `max_batch_size` requests are queued) and then released to the
+    server together, so continuous-batching backends like vLLM see them
+    arrive as one burst, each caller sending its own request. With
+    `dispatch_batches=True` one dispatcher thread sends the whole batch through
+    the engine's generate_batch instead and hands each caller its answer.
+    Drop-in replacement for the
+    engine wherever an agent expects `generate_response`/`agenerate_response`.
+    """
+
+    def __init__(self, engine: LocalLLMEngine, max_batch_size: int = 16,
+                 max_wait_ms: float = 5.0, dispatch_batches: bool = False):
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.dispatch_batches = dispatch_batches
+        self._queue: "queue.Queue[_PendingRequest]" = queue.Queue()
+        self._dispatcher = ThreadPoolExecutor(max_workers=max_batch_size, thread_name_prefix="llm-batch")
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "batches": 0, "max_queue_depth": 0, "total_queue_wait": 0.0}
+        self._batch_sizes = Counter()
+        self._running = True
+        self._thread = threading.Thread(target=self._collect_loop, name="llm-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, prompt: str, system_prompt: str = "You are NeuroSovereign.") -> Future:
+        """Queues a request and returns a future resolving to the response text."""
+        return self._enqueue(_PendingRequest(prompt, system_prompt)).future
+
+    def _enqueue(self, request: _PendingRequest) -> _PendingRequest:
+        with self._lock:
+            if not self._running:
+                raise RuntimeError("BatchingScheduler is closed")
+            self._queue.put(request)
+            depth = self._queue.qsize()
+            self._stats["requests"] += 1
+            if depth > self._stats["max_queue_depth"]:
+                self._stats["max_queue_depth"] = depth
+        return request
+
+    def generate_response(self, prompt: str, system_prompt: str = "You are NeuroSovereign.",
+                          stream: bool = False, stop: Optional[List[str]] = None) -> Union[str, Iterator[str]]:
+        if stream or stop:
+            # Streams are latency-bound by definition; they bypass the batch window
+            return self.engine.generate_response(prompt, system_prompt, stream=stream, stop=stop)
+        request = self._enqueue(_PendingRequest(prompt, system_prompt, inline=True))
+        request.released.wait()
+        if request.future.done():
+            return request.future.result()  # Answered by the dispatched batch
+        return self.engine.generate_response(prompt, system_prompt)
+
+    async def agenerate_response(self, prompt: str, system_prompt: str = "You are NeuroSovereign.") -> str:
+        return await asyncio.wrap_future(self.submit(prompt, system_prompt))
+
+    def _collect_loop(self):
+        while self._running:
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._record_batch(batch)
+            self._dispatch(batch)
+
+    def _record_batch(self, batch: List[_PendingRequest]):
+        now = time.perf_counter()
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["total_queue_wait"] += sum(now - r.enqueued_at for r in batch)
+            self._batch_sizes[len(batch)] += 1
+
+    def _dispatch(self, batch: List[_PendingRequest]):
+        if self.dispatch_batches and len(batch) > 1:
+            self._dispatcher.submit(self._run_batch, batch)
+        else:
+            for request in batch:
+                if request.released is not None:
+                    request.released.set()
+                else:
+                    self._dispatcher.submit(self._run_one, request)
+
+    def _run_one(self, request: _PendingRequest):
+        try:
+            request.future.set_result(self.engine.generate_response(request.prompt, request.system_prompt))
+        except Exception as e:
+            request.future.set_exception(e)
+
+    def _run_batch(self, batch: List[_PendingRequest]):
+        try:
+            results = self.engine.generate_batch([(r.prompt, r.system_prompt) for r in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        for request, result in zip(batch, results):
+            if isinstance(result, Exception):
+                request.future.set_exception(result)
+            else:
+                request.future.set_result(result)
+            if request.released is not None:
+                request.released.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, batch-size histogram and mean time spent waiting in the window."""
+        with self._lock:
+            requests_batched = sum(size * count for size, count in self._batch_sizes.items())
+            return {
+                "requests": self._stats["requests"],
+                "batches": self._stats["batches"],
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._stats["max_queue_depth"],
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "mean_batch_size": requests_batched / self._stats["batches"] if self._stats["batches"] else 0.0,
+                "mean_queue_wait_ms": (self._stats["total_queue_wait"] / requests_batched * 1000.0
+                                       if requests_batched else 0.0)
+            }
+
+    def close(self):
+        """Stops batching; requests still queued fail instead of waiting forever."""
+        with self._lock:
+            self._running = False
+        self._thread.join()  # Dispatches the batch it is collecting, if any
+        self._dispatcher.shutdown(wait=True)
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            request.future.set_exception(RuntimeError("BatchingScheduler closed before the request was sent"))
+            if request.released is not None:
+                request.released.set()
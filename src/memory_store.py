@@ -0,0 +1,117 @@
+import sys
+import json
+import time
+import tempfile
+from array import array
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+class MemoryRecord:
+    """One agent turn. Slotted, with interned roles, so resident turns stay small."""
+
+    __slots__ = ("role", "content", "timestamp")
+
+    def __init__(self, role: str, content: str, timestamp: Optional[float] = None):
+        self.role = sys.intern(role)
+        self.content = content
+        self.timestamp = timestamp if timestamp is not None else time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"role": self.role, "content": self.content, "timestamp": self.timestamp}
+
+    def __repr__(self) -> str:
+        return f"MemoryRecord({self.role!r}, {self.content[:40]!r})"
+
+class MemoryStore:
+    """
+    Bounded agent memory.
+
+    The most recent `capacity` turns live in an in-RAM ring. Older turns are
+    spilled to an append-only JSON-lines log; an offset index gives O(1) random
+    access to any spilled turn. The log is an anonymous temp file unless
+    `spill_path` is given, in which case it persists after the process exits.
+    """
+
+    def __init__(self, capacity: int = 256, spill_path: Optional[str] = None):
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self._ring: Deque[MemoryRecord] = deque()
+        self._offsets = array("Q")  # Byte offset of each spilled record in the log
+        self._log = None
+        self._log_size = 0
+        self._resident_bytes = 0
+
+    def append(self, role: str, content: str):
+        record = MemoryRecord(role, content)
+        self._ring.append(record)
+        self._resident_bytes += len(content)
+        if len(self._ring) > self.capacity:
+            self._spill(self._ring.popleft())
+
+    def _spill(self, record: MemoryRecord):
+        if self._log is None:
+            if self.spill_path:
+                self._log = open(self.spill_path, "w+b")
+            else:
+                self._log = tempfile.TemporaryFile(prefix="ns-memory-")
+        line = json.dumps([record.role, record.content, record.timestamp]).encode("utf-8") + b"\n"
+        self._log.seek(0, 2)
+        self._log.write(line)
+        self._offsets.append(self._log_size)
+        self._log_size += len(line)
+        self._resident_bytes -= len(record.content)
+
+    def _load(self, spilled_index: int) -> MemoryRecord:
+        self._log.flush()
+        self._log.seek(self._offsets[spilled_index])
+        role, content, timestamp = json.loads(self._log.readline())
+        return MemoryRecord(role, content, timestamp)
+
+    def __len__(self) -> int:
+        return len(self._offsets) + len(self._ring)
+
+    def __getitem__(self, index: int) -> MemoryRecord:
+        total = len(self)
+        if index < 0:
+            index += total
+        if not 0 <= index < total:
+            raise IndexError("memory index out of range")
+        spilled = len(self._offsets)
+        if index < spilled:
+            return self._load(index)
+        return self._ring[index - spilled]
+
+    def __iter__(self) -> Iterator[MemoryRecord]:
+        for i in range(len(self._offsets)):
+            yield self._load(i)
+        yield from list(self._ring)
+
+    def recent(self, n: int) -> List[MemoryRecord]:
+        """Returns the last n turns (from RAM when n <= capacity)."""
+        start = max(0, len(self) - n)
+        return [self[i] for i in range(start, len(self))]
+
+    def clear(self):
+        """Drops all turns and truncates the spill log."""
+        self._ring.clear()
+        self._offsets = array("Q")
+        self._resident_bytes = 0
+        self._log_size = 0
+        if self._log is not None:
+            self._log.seek(0)
+            self._log.truncate()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Resident and spilled footprint (content bytes / log bytes plus index)."""
+        return {
+            "records": len(self),
+            "resident_records": len(self._ring),
+            "resident_bytes": self._resident_bytes,
+            "spilled_records": len(self._offsets),
+            "spilled_bytes": self._log_size + self._offsets.itemsize * len(self._offsets)
+        }
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
@@ -0,0 +1,208 @@
+import os
+import shutil
+import hashlib
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, Optional
+
+class Observation:
+    """
+    Bounded view of a tool's output: head and tail windows plus summary stats.
+    The full output, when larger than the windows, lives in a spill file that
+    can be paged with read_observation(id, offset, length).
+    """
+
+    __slots__ = ("id", "source", "head", "tail", "byte_count", "line_count",
+                 "sha256", "spill_path", "exit_code")
+
+    def __init__(self, obs_id: str, source: str, head: bytes, tail: bytes, byte_count: int,
+                 line_count: int, sha256: str, spill_path: Optional[str] = None,
+                 exit_code: Optional[int] = None):
+        self.id = obs_id
+        self.source = source
+        self.head = head
+        self.tail = tail
+        self.byte_count = byte_count
+        self.line_count = line_count
+        self.sha256 = sha256
+        self.spill_path = spill_path
+        self.exit_code = exit_code
+
+    @property
+    def truncated(self) -> bool:
+        return self.spill_path is not None
+
+    def __str__(self) -> str:
+        head = self.head.decode("utf-8", "replace")
+        if not self.truncated:
+            return head
+        omitted = self.byte_count - len(self.head) - len(self.tail)
+        return (
+            f"{head}\n"
+            f"[... {omitted} bytes omitted; {self.byte_count} bytes, {self.line_count} lines total, "
+            f"sha256 {self.sha256[:12]}. Page with read_observation('{self.id}', offset, length) ...]\n"
+            f"{self.tail.decode('utf-8', 'replace')}"
+        )
+
+    def __len__(self) -> int:
+        return len(str(self))
+
+    def __getitem__(self, key):
+        return str(self)[key]
+
+class ObservationCapture:
+    """
+    Streaming sink for tool output. Memory use is bounded by the head and tail
+    windows: once output outgrows them, everything is written through to a
+    spill file instead of being accumulated.
+    """
+
+    def __init__(self, store: "ObservationStore", obs_id: str, source: str):
+        self.store = store
+        self.id = obs_id
+        self.source = source
+        self._window = store.head_bytes + store.tail_bytes
+        self._buffer = bytearray()  # Whole output while it still fits the windows
+        self._head = b""
+        self._tail = bytearray()
+        self._spill = None
+        self._hash = hashlib.sha256()
+        self._bytes = 0
+        self._lines = 0
+        self._lock = threading.Lock()  # stdout and stderr may be written from one reader
+
+    def write(self, chunk: bytes):
+        if not chunk:
+            return
+        with self._lock:
+            self._hash.update(chunk)
+            self._bytes += len(chunk)
+            self._lines += chunk.count(b"\n")
+            if self._spill is None:
+                self._buffer += chunk
+                if len(self._buffer) <= self._window:
+                    return
+                self._spill = open(self.store.spill_path(self.id), "wb")
+                self._head = bytes(self._buffer[:self.store.head_bytes])
+                chunk, self._buffer = bytes(self._buffer), bytearray()
+            self._spill.write(chunk)
+            self._tail += chunk[-self.store.tail_bytes:]
+            del self._tail[:-self.store.tail_bytes]
+
+    def close(self, exit_code: Optional[int] = None) -> Observation:
+        with self._lock:
+            spill_path = None
+            if self._spill is not None:
+                self._spill.close()
+                spill_path = self._spill.name
+                head, tail = self._head, bytes(self._tail)
+            else:
+                head, tail = bytes(self._buffer), b""
+            if self._bytes and not (tail or head).endswith(b"\n"):
+                self._lines += 1  # Count a final unterminated line
+            observation = Observation(self.id, self.source, head, tail, self._bytes, self._lines,
+                                      self._hash.hexdigest(), spill_path, exit_code)
+        self.store._register(observation)
+        return observation
+
+class ObservationStore:
+    """
+    Creates captures and keeps their spill files for paging.
+
+    At most `max_entries` observations and `max_bytes` of spill files are
+    kept; beyond that the least recently read or created ones are evicted
+    and their spill files deleted. The spill directory is removed on close(),
+    or when the store is garbage collected or the interpreter exits.
+    """
+
+    def __init__(self, directory: Optional[str] = None, head_bytes: int = 2048, tail_bytes: int = 1024,
+                 max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._directory = directory
+        self._observations: "OrderedDict[str, Observation]" = OrderedDict()
+        self._spilled_bytes = 0
+        self._evicted = 0
+        self._counter = 0
+        self._cleanup = None
+        self._lock = threading.Lock()
+
+    def spill_path(self, obs_id: str) -> str:
+        with self._lock:
+            if self._directory is None:
+                self._directory = tempfile.mkdtemp(prefix="ns-observations-")
+                # Runs on close(), garbage collection or interpreter exit, whichever comes first
+                self._cleanup = weakref.finalize(self, shutil.rmtree, self._directory, ignore_errors=True)
+            os.makedirs(self._directory, exist_ok=True)
+            return os.path.join(self._directory, f"{obs_id}.out")
+
+    def capture(self, source: str = "") -> ObservationCapture:
+        with self._lock:
+            self._counter += 1
+            obs_id = f"obs{self._counter}"
+        return ObservationCapture(self, obs_id, source)
+
+    def from_text(self, text: str, source: str = "") -> Observation:
+        capture = self.capture(source)
+        capture.write(text.encode("utf-8"))
+        return capture.close()
+
+    def _register(self, observation: Observation):
+        with self._lock:
+            self._observations[observation.id] = observation
+            if observation.spill_path is not None:
+                self._spilled_bytes += observation.byte_count
+            while len(self._observations) > self.max_entries or (
+                    self._spilled_bytes > self.max_bytes and len(self._observations) > 1):
+                _, evicted = self._observations.popitem(last=False)
+                self._evicted += 1
+                if evicted.spill_path is not None:
+                    self._spilled_bytes -= evicted.byte_count
+                    try:
+                        os.remove(evicted.spill_path)
+                    except OSError:
+                        pass
+
+    def read(self, obs_id: str, offset: int = 0, length: int = 4096) -> str:
+        """Pages through the full output of an observation by byte offset."""
+        with self._lock:
+            observation = self._observations.get(obs_id)
+            if observation is not None:
+                self._observations.move_to_end(obs_id)
+        if observation is None:
+            return f"Unknown or expired observation: {obs_id}"
+        if int(offset) < 0:
+            return f"Invalid offset {offset}: must be >= 0"
+        length = max(0, min(int(length), 65536))
+        if observation.spill_path is None:
+            data = observation.head[int(offset):int(offset) + length]
+        else:
+            try:
+                with open(observation.spill_path, "rb") as f:
+                    f.seek(int(offset))
+                    data = f.read(length)
+            except OSError:  # Evicted while being read
+                return f"Unknown or expired observation: {obs_id}"
+        return data.decode("utf-8", "replace")
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "observations": len(self._observations),
+                "spilled_bytes": self._spilled_bytes,
+                "evicted": self._evicted
+            }
+
+    def close(self):
+        with self._lock:
+            self._observations.clear()
+            self._spilled_bytes = 0
+            if self._cleanup is not None:
+                self._cleanup()  # Removes the directory we created
+                # A later capture creates (and registers cleanup for) a new one
+                self._directory = None
+                self._cleanup = None
@@ -1,7 +1,16 @@
-import pyautogui
-import time
-import subprocess
-from typing import Tuple, List
+from typing import Tuple, Optional
+try:
+    from .shell_pool import ShellPool, ShellResult
+    from .input_macro import InputBackend, InputEngine, Macro, Pacing, PyAutoGUIBackend
+    from .lazy_loader import lazy_import
+except ImportError:
+    from shell_pool import ShellPool, ShellResult
+    from input_macro import InputBackend, InputEngine, Macro, Pacing, PyAutoGUIBackend
+    from lazy_loader import lazy_import
+
+# numpy/OpenCV (and pyautogui, via the input backend) load on first GUI use: shell-only runs never pay for them
+screen_capture = lazy_import("screen_capture", __package__)
+ui_locator = lazy_import("ui_locator", __package__)
 
 class PCControlModule:
     """
@@ -9,56 +18,108 @@ class PCControlModule:
     This module simulates human interaction (mouse, keyboard) and executes OS commands.
     """
     
-    def __init__(self):
-        # Fail-safe mechanism to prevent runaway code
-        pyautogui.FAILSAFE = True
+    def __init__(self, shell_workers: int = 4, frame_source: Optional["screen_capture.FrameSource"] = None,
+                 input_backend: Optional[InputBackend] = None, pacing: Pacing = Pacing.FAST):
+        # All mouse/keyboard input goes through one macro engine with explicit pacing (created on first input)
+        self._input_backend = input_backend
+        self._pacing = pacing
+        self._input: Optional[InputEngine] = None
+        # Persistent shells: commands no longer pay a process spawn each
+        self.shell = ShellPool(size=shell_workers)
+        # Screen capture starts on first use; a synthetic/recorded source allows headless runs
+        self._frame_source = frame_source
+        self._screen: Optional["screen_capture.CapturePipeline"] = None
+        self._locator: Optional["ui_locator.UILocator"] = None
+        self._saved_screenshot: Optional[Tuple[str, int]] = None
         print("PC Control Module Initialized.")
 
+    @property
+    def input(self) -> InputEngine:
+        if self._input is None:
+            self._input = InputEngine(self._input_backend or PyAutoGUIBackend(), self._pacing)
+        return self._input
+
+    @property
+    def screen(self) -> "screen_capture.CapturePipeline":
+        if self._screen is None:
+            self._screen = screen_capture.CapturePipeline(self._frame_source or screen_capture.ScreenSource())
+        return self._screen
+
+    @property
+    def locator(self) -> "ui_locator.UILocator":
+        if self._locator is None:
+            self._locator = ui_locator.UILocator(self.screen)
+        return self._locator
+
+    def register_element(self, name: str, image, threshold: Optional[float] = None):
+        """Registers a UI element template (RGB array or image path) for click_element."""
+        self.locator.register(name, image, threshold)
+
+    def click_element(self, name: str, button: str = 'left'):
+        """Clicks the center of a registered UI element found on screen by template matching."""
+        match = self.locator.locate(name)
+        if match is None:
+            return f"Error: UI element '{name}' not found on screen"
+        x, y = match.center
+        self.move_and_click(x, y, button)
+        return f"Clicked {name} at ({x}, {y})"
+
+    def capture_changes(self) -> Optional["screen_capture.Frame"]:
+        """Captures the screen in memory; returns the downscaled changed regions, or None if nothing changed."""
+        return self.screen.capture()
+
+    def run_macro(self, macro: Macro, pacing: Optional[Pacing] = None):
+        """Runs a batch of clicks, keys, hotkeys and text as one compiled macro."""
+        print(f"Running input macro: {len(macro)} steps")
+        return self.input.run(macro, pacing)
+
     def move_and_click(self, x: int, y: int, button: str = 'left'):
         """Moves the mouse to (x, y) coordinates and performs a click."""
         print(f"Moving mouse to ({x}, {y}) and clicking {button}.")
-        pyautogui.moveTo(x, y, duration=0.5)
-        pyautogui.click(button=button)
+        self.input.run(Macro().click(x, y, button))
 
-    def type_text(self, text: str, interval: float = 0.05):
-        """Types a string of text."""
+    def type_text(self, text: str, interval: Optional[float] = None):
+        """Types a string of text; interval overrides the pacing's per-key delay."""
         print(f"Typing text: '{text[:20]}...'")
-        pyautogui.write(text, interval=interval)
+        pacing = None
+        if interval is not None:
+            pacing = Pacing(self.input.pacing.move_duration, interval, self.input.pacing.action_delay)
+        self.input.run(Macro().type(text), pacing)
 
     def press_key(self, key: str):
         """Presses a single key or a combination (e.g., 'ctrl', 'alt', 'shift')."""
         print(f"Pressing key: {key}")
-        pyautogui.press(key)
+        self.input.run(Macro().press(key))
 
     def hotkey(self, *args: str):
         """Presses a combination of keys (e.g., hotkey('ctrl', 'c'))."""
         print(f"Pressing hotkey: {args}")
-        pyautogui.hotkey(*args)
+        self.input.run(Macro().hotkey(*args))
 
-    def execute_os_command(self, command: str) -> Tuple[str, str]:
+    def execute_os_command(self, command: str, timeout: float = 10) -> Tuple[str, str]:
         """Executes a command directly on the operating system."""
         print(f"Executing OS command: {command}")
-        try:
-            result = subprocess.run(
-                command, 
-                shell=True, 
-                check=True, 
-                capture_output=True, 
-                text=True,
-                timeout=10
-            )
-            return result.stdout, result.stderr
-        except subprocess.CalledProcessError as e:
-            return "", f"Error executing command: {e.stderr}"
-        except subprocess.TimeoutExpired:
+        result = self.shell.run(command, timeout=timeout)
+        if result.timed_out:
             return "", "Error: Command execution timed out."
+        if result.exit_code != 0:
+            return "", f"Error executing command: {result.stderr}"
+        return result.stdout, result.stderr
+
+    def execute_os_command_streamed(self, command: str, sink, timeout: float = 10) -> ShellResult:
+        """Executes a command, streaming stdout and stderr into `sink` instead of returning them."""
+        print(f"Executing OS command: {command}")
+        return self.shell.run(command, timeout=timeout, stdout_sink=sink, stderr_sink=sink)
 
     def take_screenshot(self, filename: str = "screenshot.png"):
-        """Captures the current screen and saves it."""
+        """Captures the current screen and saves it; an unchanged screen is not re-encoded."""
         print(f"Taking screenshot and saving to {filename}")
         try:
-            screenshot = pyautogui.screenshot()
-            screenshot.save(filename)
+            self.screen.capture()
+            if self._saved_screenshot != (filename, self.screen.frames_captured):
+                with open(filename, "wb") as f:
+                    f.write(screen_capture.encode_image(self.screen.current(), filename.rsplit(".", 1)[-1].lower()))
+                self._saved_screenshot = (filename, self.screen.frames_captured)
             return filename
         except Exception as e:
             return f"Error taking screenshot: {e}"
@@ -0,0 +1,228 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Task tokens that vary between otherwise identical tasks: quoted strings,
+# numbers, paths/file names/identifiers, and capitalized names mid-sentence
+_SLOT_RE = re.compile(
+    r"""'[^']*'|"[^"]*"|`[^`]*`"""
+    r"""|(?<![\w/.~-])[~\w.-]*(?:[/_\d]|\.\w)[\w./~-]*(?<!\.)"""
+    r"""|(?<=[a-z,] )[A-Z][\w-]*"""
+)
+_DIGITS_RE = re.compile(r"\d+")
+
+def normalize_task(task: str) -> Tuple[str, List[str]]:
+    """
+    Splits a task into a template and its slot values, e.g.
+    "Create a directory named 'Data_2' and list it" ->
+    ("create a directory named {slot0} and list it", ["Data_2"]).
+    """
+    slots: List[str] = []
+
+    def slot(match: "re.Match") -> str:
+        value = match.group()
+        if value[0] in "'\"`":
+            value = value[1:-1]
+        slots.append(value)
+        return f"{{slot{len(slots) - 1}}}"
+
+    template = _SLOT_RE.sub(slot, task.strip())
+    template = " ".join(template.split()).lower().rstrip(".!")
+    return template, slots
+
+_PLACEHOLDER_RE = re.compile(r"\{slot(\d+)\}")
+
+@lru_cache(maxsize=256)
+def _slot_pattern(slots: Tuple[str, ...]) -> "re.Pattern":
+    # Existing placeholders first so they are kept as they are; then slot values
+    # longest first, as whole tokens only ("1" must not match inside "10" or "demo1")
+    order = sorted((i for i, value in enumerate(slots) if value), key=lambda i: -len(slots[i]))
+    values = "|".join(f"(?P<s{i}>{re.escape(slots[i])})" for i in order)
+    return re.compile(_PLACEHOLDER_RE.pattern + (rf"|(?<!\w)(?:{values})(?!\w)" if values else ""))
+
+def _parameterize(text: str, slots: Sequence[str]) -> str:
+    """Replaces slot values with {slotN} placeholders in a single pass."""
+    def placeholder(match: "re.Match") -> str:
+        if match.group(1) is not None:
+            return match.group()
+        return f"{{slot{match.lastgroup[1:]}}}"
+    return _slot_pattern(tuple(slots)).sub(placeholder, text)
+
+def _instantiate(text: str, slots: Sequence[str]) -> str:
+    def value(match: "re.Match") -> str:
+        index = int(match.group(1))
+        return slots[index] if index < len(slots) else match.group()
+    return _PLACEHOLDER_RE.sub(value, text)
+
+def _ambiguous_slots(slots: Sequence[str]) -> bool:
+    """Whether one slot value contains another (or repeats it), so a match could belong to either."""
+    values = [value for value in slots if value]
+    return any(i != j and a in b for i, a in enumerate(values) for j, b in enumerate(values))
+
+def _map_strings(value: Any, fn) -> Any:
+    if isinstance(value, str):
+        return fn(value)
+    if isinstance(value, dict):
+        return {key: _map_strings(item, fn) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_map_strings(item, fn) for item in value]
+    return value
+
+def observation_signatures(text: str, slots: Sequence[str]) -> Tuple[str, str]:
+    """
+    (exact, shape) hashes of an observation with slot values parameterized.
+    The shape hash also masks digit runs (sizes, timestamps, PIDs), so output
+    that only differs in volatile numbers still counts as the same outcome.
+    """
+    text = _parameterize(text, slots)
+    exact = hashlib.sha1(text.encode("utf-8", "replace")).hexdigest()
+    shape = hashlib.sha1(_DIGITS_RE.sub("#", text).encode("utf-8", "replace")).hexdigest()
+    return exact, shape
+
+class PlanMatch:
+    """A cached trajectory instantiated for the slot values of a new task."""
+
+    __slots__ = ("template", "slots", "steps", "answer")
+
+    def __init__(self, template: str, slots: List[str], steps: List[Dict[str, Any]], answer: str):
+        self.template = template
+        self.slots = slots
+        self.steps = steps
+        self.answer = answer
+
+    def thought(self, index: int) -> str:
+        return _instantiate(self.steps[index]["thought"], self.slots)
+
+    def actions(self, index: int) -> List[Dict[str, Any]]:
+        return _map_strings(self.steps[index]["actions"], lambda s: _instantiate(s, self.slots))
+
+    def compare(self, index: int, observations: Sequence[str]) -> Optional[str]:
+        """
+        Compares a replayed step's observations with the recorded ones:
+        "exact", "shape" (only volatile numbers differ) or None (deviation).
+        """
+        recorded = self.steps[index]["observations"]
+        if len(recorded) != len(observations):
+            return None
+        result = "exact"
+        for (exact, shape), text in zip(recorded, observations):
+            new_exact, new_shape = observation_signatures(text, self.slots)
+            if new_exact != exact:
+                if new_shape != shape:
+                    return None
+                result = "shape"
+        return result
+
+    def final_answer(self) -> str:
+        return _instantiate(self.answer, self.slots)
+
+class PlanCache:
+    """
+    Trajectory-level cache: successful task solutions keyed by the task's
+    normalized template. A matching task replays the recorded action sequence
+    without LLM calls; the caller falls back to the LLM as soon as an
+    observation deviates from the recorded one.
+
+    Plans are kept in an LRU and, when `path` is given, persisted as JSON.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_plans: int = 1024):
+        self.path = path
+        self.max_plans = max_plans
+        self._plans: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"lookups": 0, "hits": 0, "recorded": 0, "replays_completed": 0,
+                      "deviations": 0, "saved_llm_calls": 0}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for template, plan in json.load(f).items():
+                    self._plans[template] = plan
+
+    def lookup(self, task: str) -> Optional[PlanMatch]:
+        template, slots = normalize_task(task)
+        with self._lock:
+            self.stats["lookups"] += 1
+            plan = self._plans.get(template)
+            if plan is None or plan["slot_count"] != len(slots):
+                return None
+            self._plans.move_to_end(template)
+            self.stats["hits"] += 1
+        return PlanMatch(template, slots, plan["steps"], plan["answer"])
+
+    def record(self, task: str, steps: Sequence[Tuple[str, List[Dict[str, Any]], List[str]]],
+               answer: str) -> bool:
+        """
+        Stores a successful trajectory: (thought, actions, observation texts) per
+        step plus the final answer. Trajectories that cannot be parameterized
+        unambiguously are skipped: a slot value contained in another one, a
+        one-digit slot that occurs more than once in an action, or an action
+        using a slot value in another form (e.g. lower-cased).
+        """
+        if not steps:
+            return False
+        template, slots = normalize_task(task)
+        if _ambiguous_slots(slots):
+            return False
+        parameterize = lambda s: _parameterize(s, slots)
+        digits = [re.compile(rf"(?<!\w){value}(?!\w)") for value in slots if len(value) == 1 and value.isdigit()]
+        recorded = []
+        for thought, actions, observations in steps:
+            for action in actions:
+                text = json.dumps(action.get("params", {}), ensure_ascii=False)
+                for value in slots:
+                    if value and value not in text and value.lower() in text.lower():
+                        return False
+                if any(len(pattern.findall(text)) > 1 for pattern in digits):
+                    return False
+            recorded.append({
+                "thought": parameterize(thought),
+                "actions": _map_strings(actions, parameterize),
+                "observations": [observation_signatures(text, slots) for text in observations]
+            })
+        with self._lock:
+            self._plans[template] = {"slot_count": len(slots), "steps": recorded,
+                                     "answer": parameterize(answer)}
+            self._plans.move_to_end(template)
+            if len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+            self.stats["recorded"] += 1
+        if self.path:
+            self.save()
+        return True
+
+    def report_replay(self, steps_replayed: int, completed: bool):
+        """Records the outcome of a replay; every replayed step is one Think step not sent to the LLM."""
+        with self._lock:
+            self.stats["saved_llm_calls"] += steps_replayed + (1 if completed else 0)
+            if completed:
+                self.stats["replays_completed"] += 1
+            else:
+                self.stats["deviations"] += 1
+
+    def invalidate(self, task: str):
+        template, _ = normalize_task(task)
+        with self._lock:
+            self._plans.pop(template, None)
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self._plans, ensure_ascii=False)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["plans"] = len(self._plans)
+        stats["hit_rate"] = stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+        return stats
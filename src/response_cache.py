@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+class ReplayMissError(KeyError):
+    """Raised in replay mode when a request was never recorded."""
+
+class ResponseCache:
+    """
+    Two-tier cache for LLM responses: a bounded in-memory LRU in front of a
+    persistent SQLite store. Entries are keyed by a hash of the full request.
+
+    Modes:
+    - "readwrite": serve hits, store misses (default)
+    - "record":    always go to the network and overwrite stored responses
+    - "replay":    serve only stored responses; a miss raises ReplayMissError
+    """
+
+    MODES = ("readwrite", "record", "replay")
+
+    def __init__(self, path: Optional[str] = None, mode: str = "readwrite",
+                 max_memory_entries: int = 512, max_disk_entries: int = 100_000,
+                 ttl_seconds: Optional[float] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown cache mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = self._open_db(path) if path else None
+
+    def _open_db(self, path: str) -> sqlite3.Connection:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        return db
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, prompt: str, temperature: float, **extra: Any) -> str:
+        """Stable hash of everything that influences the completion."""
+        material = json.dumps([model, system_prompt, prompt, temperature, extra], sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached response or None. Record mode always misses."""
+        if self.mode == "record":
+            return None
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, created_at = entry
+                if not self._expired(created_at):
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return response
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    response, created_at = row
+                    if not self._expired(created_at):
+                        self._remember(key, response, created_at)
+                        self.stats["disk_hits"] += 1
+                        return response
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+            self.stats["misses"] += 1
+        if self.mode == "replay":
+            raise ReplayMissError(key)
+        return None
+
+    def put(self, key: str, response: str):
+        if self.mode == "replay":
+            return
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, response, created_at)
+            self.stats["stores"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+                    (key, response, created_at)
+                )
+                if self.stats["stores"] % 256 == 0:
+                    self._evict_disk()
+
+    def _remember(self, key: str, response: str, created_at: float):
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _evict_disk(self):
+        """Drops expired rows, then the oldest rows beyond the size bound."""
+        if self.ttl_seconds is not None:
+            self._db.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+        self._db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        )
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            lookups = hits + self.stats["misses"]
+            return {
+                **self.stats,
+                "mode": self.mode,
+                "memory_entries": len(self._memory),
+                "hit_rate": hits / lookups if lookups else 0.0
+            }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._evict_disk()
+                self._db.close()
+                self._db = None
@@ -0,0 +1,335 @@
+import time
+import threading
+from abc import ABC, abstractmethod
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+class FrameSource(ABC):
+    """
+    Source of RGB frames as (height, width, 3) uint8 arrays.
+    The returned array may be reused by the source on the next grab().
+    """
+
+    size: Tuple[int, int] = (0, 0)  # (width, height)
+
+    @abstractmethod
+    def grab(self) -> np.ndarray:
+        ...
+
+    def close(self):
+        pass
+
+class ScreenSource(FrameSource):
+    """
+    The real screen. Uses mss (raw BGRA buffer, no image object) when it is
+    installed, otherwise pyautogui's PIL screenshot.
+    """
+
+    def __init__(self, monitor: int = 1):
+        self._mss = None
+        try:
+            import mss
+            self._mss = mss.mss()
+            self._monitor = self._mss.monitors[monitor]
+            self.size = (self._monitor["width"], self._monitor["height"])
+        except ImportError:
+            import pyautogui
+            self.size = tuple(pyautogui.size())
+
+    def grab(self) -> np.ndarray:
+        if self._mss is not None:
+            shot = self._mss.grab(self._monitor)
+            bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+            return bgra[..., 2::-1]  # RGB view; the pipeline copies it into its own buffer
+        import pyautogui
+        return np.asarray(pyautogui.screenshot().convert("RGB"))
+
+    def close(self):
+        if self._mss is not None:
+            self._mss.close()
+
+class SyntheticSource(FrameSource):
+    """
+    Deterministic desktop-like frames for headless runs: a static background
+    with a few windows, and per grab a configurable amount of activity
+    ("idle", "typing", "cursor" or "scroll").
+    """
+
+    def __init__(self, width: int = 1920, height: int = 1080, activity: str = "typing", seed: int = 0):
+        self.size = (width, height)
+        self.activity = activity
+        self._rng = np.random.default_rng(seed)
+        self._frame = np.empty((height, width, 3), dtype=np.uint8)
+        self._frame[:] = (32, 48, 64)
+        for _ in range(4):
+            w, h = int(self._rng.integers(width // 5, width // 2)), int(self._rng.integers(height // 5, height // 2))
+            x, y = int(self._rng.integers(0, width - w)), int(self._rng.integers(0, height - h))
+            self._frame[y:y + h, x:x + w] = self._rng.integers(120, 255, 3, dtype=np.uint8)
+            self._frame[y:y + 24, x:x + w] = (60, 60, 90)  # Title bar
+        self._tick = 0
+
+    def grab(self) -> np.ndarray:
+        width, height = self.size
+        self._tick += 1
+        if self.activity == "typing":
+            # One glyph per frame along a text line
+            line, col = divmod(self._tick, max(1, (width - 200) // 10))
+            x, y = 100 + col * 10, 200 + (line % 40) * 18
+            self._frame[y:y + 14, x:x + 8] = self._rng.integers(0, 80, (14, 8, 3), dtype=np.uint8)
+        elif self.activity == "cursor":
+            x, y = 100 + (self._tick * 7) % (width - 200), 100 + (self._tick * 3) % (height - 200)
+            self._frame[y:y + 16, x:x + 12] ^= 0xFF
+        elif self.activity == "scroll":
+            self._frame[100:height - 100] = np.roll(self._frame[100:height - 100], -16, axis=0)
+        return self._frame
+
+class RecordedSource(FrameSource):
+    """Replays a sequence of frames (arrays, or an .npy/.npz file), looping at the end."""
+
+    def __init__(self, frames: Any):
+        if isinstance(frames, str):
+            data = np.load(frames)
+            frames = [data[key] for key in data.files] if hasattr(data, "files") else list(data)
+        self._frames: List[np.ndarray] = list(frames)
+        if not self._frames:
+            raise ValueError("RecordedSource needs at least one frame")
+        height, width = self._frames[0].shape[:2]
+        self.size = (width, height)
+        self._index = 0
+
+    def grab(self) -> np.ndarray:
+        frame = self._frames[self._index % len(self._frames)]
+        self._index += 1
+        return frame
+
+class Region:
+    """
+    A changed rectangle of a frame in full-resolution screen coordinates, with
+    its pixels downscaled by `scale`. Encoding happens only on request.
+    """
+
+    __slots__ = ("x", "y", "width", "height", "scale", "pixels", "_encoded")
+
+    def __init__(self, x: int, y: int, width: int, height: int, scale: int, pixels: np.ndarray):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.scale = scale
+        self.pixels = pixels
+        self._encoded: Dict[str, bytes] = {}
+
+    @property
+    def box(self) -> Tuple[int, int, int, int]:
+        return self.x, self.y, self.width, self.height
+
+    def encode(self, fmt: str = "png") -> bytes:
+        """Encoded image of the downscaled pixels (cached per format)."""
+        if fmt not in self._encoded:
+            self._encoded[fmt] = encode_image(self.pixels, fmt)
+        return self._encoded[fmt]
+
+    def __repr__(self) -> str:
+        return f"Region(x={self.x}, y={self.y}, width={self.width}, height={self.height}, scale={self.scale})"
+
+class Frame:
+    """A captured frame that differs from the previous one."""
+
+    __slots__ = ("index", "timestamp", "regions", "dirty_tiles", "_pipeline", "_generation")
+
+    def __init__(self, index: int, timestamp: float, regions: List[Region], dirty_tiles: np.ndarray,
+                 pipeline: "CapturePipeline"):
+        self.index = index
+        self.timestamp = timestamp
+        self.regions = regions
+        self.dirty_tiles = dirty_tiles
+        self._pipeline = pipeline
+        self._generation = pipeline.frames_captured
+
+    @property
+    def dirty_fraction(self) -> float:
+        return float(self.dirty_tiles.mean()) if self.dirty_tiles.size else 0.0
+
+    def full(self, scale: int = 1) -> np.ndarray:
+        """Copy of the whole frame; only available until the next capture."""
+        if self._generation != self._pipeline.frames_captured:
+            raise RuntimeError("Frame buffer was reused by a newer capture")
+        return self._pipeline.current(scale)
+
+class CapturePipeline:
+    """
+    In-memory capture with frame diffing.
+
+    Frames are copied into one of two preallocated buffers (padded to whole
+    tiles) and compared with the previous frame tile by tile. capture()
+    returns None when nothing changed; otherwise a Frame whose regions are
+    merged rectangles of changed tiles, downscaled by `downscale`. Nothing is
+    encoded or written to disk unless a region or frame is explicitly encoded.
+    `threshold` ignores per-channel differences up to that value (codec or
+    dithering noise) at the cost of a slower diff.
+    """
+
+    def __init__(self, source: FrameSource, tile: int = 32, downscale: int = 2, threshold: int = 0,
+                 max_regions: int = 16):
+        self.source = source
+        self.tile = tile
+        self.downscale = max(1, downscale)
+        self.threshold = threshold
+        self.max_regions = max_regions
+        width, height = source.size
+        self._rows, self._cols = -(-height // tile), -(-width // tile)
+        shape = (self._rows * tile, self._cols * tile, 3)
+        self._buffers = [np.zeros(shape, dtype=np.uint8), np.zeros(shape, dtype=np.uint8)]
+        self._current = 0
+        self._has_previous = False
+        self._height, self._width = height, width
+        self._lock = threading.Lock()
+        self._listeners: List[Any] = []
+        self.frames_captured = 0
+        self.stats = {"grabs": 0, "frames": 0, "skipped": 0, "regions": 0, "dirty_tiles": 0,
+                      "pixels_out": 0, "grab_ms": 0.0, "diff_ms": 0.0}
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self._width, self._height
+
+    def capture(self) -> Optional[Frame]:
+        """Grabs a frame; returns None if it is identical to the previous one."""
+        with self._lock:
+            start = time.perf_counter()
+            raw = self.source.grab()
+            target = self._buffers[self._current ^ 1]
+            np.copyto(target[:self._height, :self._width], raw[:self._height, :self._width, :3])
+            grabbed = time.perf_counter()
+
+            previous = self._buffers[self._current]
+            if self._has_previous:
+                dirty = self._dirty_tiles(target, previous)
+            else:
+                dirty = np.ones((self._rows, self._cols), dtype=bool)
+            diffed = time.perf_counter()
+            self.stats["grabs"] += 1
+            self.stats["grab_ms"] += (grabbed - start) * 1e3
+            self.stats["diff_ms"] += (diffed - grabbed) * 1e3
+            if not dirty.any():
+                self.stats["skipped"] += 1
+                return None
+
+            self._current ^= 1
+            self._has_previous = True
+            self.frames_captured += 1
+            regions = [self._region(*box) for box in self._merge(dirty)]
+            self.stats["frames"] += 1
+            self.stats["regions"] += len(regions)
+            self.stats["dirty_tiles"] += int(dirty.sum())
+            self.stats["pixels_out"] += sum(region.pixels.shape[0] * region.pixels.shape[1] for region in regions)
+            frame = Frame(self.frames_captured, time.time(), regions, dirty, self)
+            for listener in self._listeners:
+                listener(frame)
+            return frame
+
+    def add_listener(self, listener):
+        """Calls listener(frame) for every changed frame, whoever triggered the capture."""
+        self._listeners.append(listener)
+
+    def _dirty_tiles(self, frame: np.ndarray, previous: np.ndarray) -> np.ndarray:
+        tile = self.tile
+        if self.threshold:
+            changed = np.abs(frame.astype(np.int16) - previous) > self.threshold
+            return changed.reshape(self._rows, tile, self._cols, tile, 3).any(axis=(1, 3, 4))
+        if tile % 8 == 0:
+            # Exact diff on 8-byte words: a tile row is tile * 3 / 8 whole words
+            words = tile * 3 // 8
+            changed = frame.reshape(frame.shape[0], -1).view(np.uint64) != previous.reshape(
+                previous.shape[0], -1).view(np.uint64)
+            return changed.reshape(self._rows, tile, self._cols, words).any(axis=(1, 3))
+        changed = frame != previous
+        return changed.reshape(self._rows, tile, self._cols, tile, 3).any(axis=(1, 3, 4))
+
+    def _merge(self, dirty: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """
+        Merges dirty tiles into rectangles (tile units): runs per row, extended
+        downwards while the next row has the same run. Past max_regions, the
+        bounding box of all dirty tiles is returned instead.
+        """
+        open_runs: Dict[Tuple[int, int], int] = {}  # (col0, col1) -> first row
+        boxes = []
+        for row in range(self._rows + 1):
+            runs = set(_runs(dirty[row])) if row < self._rows else set()
+            for run in list(open_runs):
+                if run not in runs:
+                    first = open_runs.pop(run)
+                    boxes.append((run[0], first, run[1] - run[0], row - first))
+            for run in runs:
+                open_runs.setdefault(run, row)
+        if len(boxes) > self.max_regions:
+            rows, cols = np.nonzero(dirty)
+            boxes = [(int(cols.min()), int(rows.min()), int(cols.max() - cols.min() + 1),
+                      int(rows.max() - rows.min() + 1))]
+        return boxes
+
+    def _region(self, col: int, row: int, cols: int, rows: int) -> Region:
+        tile = self.tile
+        x, y = col * tile, row * tile
+        width, height = min(cols * tile, self._width - x), min(rows * tile, self._height - y)
+        pixels = self._buffers[self._current][y:y + height, x:x + width]
+        return Region(x, y, width, height, self.downscale, downscale(pixels, self.downscale))
+
+    def current(self, scale: int = 1) -> np.ndarray:
+        """Copy of the latest frame, optionally downscaled."""
+        frame = self._buffers[self._current][:self._height, :self._width]
+        return downscale(frame, scale) if scale > 1 else frame.copy()
+
+    def crop(self, x: int, y: int, width: int, height: int) -> np.ndarray:
+        """Full-resolution view of a rectangle of the latest frame, clipped to the screen."""
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(self._width, x + width), min(self._height, y + height)
+        return self._buffers[self._current][y0:max(y0, y1), x0:max(x0, x1)]
+
+    def reset(self):
+        """Forgets the previous frame: the next capture reports the whole screen."""
+        with self._lock:
+            self._has_previous = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        grabs = stats["grabs"] or 1
+        stats["skip_rate"] = stats["skipped"] / grabs
+        stats["avg_grab_ms"] = stats["grab_ms"] / grabs
+        stats["avg_diff_ms"] = stats["diff_ms"] / grabs
+        stats["tiles"] = self._rows * self._cols
+        return stats
+
+    def close(self):
+        self.source.close()
+
+def _runs(row: np.ndarray) -> Iterable[Tuple[int, int]]:
+    """(start, end) column ranges of consecutive True values."""
+    padded = np.concatenate(([False], row, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    return zip(edges[::2].tolist(), edges[1::2].tolist())
+
+def downscale(pixels: np.ndarray, factor: int) -> np.ndarray:
+    """Area-average downscale by an integer factor (edge pixels that do not fill a block are dropped)."""
+    if factor <= 1:
+        return pixels.copy()
+    height, width = pixels.shape[0] // factor, pixels.shape[1] // factor
+    if height == 0 or width == 0:
+        return pixels[::factor, ::factor].copy()
+    blocks = pixels[:height * factor, :width * factor].reshape(height, factor, width, factor, -1)
+    return blocks.mean(axis=(1, 3), dtype=np.float32).astype(np.uint8)
+
+def encode_image(pixels: np.ndarray, fmt: str = "png") -> bytes:
+    """Encodes RGB pixels with OpenCV if available, otherwise Pillow."""
+    try:
+        import cv2
+        ok, data = cv2.imencode(f".{fmt}", np.ascontiguousarray(pixels[..., ::-1]))
+        if not ok:
+            raise ValueError(f"Could not encode image as {fmt}")
+        return data.tobytes()
+    except ImportError:
+        import io
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, format=fmt.upper().replace("JPG", "JPEG"))
+        return buffer.getvalue()
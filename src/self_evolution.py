@@ -1,27 +1,100 @@
 import os
 import subprocess
+from typing import Any, Dict, List, Optional, Tuple
+try:
+    from .code_index import CodeIndex
+    from .llm_engine import is_fallback_response
+except ImportError:
+    from code_index import CodeIndex
+    from llm_engine import is_fallback_response
+
+# The project this module belongs to (the directory above src/)
+DEFAULT_BASE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ANALYSIS_PROMPT = """Review the Python symbols below for bugs, performance problems and possible simplifications.
+Only these symbols changed since the last review; callers are listed for context.
+Answer with one short section per symbol that needs work, citing its file and name.
+
+"""
 
 class SelfEvolutionModule:
     """
     Module that allows NeuroSovereign to analyze and improve its own source code.
     This is a core feature for a 'Super AI' that evolves over time.
+
+    Analysis works on an incremental code index (see code_index.py): only
+    files whose content changed are re-parsed, and prompts carry only the
+    symbols added or modified since the last analysis, most complex first.
     """
-    
-    def __init__(self, base_path: str = "/home/ubuntu/NeuroSovereign-Core"):
-        self.base_path = base_path
+
+    def __init__(self, base_path: Optional[str] = None, index_path: Optional[str] = None,
+                 token_budget: int = 6000):
+        self.base_path = os.path.abspath(base_path or os.getenv("NS_BASE_PATH", DEFAULT_BASE_PATH))
+        self.token_budget = token_budget
+        self.index = CodeIndex(self.base_path, index_path or os.getenv(
+            "CODE_INDEX_PATH", os.path.join(self.base_path, ".neurosovereign", "code_index.json")))
         print("Self-Evolution Module Initialized. Ready to improve.")
 
-    def analyze_code(self, file_path: str) -> str:
+    def analysis_prompt(self, file_path: Optional[str] = None) -> Tuple[str, List[Tuple[str, Dict[str, Any]]]]:
+        """Refreshes the index; returns the prompt for the pending symbols (of one file or all) and those symbols."""
+        self.index.refresh()
+        rel = self._relative(file_path) if file_path else None
+        prompt, included = self.index.build_prompt(self.index.pending(rel), self.token_budget)
+        return (ANALYSIS_PROMPT + prompt if included else ""), included
+
+    def analyze_code(self, file_path: str, llm: Any = None) -> str:
         """Analyzes a specific code file for potential improvements."""
-        full_path = os.path.join(self.base_path, file_path)
-        print(f"Analyzing code in {full_path}...")
-        try:
-            with open(full_path, 'r') as f:
-                content = f.read()
-            # In a real scenario, the LLM would analyze this content
-            return f"Analysis of {file_path} complete. Found 2 potential optimizations."
-        except Exception as e:
-            return f"Error analyzing code: {e}"
+        rel = self._relative(file_path)
+        print(f"Analyzing code in {os.path.join(self.base_path, rel)}...")
+        self.index.refresh()
+        entry = self.index.files.get(rel)
+        if entry is None:
+            return f"Error analyzing code: {file_path} is not a Python file under {self.base_path}"
+        if "error" in entry:
+            return f"Error analyzing code: {entry['error']}"
+        return self._analyze(rel, llm)
+
+    def analyze_codebase(self, llm: Any = None) -> str:
+        """
+        Analyzes the symbols changed since the last analysis across the tree.
+        Without an LLM, returns the index summary and complexity hotspots;
+        with one, its review of the changed symbols, which count as analyzed once
+        the LLM actually answered (not on error text or a mock reply).
+        """
+        print(f"Indexing {self.base_path}...")
+        changes = self.index.refresh()
+        print(f"Index updated: {len(changes['added'])} added, {len(changes['changed'])} changed, "
+              f"{len(changes['removed'])} removed files")
+        return self._analyze(None, llm)
+
+    def _analyze(self, rel: Optional[str], llm: Any) -> str:
+        pending = self.index.pending(rel)
+        stats = self.index.get_stats()
+        scope = rel or f"{stats['files']} files"
+        symbols = sum(1 for _ in self.index.symbols(rel))
+        lines = [f"Analysis of {scope}: {symbols} symbols, {len(pending)} changed since the last analysis."]
+        if not pending:
+            return lines[0] + " Nothing to review."
+        lines.append("Most complex changed symbols:")
+        lines.extend(f"- {name}:{symbol['name']} (complexity {symbol['complexity']}, "
+                     f"{symbol['end_line'] - symbol['line'] + 1} lines)" for name, symbol in pending[:5])
+        if llm is None:
+            return "\n".join(lines)
+
+        prompt, included = self.index.build_prompt(pending, self.token_budget)
+        print(f"Reviewing {len(included)} of {len(pending)} changed symbols with the LLM...")
+        review = llm.generate_response(ANALYSIS_PROMPT + prompt,
+                                       "You are NeuroSovereign, reviewing your own source code.")
+        if is_fallback_response(review):
+            # Server down or failing: keep the symbols pending for the next analysis
+            return "\n".join(lines + ["", f"Review failed, nothing marked as analyzed: {review}"])
+        self.index.mark_analyzed(included)
+        if len(included) < len(pending):
+            lines.append(f"({len(pending) - len(included)} more symbols left for the next analysis)")
+        return "\n".join(lines + ["", review])
+
+    def _relative(self, file_path: str) -> str:
+        return os.path.relpath(os.path.join(self.base_path, file_path), self.base_path)
 
     def apply_improvement(self, file_path: str, new_content: str):
         """Applies an improvement by overwriting the file with optimized code."""
@@ -43,4 +116,5 @@ class SelfEvolutionModule:
 if __name__ == "__main__":
     evolver = SelfEvolutionModule()
     print(evolver.analyze_code("src/agent.py"))
+    print(evolver.analyze_codebase())
     print(evolver.run_self_test())
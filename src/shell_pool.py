@@ -0,0 +1,467 @@
+import os
+import re
+import time
+import uuid
+import queue
+import shlex
+import signal
+import selectors
+import threading
+import subprocess
+from typing import Any, Dict, List, Optional
+
+DEFAULT_SHELL = "/bin/bash" if os.path.exists("/bin/bash") else "/bin/sh"
+
+# Programs that only read system state (given no redirection or dangerous flags)
+READ_ONLY_COMMANDS = frozenset({
+    "ls", "cat", "head", "tail", "wc", "grep", "egrep", "fgrep", "rg", "find", "stat", "file",
+    "du", "df", "free", "uptime", "uname", "whoami", "id", "hostname", "pwd", "date", "echo",
+    "printf", "ps", "printenv", "which", "type", "sort", "uniq", "cut", "tr", "awk",
+    "sed", "nproc", "lscpu", "lsblk", "md5sum", "sha256sum", "realpath", "dirname", "basename",
+    "git", "true", "test", "sleep"
+})
+# Read-only programs whose output depends only on their arguments and the files they name,
+# so a result stays valid until one of those paths changes (unlike date, uptime, ps, sleep, ...)
+IDEMPOTENT_COMMANDS = frozenset({
+    "cat", "head", "tail", "wc", "stat", "file", "ls", "md5sum", "sha1sum", "sha224sum", "sha256sum",
+    "sha384sum", "sha512sum", "sort", "uniq", "cut", "tr", "echo", "printf", "realpath", "dirname",
+    "basename"
+})
+_GIT_READ_ONLY = frozenset({"status", "log", "diff", "show", "rev-parse", "ls-files", "blame"})
+_FIND_WRITES = frozenset({"-delete", "-exec", "-execdir", "-ok", "-okdir", "-fprint", "-fprint0", "-fprintf",
+                          "-fls"})
+# sed options that neither write files nor read a script from one; anything else counts as a write
+_SED_FLAGS = frozenset("nErsuz")
+_SED_LONG_FLAGS = frozenset({"--quiet", "--silent", "--regexp-extended", "--separate", "--unbuffered",
+                             "--null-data", "--posix", "--debug"})
+_DATE_SET_RE = re.compile(r"-[uR]*s|--set")
+_UNSAFE_SHELL_RE = re.compile(r"[>`]|\$\(|<\(")
+_SEGMENT_SPLIT_RE = re.compile(r"\|\|?|&&?|;|\n")
+# Variables, globs and brace expansion: the output depends on more than the literal words
+_EXPANSION_RE = re.compile(r"[$*?\[{]")
+
+def _sed_field(script: str, i: int, delimiter: str) -> int:
+    """Index just past the next unescaped delimiter (end of an s/// or y/// field)."""
+    while i < len(script) and script[i] != delimiter:
+        i += 2 if script[i] == "\\" else 1
+    return i + 1
+
+def _sed_script_writes(script: str) -> bool:
+    """
+    Whether a sed script may write files or run commands: the w, W and e
+    commands, or the w and e flags of s///. Unrecognized commands count as writes.
+    """
+    i = 0
+    while i < len(script):
+        c = script[i]
+        if c in " \t\n;{}!,$0123456789~":
+            i += 1
+        elif c in "/\\":  # Regex address, /re/ or \cREc
+            if c == "\\":
+                i += 1
+                c = script[i] if i < len(script) else ""
+            i = _sed_field(script, i + 1, c)
+            while i < len(script) and script[i] in "IM":
+                i += 1
+        elif c in "sy":
+            delimiter = script[i + 1] if i + 1 < len(script) else ""
+            if not delimiter or delimiter in "\n\\":
+                return True
+            i = _sed_field(script, _sed_field(script, i + 2, delimiter), delimiter)
+            flags = re.match(r"[^;}\n]*", script[i:]).group()
+            if c == "s" and re.search(r"[we]", flags):
+                return True
+            i += len(flags)
+        elif c in "aic:bTtrRvL#":  # Text, label or file name argument up to the end of the line
+            newline = script.find("\n", i)
+            i = len(script) if newline < 0 else newline
+        elif c in "pdDnNgGhHxlqQzPF=":
+            i += 1
+        else:  # w, W, e or anything not known to be harmless
+            return True
+    return False
+
+def _sed_writes(words: List[str]) -> bool:
+    scripts, expect_script, i = [], True, 1
+    while i < len(words):
+        word = words[i]
+        if word in ("-e", "--expression", "-l", "--line-length"):
+            if word in ("-e", "--expression") and i + 1 < len(words):
+                scripts.append(words[i + 1])
+            expect_script = word in ("-l", "--line-length") and expect_script
+            i += 2
+            continue
+        if word.startswith("--expression="):
+            scripts.append(word.split("=", 1)[1])
+            expect_script = False
+        elif word.startswith("--line-length="):
+            pass
+        elif word.startswith("--"):
+            if word not in _SED_LONG_FLAGS:
+                return True
+        elif word.startswith("-") and len(word) > 1:
+            if not set(word[1:]) <= _SED_FLAGS:
+                return True  # -i, -f script file, or unknown
+        elif expect_script:
+            scripts.append(word)
+            expect_script = False
+        i += 1
+    return any(_sed_script_writes(script) for script in scripts)
+
+def _sort_writes(words: List[str]) -> bool:
+    """-o/--output, also inside a cluster of short flags such as -no."""
+    for word in words[1:]:
+        if word.startswith("--output"):
+            return True
+        if word.startswith("-") and not word.startswith("--") and "o" in word:
+            return True
+    return False
+
+def _uniq_writes(words: List[str]) -> bool:
+    """uniq [options] [input [output]]: a second operand is the file it writes."""
+    operands, i = 0, 1
+    while i < len(words):
+        word = words[i]
+        if word == "--":
+            operands += len(words) - i - 1
+            break
+        if word in ("-f", "-s", "-w"):
+            i += 2  # Option value, not an operand
+            continue
+        if not word.startswith("-") or word == "-":
+            operands += 1
+        i += 1
+    return operands > 1
+
+def _awk_writes(words: List[str], segment: str) -> bool:
+    """system(), or gawk's inplace extension (-i inplace, --include=inplace)."""
+    if "system" in segment:
+        return True
+    for word, following in zip(words[1:], words[2:] + [""]):
+        if word in ("-i", "--include") and following.startswith("inplace"):
+            return True
+        if word.startswith(("-iinplace", "--include=inplace")):
+            return True
+    return False
+
+def is_read_only_command(command: str) -> bool:
+    """
+    Conservative check that a shell command only reads state, so it can run
+    concurrently with others. Anything not positively recognized is treated
+    as having side effects.
+    """
+    if not command or not command.strip() or _UNSAFE_SHELL_RE.search(command):
+        return False
+    for segment in _SEGMENT_SPLIT_RE.split(command):
+        try:
+            words = shlex.split(segment)
+        except ValueError:
+            return False
+        if not words:
+            continue
+        program = os.path.basename(words[0])
+        if program not in READ_ONLY_COMMANDS:
+            return False
+        if program == "find" and _FIND_WRITES.intersection(words):
+            return False
+        if program == "sed" and _sed_writes(words):
+            return False
+        if program == "date" and any(_DATE_SET_RE.match(word) for word in words[1:]):
+            return False
+        if program == "sort" and _sort_writes(words):
+            return False
+        if program == "uniq" and _uniq_writes(words):
+            return False
+        if program == "awk" and _awk_writes(words, segment):
+            return False
+        if program == "hostname" and len(words) > 1:  # hostname NAME sets it
+            return False
+        if program == "git" and (len(words) < 2 or words[1] not in _GIT_READ_ONLY
+                                 or any(word.startswith("--output") for word in words)):
+            return False
+    return True
+
+def is_idempotent_command(command: str) -> bool:
+    """
+    Whether a read-only command's result can be cached: every program in it
+    is idempotent, so repeating it gives the same output while the paths it
+    references are unchanged. Commands with shell expansions ($VAR, globs,
+    braces) are never cached, since referenced_paths() sees only literal words.
+    """
+    if not is_read_only_command(command) or _EXPANSION_RE.search(command):
+        return False
+    for segment in _SEGMENT_SPLIT_RE.split(command):
+        words = shlex.split(segment)
+        if words and os.path.basename(words[0]) not in IDEMPOTENT_COMMANDS:
+            return False
+    return True
+
+def referenced_paths(command: str, cwd: Optional[str] = None) -> List[str]:
+    """
+    Filesystem paths a command's output depends on: the working directory plus
+    every argument naming an existing file or directory.
+    """
+    cwd = cwd or os.getcwd()
+    paths = [cwd]
+    for segment in _SEGMENT_SPLIT_RE.split(command):
+        try:
+            words = shlex.split(segment)
+        except ValueError:
+            continue
+        for word in words[1:]:
+            if word.startswith("-"):
+                continue
+            path = os.path.join(cwd, os.path.expanduser(word))
+            if os.path.exists(path):
+                paths.append(path)
+    return paths
+
+class ShellResult:
+    """Outcome of one command run on a shell worker."""
+
+    __slots__ = ("command", "exit_code", "stdout", "stderr", "duration", "timed_out")
+
+    def __init__(self, command: str, exit_code: int, stdout: str, stderr: str,
+                 duration: float, timed_out: bool = False):
+        self.command = command
+        self.exit_code = exit_code
+        self.stdout = stdout
+        self.stderr = stderr
+        self.duration = duration
+        self.timed_out = timed_out
+
+    @property
+    def ok(self) -> bool:
+        return self.exit_code == 0 and not self.timed_out
+
+    def __repr__(self) -> str:
+        return f"ShellResult(exit_code={self.exit_code}, timed_out={self.timed_out}, duration={self.duration:.4f})"
+
+class _StreamFramer:
+    """
+    Forwards one output stream to a sink until the worker's sentinel shows up.
+    Only a marker-sized tail is held back, so the stream is never buffered whole.
+    """
+
+    def __init__(self, marker: bytes, sink):
+        self.needle = b"\n" + marker
+        self.sink = sink
+        self.pending = bytearray()
+        self.trailer = b""
+        self.done = False
+
+    def feed(self, chunk: bytes):
+        self.pending += chunk
+        index = self.pending.find(self.needle)
+        if index >= 0:
+            rest = self.pending[index + len(self.needle):]
+            if b"\n" not in rest:
+                return  # Wait for the rest of the sentinel line
+            self._emit(self.pending[:index])
+            self.trailer = bytes(rest.split(b"\n", 1)[0])
+            self.pending.clear()
+            self.done = True
+            return
+        keep = len(self.needle) + 32
+        if len(self.pending) > keep:
+            self._emit(self.pending[:-keep])
+            del self.pending[:-keep]
+
+    def flush(self):
+        """Releases the held-back tail (used when the command is abandoned)."""
+        self._emit(self.pending)
+        self.pending.clear()
+
+    def _emit(self, data: bytearray):
+        if isinstance(self.sink, bytearray):
+            self.sink += data
+        elif data:
+            self.sink.write(bytes(data))
+
+class _ShellWorker:
+    """
+    One long-lived shell process. Commands are written to its stdin and their
+    end is framed by a per-worker sentinel echoed on stdout (with the exit code)
+    and on stderr, so no process is spawned per command.
+    """
+
+    def __init__(self, shell: str = DEFAULT_SHELL):
+        self.shell = shell
+        self.marker = f"__NS_DONE_{uuid.uuid4().hex}__".encode()
+        start = time.perf_counter()
+        # New session so a timeout can kill the shell and everything it started
+        self.process = subprocess.Popen(
+            [shell],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=0,
+            start_new_session=True
+        )
+        self.spawn_time = time.perf_counter() - start
+
+    def run(self, command: str, timeout: float, stdout_sink=None, stderr_sink=None) -> ShellResult:
+        marker = self.marker.decode()
+        # Subshell: `exit`, `cd` or `export` in a command cannot break or leak into the worker
+        script = (
+            f"( eval {shlex.quote(command)} ) < /dev/null\n"
+            f"printf '\\n{marker}%s\\n' $?\n"
+            f"printf '\\n{marker}\\n' >&2\n"
+        )
+        start = time.perf_counter()
+        self.process.stdin.write(script.encode())
+
+        # Without sinks output is buffered; with sinks it is streamed and never held whole
+        stdout_buffer = bytearray() if stdout_sink is None else None
+        stderr_buffer = bytearray() if stderr_sink is None else None
+        stdout = _StreamFramer(self.marker, stdout_buffer if stdout_sink is None else stdout_sink)
+        stderr = _StreamFramer(self.marker, stderr_buffer if stderr_sink is None else stderr_sink)
+        deadline = start + timeout
+        timed_out = False
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.process.stdout, selectors.EVENT_READ, stdout)
+            selector.register(self.process.stderr, selectors.EVENT_READ, stderr)
+            while not (stdout.done and stderr.done):
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    timed_out = True
+                    stdout.flush()
+                    stderr.flush()
+                    break
+                for key, _ in selector.select(remaining):
+                    chunk = os.read(key.fd, 65536)
+                    if not chunk:
+                        raise RuntimeError("shell worker exited unexpectedly")
+                    key.data.feed(chunk)
+
+        exit_code = int(stdout.trailer) if stdout.done and stdout.trailer.isdigit() else -1
+        return ShellResult(
+            command, exit_code,
+            stdout_buffer.decode("utf-8", "replace") if stdout_buffer is not None else "",
+            stderr_buffer.decode("utf-8", "replace") if stderr_buffer is not None else "",
+            time.perf_counter() - start, timed_out=timed_out
+        )
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def kill(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout, self.process.stderr):
+            stream.close()
+
+class ShellPool:
+    """
+    Pool of persistent shell workers for executing OS commands.
+
+    Each command checks out an idle worker, so up to `size` commands run
+    concurrently. Workers are started on demand, the first time every started
+    one is busy, so a pool that runs one command at a time keeps one shell.
+    A command that exceeds its timeout gets its worker (and the worker's
+    whole process group) killed and replaced by a fresh one.
+    """
+
+    def __init__(self, size: int = 4, default_timeout: float = 10.0, shell: str = DEFAULT_SHELL):
+        self.size = size
+        self.default_timeout = default_timeout
+        self.shell = shell
+        self._idle: "queue.Queue[_ShellWorker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {
+            "spawns": 0, "spawn_seconds_total": 0.0, "spawn_seconds_max": 0.0,
+            "commands": 0, "exec_seconds_total": 0.0, "exec_seconds_max": 0.0,
+            "timeouts": 0, "respawns": 0
+        }
+        self._started = 0  # Workers started so far (at most size)
+
+    def _spawn(self) -> _ShellWorker:
+        worker = _ShellWorker(self.shell)
+        with self._lock:
+            self._stats["spawns"] += 1
+            self._stats["spawn_seconds_total"] += worker.spawn_time
+            self._stats["spawn_seconds_max"] = max(self._stats["spawn_seconds_max"], worker.spawn_time)
+        return worker
+
+    def _checkout(self) -> _ShellWorker:
+        """An idle worker, or a new one while fewer than `size` have been started."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            start = self._started < self.size
+            if start:
+                self._started += 1
+        if not start:
+            return self._idle.get()
+        try:
+            return self._spawn()
+        except BaseException:
+            with self._lock:
+                self._started -= 1
+            raise
+
+    def _replace(self):
+        """Starts a worker in place of a killed one."""
+        with self._lock:
+            self._stats["respawns"] += 1
+        try:
+            self._idle.put(self._spawn())
+        except BaseException:
+            with self._lock:
+                self._started -= 1  # Free the slot; the next checkout starts one
+            raise
+
+    def run(self, command: str, timeout: Optional[float] = None,
+            stdout_sink=None, stderr_sink=None) -> ShellResult:
+        """
+        Runs a command on the next idle worker; blocks while all workers are busy.
+        Output is returned on the result unless a sink (anything with
+        `write(bytes)`) is given for the stream, in which case it is streamed there.
+        """
+        timeout = timeout if timeout is not None else self.default_timeout
+        worker = self._checkout()
+        try:
+            result = worker.run(command, timeout, stdout_sink, stderr_sink)
+        except BaseException as e:
+            # Worker died mid-command (e.g. killed externally), or a sink raised or the
+            # caller was interrupted: unread output would break the next command's framing
+            worker.kill()
+            self._replace()
+            if not isinstance(e, (RuntimeError, OSError)):
+                raise
+            result = ShellResult(command, -1, "", f"Shell worker failed: {e}", 0.0)
+        else:
+            if result.timed_out:
+                worker.kill()
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                self._replace()
+            else:
+                self._idle.put(worker)
+
+        with self._lock:
+            self._stats["commands"] += 1
+            self._stats["exec_seconds_total"] += result.duration
+            self._stats["exec_seconds_max"] = max(self._stats["exec_seconds_max"], result.duration)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Spawn and exec latency metrics (seconds)."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["spawn_seconds_mean"] = stats["spawn_seconds_total"] / stats["spawns"] if stats["spawns"] else 0.0
+        stats["exec_seconds_mean"] = stats["exec_seconds_total"] / stats["commands"] if stats["commands"] else 0.0
+        stats["idle_workers"] = self._idle.qsize()
+        return stats
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                break
@@ -0,0 +1,228 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+try:
+    from .instrumentation import METRICS
+except ImportError:
+    from instrumentation import METRICS
+
+# Side-effect classes
+PURE = "pure"            # No observable effect (paging an observation)
+READ_ONLY = "read_only"  # Reads system state; safe to run concurrently (cached only if cacheable)
+WRITE = "write"          # Changes system state; runs serially and invalidates cached reads
+GUI = "gui"              # Drives the one mouse/keyboard; always serial
+
+_REQUIRED = object()
+
+class ToolError(ValueError):
+    """Raised when a tool call names an unknown tool or has invalid parameters."""
+
+class ToolParam:
+    """One declared tool parameter."""
+
+    __slots__ = ("name", "type", "default", "description")
+
+    def __init__(self, name: str, type: type = str, default: Any = _REQUIRED, description: str = ""):
+        self.name = name
+        self.type = type
+        self.default = default
+        self.description = description
+
+    @property
+    def required(self) -> bool:
+        return self.default is _REQUIRED
+
+    def coerce(self, value: Any) -> Any:
+        if value is None or isinstance(value, self.type):
+            return value
+        if self.type in (int, float) and isinstance(value, bool):
+            raise ToolError(f"parameter '{self.name}' must be {self.type.__name__}, got {value!r}")
+        try:
+            return self.type(value)
+        except (TypeError, ValueError):
+            raise ToolError(f"parameter '{self.name}' must be {self.type.__name__}, got {value!r}")
+
+class ToolSpec:
+    """
+    Declaration of a tool: its schema, side-effect class, timeout and cacheability.
+
+    `side_effects` is either a class constant or a callable taking the params
+    (e.g. a shell command is read-only or not depending on the command).
+    `cacheable` is likewise a bool or a predicate on the params: read-only is
+    not enough, since reads like `date` or `ps` give a new answer every time.
+    `watch` returns the filesystem paths a cached result depends on; the result
+    is invalidated as soon as any of their mtimes or sizes change.
+    """
+
+    __slots__ = ("name", "handler", "params", "description", "side_effects",
+                 "timeout", "cacheable", "watch", "signature")
+
+    def __init__(self, name: str, handler: Optional[Callable[..., Any]], params: Sequence[ToolParam] = (),
+                 description: str = "", side_effects: Union[str, Callable[[Dict[str, Any]], str]] = WRITE,
+                 timeout: Optional[float] = None,
+                 cacheable: Union[bool, Callable[[Dict[str, Any]], bool]] = False,
+                 watch: Optional[Callable[[Dict[str, Any]], Iterable[str]]] = None):
+        self.name = name
+        self.handler = handler
+        self.params = tuple(params)
+        self.description = description
+        self.side_effects = side_effects
+        self.timeout = timeout
+        self.cacheable = cacheable
+        self.watch = watch
+        self.signature = tuple(param.name for param in self.params)
+
+    def side_effect_of(self, params: Dict[str, Any]) -> str:
+        return self.side_effects(params) if callable(self.side_effects) else self.side_effects
+
+    def cacheable_for(self, params: Dict[str, Any]) -> bool:
+        return self.cacheable(params) if callable(self.cacheable) else self.cacheable
+
+    def bind(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Validates params against the schema, filling defaults and the declared timeout."""
+        unknown = set(params) - set(self.signature)
+        if unknown:
+            raise ToolError(f"{self.name} got unexpected parameter(s) {sorted(unknown)}; "
+                            f"expected {list(self.signature)}")
+        bound = {}
+        for param in self.params:
+            if param.name in params:
+                bound[param.name] = param.coerce(params[param.name])
+            elif param.name == "timeout" and self.timeout is not None:
+                bound[param.name] = self.timeout
+            elif param.required:
+                raise ToolError(f"{self.name} is missing required parameter '{param.name}'")
+            else:
+                bound[param.name] = param.default
+        return bound
+
+    def render(self) -> str:
+        args = []
+        for param in self.params:
+            arg = f"{param.name}: {param.type.__name__}"
+            default = self.timeout if param.name == "timeout" and param.default is None else param.default
+            args.append(arg if param.required else f"{arg} = {default!r}")
+        return f"- {self.name}({', '.join(args)}): {self.description}"
+
+class ToolRegistry:
+    """
+    Table of tools keyed by name. The prompt's tool list, positional parameter
+    names, dispatch and parallel-safety all come from the declarations, so a
+    tool is described exactly once.
+
+    Results of calls that are read-only and cacheable for the given params are kept
+    in an LRU with a TTL; an entry is also dropped when a watched path changes,
+    and every write/GUI call clears the cache, since it may have changed
+    anything a read saw.
+    """
+
+    def __init__(self, cache_ttl: float = 30.0, cache_size: int = 256):
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._tools: Dict[str, ToolSpec] = {}
+        self._cache: "OrderedDict[Tuple, Tuple[Any, float, Tuple]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "cache_hits": 0, "cache_misses": 0, "invalidations": 0}
+
+    def register(self, name: str, handler: Optional[Callable[..., Any]], params: Sequence[ToolParam] = (),
+                 **options: Any) -> ToolSpec:
+        spec = ToolSpec(name, handler, params, **options)
+        self._tools[name] = spec
+        return spec
+
+    def get(self, name: str) -> Optional[ToolSpec]:
+        return self._tools.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def __iter__(self):
+        return iter(self._tools.values())
+
+    def signature(self, name: str) -> Optional[Tuple[str, ...]]:
+        spec = self._tools.get(name)
+        return spec.signature if spec else None
+
+    def render_prompt(self) -> str:
+        """Tool list for the system prompt, in registration order (byte-stable)."""
+        return "\n".join(spec.render() for spec in self._tools.values())
+
+    def is_parallel_safe(self, name: str, params: Dict[str, Any]) -> bool:
+        """Whether the call may run concurrently with others; invalid calls fail fast and qualify."""
+        spec = self._tools.get(name)
+        if spec is None:
+            return True
+        try:
+            return spec.side_effect_of(spec.bind(params)) in (PURE, READ_ONLY)
+        except ToolError:
+            return True
+
+    def call(self, name: str, params: Dict[str, Any]) -> Any:
+        """Dispatches a tool call, serving idempotent read-only calls from the cache."""
+        spec = self._tools.get(name)
+        if spec is None or spec.handler is None:
+            raise ToolError(f"Unknown tool: {name}")
+        bound = spec.bind(params)
+        side_effect = spec.side_effect_of(bound)
+        with self._lock:
+            self.stats["calls"] += 1
+
+        if not (side_effect == READ_ONLY and spec.cacheable_for(bound)):
+            try:
+                with METRICS.time("ns_tool_seconds", tool=name):
+                    return spec.handler(**bound)
+            finally:
+                if side_effect in (WRITE, GUI):
+                    self.invalidate()
+
+        key = (name, tuple(sorted((k, repr(v)) for k, v in bound.items())))
+        paths = tuple(spec.watch(bound)) if spec.watch else ()
+        snapshot = _stat_snapshot(paths)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                result, expires_at, cached_snapshot = entry
+                if now < expires_at and cached_snapshot == snapshot:
+                    self._cache.move_to_end(key)
+                    self.stats["cache_hits"] += 1
+                    METRICS.inc("ns_tool_cache_hits_total", tool=name)
+                    return result
+                del self._cache[key]
+            self.stats["cache_misses"] += 1
+
+        with METRICS.time("ns_tool_seconds", tool=name):
+            result = spec.handler(**bound)
+        if getattr(result, "exit_code", None) in (0, None):  # Failed commands are retried, not cached
+            with self._lock:
+                self._cache[key] = (result, now + self.cache_ttl, snapshot)
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return result
+
+    def invalidate(self):
+        with self._lock:
+            if self._cache:
+                self._cache.clear()
+                self.stats["invalidations"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["cached_results"] = len(self._cache)
+        lookups = stats["cache_hits"] + stats["cache_misses"]
+        stats["cache_hit_rate"] = stats["cache_hits"] / lookups if lookups else 0.0
+        stats["tools"] = len(self._tools)
+        return stats
+
+def _stat_snapshot(paths: Iterable[str]) -> Tuple:
+    snapshot: List[Tuple[str, int, int]] = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            snapshot.append((path, st.st_mtime_ns, st.st_size))
+        except OSError:
+            snapshot.append((path, -1, -1))
+    return tuple(snapshot)
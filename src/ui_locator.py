@@ -0,0 +1,229 @@
+import os
+import time
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+try:
+    from .screen_capture import CapturePipeline, Frame
+except ImportError:
+    from screen_capture import CapturePipeline, Frame
+
+Box = Tuple[int, int, int, int]  # x, y, width, height
+
+class Match:
+    """Where an element was found, in screen coordinates."""
+
+    __slots__ = ("name", "x", "y", "width", "height", "score", "scale")
+
+    def __init__(self, name: str, x: int, y: int, width: int, height: int, score: float, scale: float):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.score = score
+        self.scale = scale
+
+    @property
+    def box(self) -> Box:
+        return self.x, self.y, self.width, self.height
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        return self.x + self.width // 2, self.y + self.height // 2
+
+    def __repr__(self) -> str:
+        return (f"Match({self.name!r}, x={self.x}, y={self.y}, width={self.width}, height={self.height}, "
+                f"score={self.score:.3f}, scale={self.scale})")
+
+class ElementTemplate:
+    """A registered UI element: grayscale template pre-resized for every search scale."""
+
+    def __init__(self, name: str, image: np.ndarray, threshold: float, scales: Sequence[float]):
+        self.name = name
+        self.threshold = threshold
+        gray = _gray(image)
+        self.scaled: Dict[float, np.ndarray] = {}
+        for scale in scales:
+            size = (max(1, round(gray.shape[1] * scale)), max(1, round(gray.shape[0] * scale)))
+            interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+            self.scaled[scale] = gray if scale == 1.0 else cv2.resize(gray, size, interpolation=interpolation)
+        self.last_scale = 1.0 if 1.0 in self.scaled else scales[0]
+
+    def scale_order(self) -> List[float]:
+        """Last matching scale first: a UI rarely changes its scaling."""
+        return [self.last_scale] + [scale for scale in self.scaled if scale != self.last_scale]
+
+class UILocator:
+    """
+    Finds registered UI elements on screen by multi-scale template matching
+    (normalized cross-correlation), so repeated clicks on the same widget do
+    not need a vision-model round trip.
+
+    The last known position of every element (or the fact that it was not
+    found) is cached together with the frame it was checked against. Dirty
+    regions reported by the CapturePipeline since then decide what to do:
+    nothing changed near the element -> cached answer; its own box changed ->
+    verify around it; otherwise only the changed regions are searched. An
+    element can only have appeared or moved where pixels changed.
+    """
+
+    def __init__(self, pipeline: CapturePipeline, scales: Sequence[float] = (1.0, 0.9, 1.1, 0.8, 1.25),
+                 threshold: float = 0.85, history: int = 256):
+        self.pipeline = pipeline
+        self.scales = tuple(scales)
+        self.threshold = threshold
+        self._templates: Dict[str, ElementTemplate] = {}
+        self._cache: Dict[str, Tuple[Optional[Match], int]] = {}  # name -> (match, frames_seen)
+        self._dirty: Deque[Tuple[int, List[Box]]] = deque(maxlen=history)
+        self._frames_seen = 0
+        self._lock = threading.RLock()
+        self.stats = {"lookups": 0, "cache_hits": 0, "verifications": 0, "region_searches": 0,
+                      "full_searches": 0, "not_found": 0, "search_ms": 0.0}
+        pipeline.add_listener(self._on_frame)
+
+    def register(self, name: str, image: Any, threshold: Optional[float] = None) -> ElementTemplate:
+        """Registers an element from an RGB array or an image file path."""
+        if isinstance(image, str):
+            bgr = cv2.imread(image, cv2.IMREAD_COLOR)
+            if bgr is None:
+                raise ValueError(f"Could not read template image: {image}")
+            image = bgr[..., ::-1]
+        template = ElementTemplate(name, image, threshold or self.threshold, self.scales)
+        with self._lock:
+            self._templates[name] = template
+            self._cache.pop(name, None)
+        return template
+
+    def load_directory(self, directory: str) -> List[str]:
+        """Registers every PNG in a directory, named after the file."""
+        names = []
+        for filename in sorted(os.listdir(directory)):
+            if filename.lower().endswith(".png"):
+                names.append(os.path.splitext(filename)[0])
+                self.register(names[-1], os.path.join(directory, filename))
+        return names
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._templates
+
+    def _on_frame(self, frame: Frame):
+        with self._lock:
+            self._frames_seen += 1
+            self._dirty.append((self._frames_seen, [region.box for region in frame.regions]))
+
+    def locate(self, name: str, refresh: bool = True) -> Optional[Match]:
+        """Current position of an element, or None if it is not on screen."""
+        template = self._templates.get(name)
+        if template is None:
+            raise KeyError(f"Unknown UI element: {name}")
+        if refresh:
+            self.pipeline.capture()
+        with self._lock:
+            self.stats["lookups"] += 1
+            cached = self._cache.get(name)
+            frames_seen = self._frames_seen
+            if cached is None or (self._dirty and cached[1] < self._dirty[0][0] - 1):
+                changed = None  # Never searched, or the dirty history no longer covers it
+            else:
+                changed = [box for seen, boxes in self._dirty if seen > cached[1] for box in boxes]
+
+        start = time.perf_counter()
+        if changed is None:
+            self.stats["full_searches"] += 1
+            match = self._search(template, (0, 0) + self.pipeline.size)
+        else:
+            match = cached[0]
+            previous = match.box if match is not None else None
+            if not changed or (previous is not None and not any(_intersects(previous, box) for box in changed)):
+                self.stats["cache_hits"] += 1
+                return match
+            match = None
+            if previous is not None:
+                # Most often the element itself repainted (hover, focus): check it in place first
+                self.stats["verifications"] += 1
+                match = self._search(template, _expand(previous, 4), first_only=True)
+            if match is None:
+                self.stats["region_searches"] += 1
+                th, tw = max(t.shape[0] for t in template.scaled.values()), max(
+                    t.shape[1] for t in template.scaled.values())
+                for box in _merge_boxes([_expand(box, max(tw, th)) for box in changed]):
+                    match = self._search(template, box)
+                    if match is not None:
+                        break
+        self.stats["search_ms"] += (time.perf_counter() - start) * 1e3
+        if match is None:
+            self.stats["not_found"] += 1
+        with self._lock:
+            self._cache[name] = (match, frames_seen)
+        return match
+
+    def _search(self, template: ElementTemplate, box: Box, first_only: bool = False) -> Optional[Match]:
+        """Best match above the element's threshold within a screen rectangle."""
+        x, y, _, _ = box
+        window = self.pipeline.crop(*box)
+        if window.size == 0:
+            return None
+        gray = _gray(window)
+        x, y = max(0, x), max(0, y)
+        best: Optional[Match] = None
+        for scale in template.scale_order():
+            needle = template.scaled[scale]
+            if needle.shape[0] > gray.shape[0] or needle.shape[1] > gray.shape[1]:
+                continue
+            scores = cv2.matchTemplate(gray, needle, cv2.TM_CCOEFF_NORMED)
+            _, score, _, (mx, my) = cv2.minMaxLoc(scores)
+            if score >= template.threshold and (best is None or score > best.score):
+                best = Match(template.name, x + mx, y + my, needle.shape[1], needle.shape[0], float(score), scale)
+                if first_only or score >= 0.99:
+                    break
+        if best is not None:
+            template.last_scale = best.scale
+        return best
+
+    def invalidate(self, name: Optional[str] = None):
+        with self._lock:
+            if name is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(name, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["cache_hit_rate"] = stats["cache_hits"] / stats["lookups"] if stats["lookups"] else 0.0
+        stats["elements"] = len(self._templates)
+        return stats
+
+def _gray(image: np.ndarray) -> np.ndarray:
+    if image.ndim == 2:
+        return image
+    if image.shape[2] == 4:
+        return cv2.cvtColor(np.ascontiguousarray(image), cv2.COLOR_RGBA2GRAY)
+    return cv2.cvtColor(np.ascontiguousarray(image), cv2.COLOR_RGB2GRAY)
+
+def _intersects(a: Box, b: Box) -> bool:
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+def _expand(box: Box, margin: int) -> Box:
+    x, y, width, height = box
+    return x - margin, y - margin, width + 2 * margin, height + 2 * margin
+
+def _merge_boxes(boxes: List[Box]) -> List[Box]:
+    """Unions overlapping boxes so no pixel is matched twice."""
+    merged: List[Box] = []
+    for box in sorted(boxes):
+        for i, other in enumerate(merged):
+            if _intersects(box, other):
+                x0, y0 = min(box[0], other[0]), min(box[1], other[1])
+                x1 = max(box[0] + box[2], other[0] + other[2])
+                y1 = max(box[1] + box[3], other[1] + other[3])
+                merged[i] = (x0, y0, x1 - x0, y1 - y0)
+                break
+        else:
+            merged.append(box)
+    if len(merged) != len(boxes):
+        return _merge_boxes(merged)
+    return merged
@@ -0,0 +1,306 @@
+import re
+import json
+import zlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+try:
+    from .lazy_loader import lazy_import
+except ImportError:
+    from lazy_loader import lazy_import
+
+# Imported when the first entry is embedded, not when the agent module loads
+np = lazy_import("numpy")
+
+_WORD_RE = re.compile(r"[a-z0-9_./-]+")
+
+# Up to this many (row, query feature) pairs, search() gathers the columns instead of looping
+_GATHER_LIMIT = 1 << 18
+
+class HashingEmbedder:
+    """
+    Dependency-light text embedder: signed feature hashing of unigrams and
+    bigrams into a fixed number of dimensions, L2-normalized.
+    Deterministic across processes (crc32, not Python's salted hash).
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def sparse(self, text: str, max_features: Optional[int] = None) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        Returns (dimension indices, weights) of the normalized embedding.
+        With max_features, only the heaviest dimensions are kept.
+        """
+        words = _WORD_RE.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        weights: Dict[int, float] = {}
+        for feature in features:
+            h = zlib.crc32(feature.encode("utf-8"))
+            index = h % self.dim
+            weights[index] = weights.get(index, 0.0) + (1.0 if h & 0x80000000 else -1.0)
+        indices = np.fromiter(weights.keys(), dtype=np.intp, count=len(weights))
+        values = np.fromiter(weights.values(), dtype=np.float32, count=len(weights))
+        if max_features is not None and len(values) > max_features:
+            keep = np.argpartition(np.abs(values), -max_features)[-max_features:]
+            indices, values = indices[keep], values[keep]
+        norm = np.linalg.norm(values)
+        if norm > 0:
+            values /= norm
+        return indices, values
+
+    def embed(self, text: str) -> "np.ndarray":
+        vector = np.zeros(self.dim, dtype=np.float32)
+        indices, values = self.sparse(text)
+        vector[indices] = values
+        return vector
+
+def quantize(values: "np.ndarray") -> Tuple["np.ndarray", float]:
+    """
+    Symmetric int8 quantization: (codes, scale) with values ~= codes * scale.
+    Exact when the values are small-integer multiples of their smallest
+    magnitude, as hashed feature counts are; otherwise within scale / 2.
+    """
+    magnitudes = np.abs(values[values != 0])
+    if len(magnitudes) == 0:
+        return np.zeros(len(values), dtype=np.int8), 0.0
+    scale = float(magnitudes.min())
+    steps = values / scale
+    codes = np.round(steps)
+    if magnitudes.max() / scale > 127 or np.abs(steps - codes).max() > 1e-3:
+        scale = float(magnitudes.max()) / 127
+        codes = np.round(values / scale)
+    return codes.astype(np.int8), scale
+
+class VectorMemory:
+    """
+    Local retrieval memory over past observations and thoughts.
+
+    Embeddings are stored int8-quantized with a per-row scale (exact for the
+    hashing embedder's feature counts) in one contiguous column-major matrix,
+    so a query reads only the columns its hashed features touch, at a
+    quarter of the float32 bytes: exact top-k cosine over 100k entries is a
+    few integer adds over contiguous columns plus an argpartition. Deletes
+    swap the last row into the hole so the live rows stay dense.
+    add() only assigns an id and buffers the text; entries are embedded (and
+    numpy is first touched) on the next search or save, so an agent that never
+    recalls anything never pays for either.
+    """
+
+    def __init__(self, dim: int = 256, embedder: Optional[HashingEmbedder] = None,
+                 initial_capacity: int = 1024, max_query_features: Optional[int] = None):
+        self.embedder = embedder or HashingEmbedder(dim)
+        self.dim = self.embedder.dim
+        # Opt-in approximation: score only the heaviest query features (not top-k cosine any more)
+        self.max_query_features = max_query_features
+        self.initial_capacity = initial_capacity
+        # Allocated by the first _embed_pending() (or load)
+        self._matrix = None
+        self._scales = None
+        self._row_ids = None
+        # Largest |code| stored per column; bounds the partial sums in search()
+        self._column_max = None
+        self._id_to_row: Dict[int, int] = {}
+        self._texts: Dict[int, str] = {}
+        self._metadata: Dict[int, Dict[str, Any]] = {}
+        self._pending: List[int] = []  # Added but not embedded yet
+        self._size = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size + len(self._pending)
+
+    def _embed_pending(self):
+        """Embeds the buffered entries into the matrix (lock held)."""
+        if not self._pending:
+            return
+        if self._matrix is None:
+            capacity = max(self.initial_capacity, len(self._pending))
+            self._matrix = np.zeros((capacity, self.dim), dtype=np.int8, order="F")
+            self._scales = np.zeros(capacity, dtype=np.float32)
+            self._row_ids = np.zeros(capacity, dtype=np.int64)
+            self._column_max = np.zeros(self.dim, dtype=np.int64)
+        for entry_id in self._pending:
+            codes, scale = quantize(self.embedder.embed(self._texts[entry_id]))
+            if self._size == self._matrix.shape[0]:
+                self._grow(max(1024, self._size * 2))
+            row = self._size
+            self._matrix[row] = codes
+            self._scales[row] = scale
+            np.maximum(self._column_max, np.abs(codes), out=self._column_max)
+            self._row_ids[row] = entry_id
+            self._id_to_row[entry_id] = row
+            self._size += 1
+        self._pending.clear()
+
+    def _grow(self, capacity: int):
+        matrix = np.zeros((capacity, self.dim), dtype=np.int8, order="F")
+        matrix[:self._size] = self._matrix[:self._size]
+        scales = np.zeros(capacity, dtype=np.float32)
+        scales[:self._size] = self._scales[:self._size]
+        row_ids = np.zeros(capacity, dtype=np.int64)
+        row_ids[:self._size] = self._row_ids[:self._size]
+        self._matrix, self._scales, self._row_ids = matrix, scales, row_ids
+
+    def add(self, text: str, metadata: Optional[Dict[str, Any]] = None) -> int:
+        """Inserts one entry (embedded on the next search or save); returns its id."""
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._texts[entry_id] = text
+            if metadata:
+                self._metadata[entry_id] = metadata
+            self._pending.append(entry_id)
+            return entry_id
+
+    def delete(self, entry_id: int) -> bool:
+        with self._lock:
+            row = self._id_to_row.pop(entry_id, None)
+            if row is None:
+                if entry_id not in self._texts:
+                    return False
+                self._pending.remove(entry_id)
+                del self._texts[entry_id]
+                self._metadata.pop(entry_id, None)
+                return True
+            last = self._size - 1
+            if row != last:
+                moved_id = int(self._row_ids[last])
+                self._matrix[row] = self._matrix[last]
+                self._scales[row] = self._scales[last]
+                self._row_ids[row] = moved_id
+                self._id_to_row[moved_id] = row
+            self._size -= 1
+            del self._texts[entry_id]
+            self._metadata.pop(entry_id, None)
+            return True
+
+    def search(self, query: str, k: int = 5, exclude: Optional[set] = None,
+               min_score: float = 0.0) -> List[Dict[str, Any]]:
+        """Top-k entries by cosine similarity to the query."""
+        indices, values = self.embedder.sparse(query, self.max_query_features)
+        codes, query_scale = quantize(values)
+        with self._lock:
+            self._embed_pending()
+            n = self._size
+            if n == 0 or len(indices) == 0:
+                return []
+            bounds = self._column_max[indices]
+            largest = int(np.abs(codes) @ bounds)  # No |dot product| can exceed this
+            if n * len(indices) <= _GATHER_LIMIT and largest < 2 ** 24:
+                # Small memory: one gather and a float32 matvec beat a numpy call per column
+                # (still exact, every partial sum is an integer below 2**24)
+                dots = self._matrix[:n, indices].astype(np.float32) @ codes.astype(np.float32)
+            else:
+                dots = self._column_dots(n, indices, codes, bounds, np.int16 if largest < 2 ** 15 else np.int32)
+            scores = np.multiply(dots, self._scales[:n], dtype=np.float32)
+            scores *= query_scale
+            # The want-th best score of a strided sample is a lower bound for the want-th best
+            # overall, so the rows at or above it contain the exact top-k (a few hundred rows)
+            want = min(n, k + len(exclude or ()))
+            sample = scores[::64] if n > 64 * want else scores
+            cut = np.partition(sample, len(sample) - want)[len(sample) - want]
+            candidates = np.flatnonzero(scores >= cut)
+            candidates = candidates[scores[candidates] > min_score]
+            if len(candidates) > want:
+                candidates = candidates[np.argpartition(scores[candidates], -want)[-want:]]
+            top = candidates[np.argsort(scores[candidates])[::-1]]
+            results = []
+            for row in top:
+                entry_id = int(self._row_ids[row])
+                score = float(scores[row])
+                if exclude and entry_id in exclude:
+                    continue
+                results.append({
+                    "id": entry_id,
+                    "score": score,
+                    "text": self._texts[entry_id],
+                    "metadata": self._metadata.get(entry_id, {})
+                })
+                if len(results) == k:
+                    break
+            return results
+
+    def _column_dots(self, n: int, indices: "np.ndarray", codes: "np.ndarray", bounds: "np.ndarray",
+                     dtype) -> "np.ndarray":
+        """Query dot products of the first n rows, accumulated column by column."""
+        # Integer adds over contiguous int8 columns (hashed counts make most weights +-1).
+        # Partial sums stay int8 while they provably cannot overflow and are widened once
+        # per group: numpy's int8 -> int16 casting add costs about twice a same-type add
+        dots = np.zeros(n, dtype=dtype)
+        group = np.zeros(n, dtype=np.int8)
+        scratch = None
+        room = 127
+        for column, weight, bound in zip(indices.tolist(), codes.tolist(), bounds.tolist()):
+            if not weight:
+                continue
+            cost = abs(weight) * bound
+            if cost > room:
+                if room < 127:
+                    np.add(dots, group, out=dots)
+                    group.fill(0)
+                    room = 127
+                if cost > room:  # Too large for int8 even on its own
+                    np.add(dots, np.multiply(self._matrix[:n, column], dtype(weight), dtype=dtype), out=dots)
+                    continue
+            room -= cost
+            if weight == 1:
+                np.add(group, self._matrix[:n, column], out=group)
+            elif weight == -1:
+                np.subtract(group, self._matrix[:n, column], out=group)
+            else:
+                if scratch is None:
+                    scratch = np.empty(n, dtype=np.int8)
+                np.add(group, np.multiply(self._matrix[:n, column], np.int8(weight), out=scratch), out=group)
+        if room < 127:
+            np.add(dots, group, out=dots)
+        return dots
+
+    def save(self, path: str):
+        """Writes `<path>.npy` (quantized embedding matrix) and `<path>.json` (ids, scales and texts)."""
+        with self._lock:
+            self._embed_pending()
+            if self._matrix is None:  # Nothing was ever added
+                self._matrix = np.zeros((0, self.dim), dtype=np.int8, order="F")
+                self._scales = np.zeros(0, dtype=np.float32)
+                self._row_ids = np.zeros(0, dtype=np.int64)
+                self._column_max = np.zeros(self.dim, dtype=np.int64)
+            np.save(f"{path}.npy", np.asfortranarray(self._matrix[:self._size]))
+            ids = [int(i) for i in self._row_ids[:self._size]]
+            with open(f"{path}.json", "w") as f:
+                json.dump({
+                    "dim": self.dim,
+                    "next_id": self._next_id,
+                    "ids": ids,
+                    "scales": self._scales[:self._size].tolist(),
+                    "column_max": self._column_max.tolist(),
+                    "texts": [self._texts[i] for i in ids],
+                    "metadata": {str(i): m for i, m in self._metadata.items()}
+                }, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "VectorMemory":
+        """Loads a saved memory; with mmap=True the matrix is mapped copy-on-write."""
+        with open(f"{path}.json") as f:
+            state = json.load(f)
+        memory = cls(dim=state["dim"])
+        memory._next_id = state["next_id"]
+        if not state["ids"]:
+            return memory
+        memory._matrix = np.load(f"{path}.npy", mmap_mode="c" if mmap else None)
+        if "scales" in state:
+            memory._scales = np.array(state["scales"], dtype=np.float32)
+        else:  # Saved before quantization: float32 rows
+            rows = [quantize(np.asarray(row)) for row in memory._matrix]
+            memory._matrix = np.asfortranarray(np.array([codes for codes, _ in rows], dtype=np.int8))
+            memory._scales = np.array([scale for _, scale in rows], dtype=np.float32)
+        memory._size = len(state["ids"])
+        if "column_max" in state:  # Saves reading the whole mapped matrix
+            memory._column_max = np.array(state["column_max"], dtype=np.int64)
+        else:
+            memory._column_max = np.abs(memory._matrix[:memory._size].astype(np.int64)).max(axis=0)
+        memory._row_ids = np.array(state["ids"], dtype=np.int64).reshape(-1)
+        memory._id_to_row = {entry_id: row for row, entry_id in enumerate(state["ids"])}
+        memory._texts = dict(zip(state["ids"], state["texts"]))
+        memory._metadata = {int(i): m for i, m in state["metadata"].items()}
+        return memory